@@ -0,0 +1,44 @@
+
+from django.conf import settings
+from django.http import StreamingHttpResponse
+
+
+class StreamingCollectionMixin(object):
+    """
+    View mixin to opt in to streaming the collection+json document of large successful
+    GET responses instead of rendering it into memory at once. The streamed document
+    is byte-identical to the rendered one.
+    """
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        """
+        Overriden to replace a successful GET response by a streaming response when
+        the accepted renderer supports streaming and the collection is large enough.
+        """
+        response = super(StreamingCollectionMixin, self).finalize_response(
+            request, response, *args, **kwargs)
+        renderer = getattr(response, 'accepted_renderer', None)
+        if request.method != 'GET' or response.status_code != 200 \
+                or not hasattr(renderer, 'render_stream') \
+                or self.get_number_of_items(response.data) < \
+                        settings.COLLECTION_STREAMING_MIN_ITEMS:
+            return response
+        renderer_context = response.renderer_context
+        renderer_context['response'] = response
+        content = renderer.render_stream(response.data, response.accepted_media_type,
+                                         renderer_context)
+        streaming_response = StreamingHttpResponse(content,
+                                                   status=response.status_code,
+                                                   content_type=renderer.media_type)
+        for (header, value) in response.items():
+            if header.lower() != 'content-type':
+                streaming_response[header] = value
+        return streaming_response
+
+    def get_number_of_items(self, data):
+        """
+        Custom method to get the number of items in the response data.
+        """
+        if isinstance(data, dict):
+            data = data.get('results', [])
+        return len(data) if isinstance(data, list) else 0
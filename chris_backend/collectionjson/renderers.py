@@ -1,12 +1,20 @@
+
+import uuid
+
 from rest_framework.serializers import HyperlinkedRelatedField, HyperlinkedIdentityField
 from rest_framework.serializers import HyperlinkedModelSerializer, ManyRelatedField
 from rest_framework.renderers import JSONRenderer
+from rest_framework.compat import SHORT_SEPARATORS, LONG_SEPARATORS
 from .fields import ItemLinkField
 
 
 class CollectionJsonRenderer(JSONRenderer):
     media_type = 'application/vnd.collection+json'
     format = 'collection+json'
+    # render plans keyed by serializer class
+    _render_plans = {}
+    # approximate size in bytes of the chunks yielded when streaming a collection
+    stream_chunk_size = 64 * 1024
 
     def _transform_field(self, key, value):
         return {'name': key, 'value': value}
@@ -43,14 +51,28 @@ class CollectionJsonRenderer(JSONRenderer):
         else:
             return [self._make_link(field_name, data)]
 
-    def _transform_item(self, serializer, item):
-        fields = serializer.fields.items()
-        id_field = self._get_id_field(serializer)
-        related_fields = self._get_related_fields(fields, id_field)
-
-        data = [self._transform_field(k, item[k])
-                for k in item.keys()
-                if k != id_field and k not in related_fields]
+    def _get_render_plan(self, serializer):
+        """
+        Get the render plan for the serializer's class: its id field, the fields
+        rendered as links and the fields excluded from the item's data. The plan is
+        computed only once per serializer class and cached in the renderer's class.
+        """
+        serializer_class = type(serializer)
+        plan = self._render_plans.get(serializer_class)
+        if plan is None:
+            fields = serializer.fields.items()
+            id_field = self._get_id_field(serializer)
+            related_fields = tuple(self._get_related_fields(fields, id_field))
+            non_data_fields = frozenset(related_fields + (id_field,))
+            plan = (id_field, related_fields, non_data_fields)
+            self._render_plans[serializer_class] = plan
+        return plan
+
+    def _transform_item(self, plan, item):
+        (id_field, related_fields, non_data_fields) = plan
+
+        data = [{'name': k, 'value': v} for (k, v) in item.items()
+                if k not in non_data_fields]
         result = {'data': data}
 
         if id_field:
@@ -70,8 +92,8 @@ class CollectionJsonRenderer(JSONRenderer):
             data = [data]
 
         if hasattr(view, 'get_serializer'):
-            serializer = view.get_serializer()
-            return map(lambda x: self._transform_item(serializer, x), data)
+            plan = self._get_render_plan(view.get_serializer())
+            return map(lambda x: self._transform_item(plan, x), data)
         else:
             return map(self._simple_transform_item, data)
 
@@ -158,3 +180,51 @@ class CollectionJsonRenderer(JSONRenderer):
 
         return super(CollectionJsonRenderer, self).render(data, media_type,
                                                           renderer_context)
+
+    def render_stream(self, data, media_type=None, renderer_context=None):
+        """
+        Render the data into a collection+json document incrementally. The document
+        is yielded as a sequence of bytestrings that are byte-identical to the output
+        of the render method once joined. Only the collection's envelope is rendered
+        at once, its items are rendered and yielded in chunks.
+        """
+        indent = self.get_indent(media_type, renderer_context)
+        if not data or indent is not None:
+            yield self.render(data, media_type, renderer_context)
+            return
+
+        request = renderer_context['request']
+        view = renderer_context['view']
+        response = renderer_context['response']
+        data = self._transform_data(request, response, view, data)
+        collection = data['collection']
+        if 'items' not in collection:
+            yield super(CollectionJsonRenderer, self).render(data, media_type,
+                                                             renderer_context)
+            return
+
+        # render the envelope with a placeholder in place of the items
+        items = collection['items']
+        placeholder = uuid.uuid4().hex
+        collection['items'] = placeholder
+        envelope = super(CollectionJsonRenderer, self).render(data, media_type,
+                                                              renderer_context)
+        (head, tail) = envelope.split(('"%s"' % placeholder).encode('utf-8'), 1)
+
+        separators = SHORT_SEPARATORS if self.compact else LONG_SEPARATORS
+        item_separator = separators[0].encode('utf-8')
+        chunk = [head, b'[']
+        chunk_size = 0
+        for (i, item) in enumerate(items):
+            if i:
+                chunk.append(item_separator)
+            item = super(CollectionJsonRenderer, self).render(item, media_type,
+                                                              renderer_context)
+            chunk.append(item)
+            chunk_size += len(item)
+            if chunk_size >= self.stream_chunk_size:
+                yield b''.join(chunk)
+                chunk = []
+                chunk_size = 0
+        chunk.extend([b']', tail])
+        yield b''.join(chunk)
@@ -2,6 +2,8 @@
 from urllib.parse import urlparse
 
 from django.core.urlresolvers import resolve
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 
 from rest_framework.response import Response
 from rest_framework import serializers
@@ -45,18 +47,40 @@ def append_collection_template(response, template_data):
     return response
 
 
+# names of the query parameters of the search views keyed by their URL path
+_query_names = {}
+
+
+@receiver(setting_changed)
+def clear_query_names(**kwargs):
+    """
+    Clear the cached names of the search views' query parameters when the settings
+    (eg. the URL configuration) are reloaded.
+    """
+    _query_names.clear()
+
+
+def get_query_names(query_url):
+    """
+    Convenience method to get the names of the query parameters of a search view from
+    the view's URL. The names are computed only once per URL.
+    """
+    relative_url = urlparse(query_url).path
+    names = _query_names.get(relative_url)
+    if names is None:
+        match = resolve(relative_url)
+        names = tuple(match.func.cls.filter_class.base_filters.keys())
+        _query_names[relative_url] = names
+    return names
+
+
 def append_collection_querylist(response, query_url_list):
     """
     Convenience method to append to a response a collection+json queries template.
     """
     queries = []
     for query_url in query_url_list:
-        relative_url = urlparse(query_url).path
-        match = resolve(relative_url)
-        filters = match.func.cls.filter_class.base_filters
-        data = []
-        for k in filters.keys():
-            data.append({"name": k, "value": ""})
+        data = [{"name": k, "value": ""} for k in get_query_names(query_url)]
         queries.append({'href': query_url, 'rel': 'search', "data": data})
     response.data["queries"] = queries
     return response
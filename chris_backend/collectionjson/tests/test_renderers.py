@@ -1,14 +1,19 @@
 
+import copy
+from unittest import mock
+
 from django.conf.urls import url, include
 from django.test.utils import override_settings
-from django.test import TestCase
+from django.test import TestCase, RequestFactory
 
 from collection_json import Collection
 from rest_framework import status
+from rest_framework.response import Response
 from rest_framework.routers import DefaultRouter
 
 from collectionjson.renderers import CollectionJsonRenderer
 from .models import Dummy, Idiot, Moron, Simple
+from .serializers import DummyHyperlinkedModelSerializer
 from . import views
 
 
@@ -159,8 +164,136 @@ class TestEmpty(TestCase):
         self.assertEqual(response.content.decode('utf8'), '')
 
 
+
+class DummySerializerView(object):
+    def get_serializer(self):
+        return DummyHyperlinkedModelSerializer()
+
+    def get_view_name(self):
+        return 'Dummy List'
+
+
+def create_dummy_items(n):
+    return [{'url': 'http://testserver/rest-api/dummy/%s/' % i,
+             'name': 'dummy %s' % i,
+             'moron': 'http://testserver/rest-api/moron/%s/' % i,
+             'idiots': ['http://testserver/rest-api/idiot/%s/' % i],
+             'other_stuff': 'http://other-stuff.com/',
+             'empty': None,
+             'some_link': 'http://testserver/rest-api/moron/%s/' % i} for i in range(n)]
+
+
+class TestRenderPlan(TestCase):
+
+    def setUp(self):
+        CollectionJsonRenderer._render_plans.clear()
+        self.renderer = CollectionJsonRenderer()
+        self.items = create_dummy_items(1000)
+
+    def test_the_render_plan_is_computed_once_per_serializer_class(self):
+        with mock.patch.object(CollectionJsonRenderer, '_get_related_fields',
+                               wraps=self.renderer._get_related_fields) as related_mock:
+            items = list(self.renderer._transform_items(DummySerializerView(),
+                                                        self.items))
+            list(self.renderer._transform_items(DummySerializerView(), self.items))
+            self.assertEqual(related_mock.call_count, 1)
+        self.assertEqual(len(items), 1000)
+        self.assertEqual(items[0]['href'], 'http://testserver/rest-api/dummy/0/')
+        self.assertEqual(items[0]['data'], [{'name': 'name', 'value': 'dummy 0'}])
+        self.assertEqual([link['rel'] for link in items[0]['links']],
+                         ['moron', 'idiots', 'other_stuff', 'some_link'])
+
+
+class TestRenderPlan(TestCase):
+
+    def setUp(self):
+        self.renderer = CollectionJsonRenderer()
+        self.items = create_dummy_items(1000)
+        self.view = DummySerializerView()
+
+    def render_page_without_plan_cache(self):
+        # recompute the plan for every item like the renderer used to do
+        serializer = self.view.get_serializer()
+        items = []
+        for item in self.items:
+            CollectionJsonRenderer._render_plans.clear()
+            plan = self.renderer._get_render_plan(serializer)
+            items.append(self.renderer._transform_item(plan, item))
+        return items
+
+    def test_render_plan_is_computed_once_per_serializer_class(self):
+        CollectionJsonRenderer._render_plans.clear()
+        serializer = self.view.get_serializer()
+        plan = self.renderer._get_render_plan(serializer)
+        self.assertIs(CollectionJsonRenderer()._get_render_plan(
+            self.view.get_serializer()), plan)
+
+    def test_rendering_a_page_with_a_cached_plan_matches_a_recomputed_plan(self):
+        expected_items = self.render_page_without_plan_cache()
+        items = list(self.renderer._transform_items(self.view, self.items))
+        self.assertEqual(items, expected_items)
+
+
+class TestStreamingRenderer(TestCase):
+
+    def setUp(self):
+        self.renderer = CollectionJsonRenderer()
+        self.renderer.stream_chunk_size = 1024
+        self.data = {'next': 'http://testserver/rest-api/dummy/?limit=100&offset=100',
+                     'previous': None,
+                     'results': create_dummy_items(100),
+                     'collection_links': {'feeds': 'http://testserver/rest-api/feeds/'},
+                     'queries': [{'href': 'http://testserver/rest-api/dummy/search/',
+                                  'rel': 'search', 'data': [{'name': 'name',
+                                                             'value': ''}]}],
+                     'template': {'data': [{'name': 'name', 'value': ''}]}}
+        self.renderer_context = {'request': RequestFactory().get('/rest-api/dummy/'),
+                                 'response': Response(),
+                                 'view': DummySerializerView()}
+
+    def test_streamed_output_is_identical_to_rendered_output(self):
+        rendered = self.renderer.render(copy.deepcopy(self.data),
+                                        renderer_context=self.renderer_context)
+        chunks = list(self.renderer.render_stream(copy.deepcopy(self.data),
+                                                  renderer_context=self.renderer_context))
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(b''.join(chunks), rendered)
+
+    def test_streamed_output_of_empty_collection_is_identical_to_rendered_output(self):
+        self.data['results'] = []
+        rendered = self.renderer.render(copy.deepcopy(self.data),
+                                        renderer_context=self.renderer_context)
+        chunks = self.renderer.render_stream(copy.deepcopy(self.data),
+                                             renderer_context=self.renderer_context)
+        self.assertEqual(b''.join(chunks), rendered)
+
+
+@override_settings(ROOT_URLCONF='collectionjson.tests.test_renderers',
+                   COLLECTION_STREAMING_MIN_ITEMS=1)
+class TestStreamingCollectionMixin(TestCase):
+
+    def setUp(self):
+        create_models()
+
+    def test_views_can_opt_in_to_stream_their_collection(self):
+        response = self.client.get('/rest-api/streaming-dummy/')
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/vnd.collection+json')
+        content = b''.join(response.streaming_content).decode('utf8')
+        streamed = Collection.from_json(content)
+        response = self.client.get('/rest-api/dummy/')
+        rendered = Collection.from_json(response.content.decode('utf8'))
+        self.assertEqual(streamed.items[0].to_dict(), rendered.items[0].to_dict())
+
+    @override_settings(COLLECTION_STREAMING_MIN_ITEMS=2)
+    def test_small_collections_are_not_streamed(self):
+        response = self.client.get('/rest-api/streaming-dummy/')
+        self.assertFalse(response.streaming)
+
 router = DefaultRouter()
 router.register('dummy', views.DummyReadOnlyModelViewSet)
+router.register('streaming-dummy', views.StreamingDummyReadOnlyModelViewSet,
+                base_name='streaming-dummy')
 router.register('moron', views.MoronReadOnlyModelViewSet)
 router.register('idiot', views.IdiotReadOnlyModelViewSet)
 router.register('normal-model', views.SimpleViewSet)
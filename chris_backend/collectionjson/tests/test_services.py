@@ -1,5 +1,6 @@
 
 import json
+from unittest import mock
 
 from django.conf.urls import url, include
 from django.core.urlresolvers import reverse
@@ -96,6 +97,24 @@ class FunctionTests(SimpleGetTest):
                            "data": [{"name": "name", "value": ""}]}])
 
 
+    def test_append_collection_querylist_resolves_query_url_once(self):
+        """
+        Test whether services.append_collection_querylist() only resolves a query url
+        the first time it is appended to a response until the settings are reloaded.
+        """
+        query_urls = [self.endpoint]
+        services.clear_query_names()
+        with mock.patch.object(services, 'resolve',
+                               wraps=services.resolve) as resolve_mock:
+            services.append_collection_querylist(self.response, query_urls)
+            services.append_collection_querylist(self.response, query_urls)
+            self.assertEqual(resolve_mock.call_count, 1)
+            with self.settings(DEBUG=False):
+                services.append_collection_querylist(self.response, query_urls)
+            self.assertEqual(resolve_mock.call_count, 2)
+        self.assertEqual(self.response.data['queries'][0]['data'],
+                         [{"name": "name", "value": ""}])
+
 router = DefaultRouter()
 router.register('moron', views.MoronModelViewSet)
 urlpatterns = [
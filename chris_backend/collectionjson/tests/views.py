@@ -10,6 +10,7 @@ from rest_framework.exceptions import ParseError
 
 from collectionjson.renderers import CollectionJsonRenderer
 from collectionjson.parsers import CollectionJsonParser
+from collectionjson.mixins import StreamingCollectionMixin
 
 from .models import Dummy, Idiot, Moron, MoronFilter, Simple
 from .serializers import MoronHyperlinkedModelSerializer, IdiotHyperlinkedModelSerializer
@@ -41,6 +42,11 @@ class DummyReadOnlyModelViewSet(ReadOnlyModelViewSet):
     renderer_classes = (CollectionJsonRenderer, )
     queryset = Dummy.objects.all()
     serializer_class = DummyHyperlinkedModelSerializer
+
+
+class StreamingDummyReadOnlyModelViewSet(StreamingCollectionMixin,
+                                         DummyReadOnlyModelViewSet):
+    pass
     
 
 class SimpleViewSet(ReadOnlyModelViewSet):
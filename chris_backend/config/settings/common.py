@@ -42,7 +42,7 @@ INSTALLED_APPS = [
 # Pagination
 REST_FRAMEWORK = {
     'PAGE_SIZE': 10,
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.CollectionPagination',
     'DEFAULT_RENDERER_CLASSES': (
         'collectionjson.renderers.CollectionJsonRenderer',
         'rest_framework.renderers.JSONRenderer',
@@ -145,3 +145,95 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/1.9/howto/static-files/
 
 STATIC_URL = '/static/'
+
+
+# Plugin instance dispatch queue
+# Jobs are retried with an exponential backoff (in seconds) up to max_attempts times and
+# at most max_concurrency_per_host jobs are dispatched at once to the same compute host.
+# A job still being dispatched claim_timeout seconds after being claimed is considered
+# abandoned by a dead worker and retried, so the timeout must exceed a dispatch's duration
+PLUGIN_DISPATCH = {
+    'max_attempts': 5,
+    'backoff': 2,
+    'max_concurrency_per_host': 4,
+    'poll_interval': 1,
+    'claim_timeout': 600
+}
+
+# Interval in seconds between two consecutive checks of the execution status of all the
+# non-terminal plugin instances by the status poller
+PLUGIN_STATUS_POLL_INTERVAL = 5
+
+# Number of threads the status poller uses to check the execution status of the plugin
+# instances concurrently with the remote service
+PLUGIN_STATUS_POLL_WORKERS = 8
+
+# Interval in seconds between two consecutive checks for uploaded files whose content
+# has not been hashed yet by the uploaded file hasher
+UPLOADED_FILE_HASH_INTERVAL = 5
+
+# Number of failed attempts after which the uploaded file hasher stops trying to hash
+# the content of a file (eg. a file missing from the storage) until it is restarted
+UPLOADED_FILE_HASH_MAX_ATTEMPTS = 3
+
+# Pooled HTTP client used to send messages to pfcon. At most pool_size keep-alive
+# connections are kept per service, failed connections are retried with an exponential
+# backoff (in seconds) and requests time out after (connect, read) seconds
+PFCON_CLIENT = {
+    'pool_size': 10,
+    'timeout': (5, 60),
+    'retries': 3,
+    'backoff': 0.5
+}
+
+# Optional audit log of the messages sent to pfcon to run plugin instances, written as
+# JSON lines by a background thread to a file rotated every max_bytes bytes. The log is
+# disabled when no filename is given
+PLUGIN_DISPATCH_AUDIT_LOG = {
+    'filename': '',
+    'max_bytes': 10 * 1024 * 1024,
+    'backup_count': 5
+}
+
+# Number of Swift objects listed per request and inserted per query when registering
+# the output files of a plugin instance
+OUTPUT_FILES_REGISTRATION_BATCH_SIZE = 1000
+
+# Minimum number of items in a collection+json list response for the views that opt
+# in to streaming to stream the response instead of rendering it at once
+COLLECTION_STREAMING_MIN_ITEMS = 100
+
+# Maximum number of chunks of a file uploaded through an upload session. Swift large
+# objects can not have more segments than the cluster's max_manifest_segments
+UPLOAD_SESSION_MAX_CHUNKS = 1000
+
+# Size in bytes of the chunks streamed when downloading a file resource
+FILE_DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Maximum number of idle connections kept by the process-wide Swift connection pool and
+# number of seconds after which a pooled connection gets a new auth token
+SWIFT_CONNECTION_POOL_SIZE = 10
+SWIFT_AUTH_TOKEN_DURATION = 60 * 60 * 23
+
+# Whether files with identical content are stored only once in Swift. Stored files are
+# then manifests of a content blob addressed by its SHA-256 hash
+DEDUPLICATE_FILES = False
+
+# Caches. The serialized responses of the read-mostly plugin metadata views are cached
+# in the 'plugin_metadata' cache. The default local-memory cache is private to each
+# process, so the invalidations made by the plugin manager are not seen by the web
+# workers and a cached response can be stale for up to TIMEOUT seconds (the responses
+# of the views with an ETag are keyed on their data's version and are never stale). A
+# backend shared by all the processes (eg. memcached) can be configured instead for
+# the invalidations to take effect at once
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'plugin_metadata': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'plugin_metadata',
+        'TIMEOUT': 30,
+    },
+}
+PLUGIN_METADATA_CACHE = 'plugin_metadata'
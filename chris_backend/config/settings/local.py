@@ -32,7 +32,7 @@ CHRIS_STORE = {
 }
 
 # swift service settings
-DEFAULT_FILE_STORAGE = 'swift.storage.SwiftStorage'
+DEFAULT_FILE_STORAGE = 'core.storage.SwiftStorage'
 SWIFT_AUTH_URL = 'http://swift_service:8080/auth/v1.0'
 SWIFT_USERNAME = 'chris:chris1234'
 SWIFT_KEY = 'testing'
@@ -52,6 +52,9 @@ urlpatterns = format_suffix_patterns([
     url(r'^v1/(?P<pk>[0-9]+)/files/$',
         feed_views.FeedFileList.as_view(), name='feedfile-list'),
 
+    url(r'^v1/(?P<pk>[0-9]+)/files/archive/$',
+        feed_views.FeedFileArchive.as_view(), name='feedfile-archive'),
+
     url(r'^v1/files/(?P<pk>[0-9]+)/$',
         feed_views.FeedFileDetail.as_view(), name='feedfile-detail'),
 
@@ -77,6 +80,14 @@ urlpatterns = format_suffix_patterns([
     url(r'^v1/plugins/(?P<pk>[0-9]+)/instances/$',
         plugin_views.PluginInstanceList.as_view(), name='plugininstance-list'),
 
+    url(r'^v1/plugins/instances/pipelines/$',
+        plugin_views.PluginInstancePipeline.as_view(),
+        name='plugininstance-pipeline'),
+
+    url(r'^v1/plugins/instances/status/$',
+        plugin_views.PluginInstanceStatusList.as_view(),
+        name='plugininstance-status-list'),
+
     url(r'^v1/plugins/instances/search/$',
         plugin_views.PluginInstanceListQuerySearch.as_view(),
         name='plugininstance-list-query-search'),
@@ -103,6 +114,19 @@ urlpatterns = format_suffix_patterns([
     url(r'^v1/uploadedfiles/$',
         uploaded_file_views.UploadedFileList.as_view(), name='uploadedfile-list'),
 
+    url(r'^v1/uploadedfiles/sessions/$',
+        uploaded_file_views.UploadSessionList.as_view(), name='uploadsession-list'),
+
+    url(r'^v1/uploadedfiles/sessions/(?P<pk>[0-9]+)/$',
+        uploaded_file_views.UploadSessionDetail.as_view(), name='uploadsession-detail'),
+
+    url(r'^v1/uploadedfiles/sessions/(?P<pk>[0-9]+)/chunks/$',
+        uploaded_file_views.UploadSessionChunk.as_view(), name='uploadsession-chunk'),
+
+    url(r'^v1/uploadedfiles/sessions/(?P<pk>[0-9]+)/finalize/$',
+        uploaded_file_views.UploadSessionFinalize.as_view(),
+        name='uploadsession-finalize'),
+
     url(r'^v1/uploadedfiles/(?P<pk>[0-9]+)/$',
         uploaded_file_views.UploadedFileDetail.as_view(), name='uploadedfile-detail'),
 
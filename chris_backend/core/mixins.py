@@ -0,0 +1,83 @@
+
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+class MemoizedObjectMixin(object):
+    """
+    Generic view mixin to resolve the view's object only once per request. The views,
+    their helper methods and their serializers can then get the object as many times
+    as needed without further DB queries and permission checks.
+    """
+
+    def get_object(self):
+        """
+        Overriden to memoize the object in the view instance, which only lives for
+        the duration of a request.
+        """
+        if not hasattr(self, '_object'):
+            self._object = super(MemoizedObjectMixin, self).get_object()
+        return self._object
+
+
+class ConditionalGetMixin(object):
+    """
+    Generic view mixin to answer a conditional GET request with a 304 Not Modified
+    response when the client already has the current representation, before any data
+    is serialized or rendered. Views provide the data that identifies the current
+    version of their representation through a get_version method.
+    """
+
+    def get(self, request, *args, **kwargs):
+        """
+        Overriden to check the request's preconditions against the current version of
+        the representation and to add the ETag and Last-Modified headers.
+        """
+        version = self.get_version()
+        if version is None:
+            return super(ConditionalGetMixin, self).get(request, *args, **kwargs)
+        (version_data, last_modified) = version
+        # kept for the mixins that cache the representation of each version
+        self.version_data = version_data
+        etag = self.get_etag(version_data)
+        # the last modification date does not change when objects are deleted or
+        # their status changes so only the etag is used to validate the request
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = super(ConditionalGetMixin, self).get(request, *args, **kwargs)
+        response['ETag'] = quote_etag(etag)
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        patch_vary_headers(response, ('Accept', 'Authorization'))
+        return response
+
+    def get_version(self):
+        """
+        Custom method to get a tuple with the data that changes whenever the view's
+        representation changes and the representation's last modification date or
+        None when the representation can not be versioned.
+        """
+        raise NotImplementedError
+
+    def get_etag(self, version_data):
+        """
+        Custom method to get the (unquoted) entity tag of the current version of the
+        view's representation for the requested page, user and media type.
+        """
+        request = self.request
+        key = repr((version_data, request.get_full_path(), request.user.pk,
+                    request.accepted_media_type))
+        return hashlib.md5(key.encode('utf-8')).hexdigest()
+
+    def get_collection_version(self, queryset, date_field):
+        """
+        Custom method to get the version of a collection from the number of objects
+        in the collection and their last modification date with a single query.
+        """
+        collection = queryset.order_by().aggregate(count=Count('id'),
+                                                   last_modified=Max(date_field))
+        return ((collection['count'], collection['last_modified']),
+                collection['last_modified'])
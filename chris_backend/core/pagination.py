@@ -0,0 +1,104 @@
+"""
+Pagination styles for the collection+json list endpoints. Lists are paginated with
+limit/offset by default, while deep pages of large lists are better traversed with a
+cursor that filters on the list's ordering instead of scanning all the previous rows.
+"""
+
+from collections import OrderedDict
+
+from django.db import models
+
+from rest_framework.pagination import LimitOffsetPagination, CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class ModelCursorPagination(CursorPagination):
+    """
+    Cursor pagination keyed on the ordering of the paginated queryset, that is its
+    explicit ordering or else its model's default ordering, when it is on a unique
+    field or a timestamp. The model's id is used as a tie-breaker and as the key of
+    the querysets with any other ordering.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        """
+        Overriden to get the ordering from the queryset instead of from a fixed
+        ordering attribute.
+        """
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        if not ordering or not isinstance(ordering[0], str):
+            return ('id',)
+        order = ordering[0]
+        field_name = order.lstrip('-')
+        try:
+            field = queryset.model._meta.get_field(field_name)
+        except models.FieldDoesNotExist:
+            field = None
+        if field is None or not (field.unique or isinstance(field, models.DateTimeField)):
+            # the cursor's position must be a unique or nearly unique value
+            return ('id',)
+        if field_name == 'id':
+            return (order,)
+        return (order, '-id' if order.startswith('-') else 'id')
+
+
+class CollectionPagination(LimitOffsetPagination):
+    """
+    Limit/offset pagination that switches to cursor pagination when the cursor query
+    parameter is given, an empty cursor asking for the first page. The total count of
+    objects is not computed in cursor mode nor when the count query parameter is
+    'false'.
+    """
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Overriden to delegate to a cursor paginator in cursor mode and to fetch one
+        extra object instead of counting the objects when the count is skipped.
+        """
+        self.cursor_paginator = None
+        if self.cursor_query_param in request.query_params:
+            self.cursor_paginator = ModelCursorPagination()
+            self.cursor_paginator.page_size = self.get_limit(request)
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        if request.query_params.get(self.count_query_param) != 'false':
+            return super(CollectionPagination, self).paginate_queryset(queryset,
+                                                                       request, view)
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+        self.offset = self.get_offset(request)
+        self.count = None
+        self.request = request
+        results = list(queryset[self.offset:self.offset + self.limit + 1])
+        self.has_next = len(results) > self.limit
+        return results[:self.limit]
+
+    def get_paginated_response(self, data):
+        """
+        Overriden to leave the count out of the response when it is not computed.
+        """
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        if self.count is not None:
+            return super(CollectionPagination, self).get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+    def get_next_link(self):
+        """
+        Overriden to rely on the extra fetched object when the count is skipped.
+        """
+        if self.count is not None:
+            return super(CollectionPagination, self).get_next_link()
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.offset_query_param,
+                                   self.offset + self.limit)
@@ -0,0 +1,151 @@
+"""
+Helpers to build HTTP responses that stream stored files in chunks straight from their
+storage backend, either one file with support for single HTTP byte ranges or many files
+as a zip archive built on the fly.
+"""
+
+import re
+import zipfile
+import mimetypes
+
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.http import quote_etag
+
+from core.storage import iter_file, iter_file_content
+
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def parse_range_header(range_header, size):
+    """
+    Parse a single byte range from an HTTP Range header value. Return a tuple with the
+    first and last byte positions (inclusive) or None when the header is missing,
+    malformed or asks for several ranges, in which case the whole file is served.
+    A ValueError is raised when the range can not be satisfied.
+    """
+    match = RANGE_RE.match(range_header.strip()) if range_header else None
+    if not match or match.groups() == ('', ''):
+        return None
+    (first, last) = match.groups()
+    if not first:
+        # suffix range with the last bytes of the file
+        suffix_length = int(last)
+        if suffix_length == 0 or size == 0:
+            raise ValueError('Unsatisfiable range')
+        return (max(size - suffix_length, 0), size - 1)
+    (start, end) = (int(first), int(last) if last else size - 1)
+    if last and start > end:
+        return None
+    if start >= size:
+        raise ValueError('Unsatisfiable range')
+    return (start, min(end, size - 1))
+
+
+def get_file_etag(storage, name, size):
+    """
+    Get an entity tag for a stored file. Storage backends that keep a checksum of
+    their files provide it, otherwise the tag is derived from the file's size and
+    modification time.
+    """
+    if hasattr(storage, 'etag'):
+        return quote_etag(storage.etag(name))
+    return quote_etag('{0:x}-{1:x}'.format(int(storage.modified_time(name).timestamp()),
+                                           size))
+
+
+def get_file_response(request, field_file):
+    """
+    Get an HTTP response that streams a stored file's content. A single byte range is
+    served with a 206 status code when requested through the Range header.
+    """
+    storage = field_file.storage
+    name = field_file.name
+    size = storage.size(name)
+    etag = get_file_etag(storage, name, size)
+
+    range_header = request.META.get('HTTP_RANGE')
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if if_range and if_range != etag:
+        # the file has changed since the client got its first part
+        range_header = None
+    try:
+        byte_range = parse_range_header(range_header, size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = 'bytes */{0}'.format(size)
+        return response
+
+    chunk_size = settings.FILE_DOWNLOAD_CHUNK_SIZE
+    (start, end) = byte_range if byte_range else (0, size - 1)
+    if not byte_range:
+        content = iter_file_content(storage, name, chunk_size)
+    elif hasattr(storage, 'iter_range'):
+        content = storage.iter_range(name, start, end, chunk_size=chunk_size)
+    else:
+        content = iter_file(storage, name, start, end, chunk_size)
+
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    response = StreamingHttpResponse(content, status=206 if byte_range else 200,
+                                     content_type=content_type)
+    response['Content-Length'] = end - start + 1
+    response['ETag'] = etag
+    response['Accept-Ranges'] = 'bytes'
+    if byte_range:
+        response['Content-Range'] = 'bytes {0}-{1}/{2}'.format(start, end, size)
+    return response
+
+
+class ZipStreamBuffer(object):
+    """
+    Unseekable file-like object that collects the bytes written by a zip file so that
+    they can be yielded as soon as they are written.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def pop(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_zip_archive(files, chunk_size):
+    """
+    Generator to build a zip archive on the fly from an iterable of (archive name,
+    stored file) pairs. Each file is read from its storage backend in chunks that
+    are written to the archive and yielded straight away, so neither the files nor
+    the archive are ever held in memory or staged on disk.
+    """
+    buffer = ZipStreamBuffer()
+    with zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_STORED) as archive:
+        for (arcname, field_file) in files:
+            # the size of the files is not known in advance
+            with archive.open(arcname, mode='w', force_zip64=True) as member:
+                for chunk in iter_file_content(field_file.storage, field_file.name,
+                                               chunk_size):
+                    member.write(chunk)
+                    yield buffer.pop()
+            # local file header's data descriptor
+            yield buffer.pop()
+    # archive's central directory
+    yield buffer.pop()
+
+
+def get_zip_archive_response(files, archive_name):
+    """
+    Get an HTTP response that streams a zip archive of stored files built on the fly.
+    """
+    content = iter_zip_archive(files, settings.FILE_DOWNLOAD_CHUNK_SIZE)
+    response = StreamingHttpResponse(content, content_type='application/zip')
+    response['Content-Disposition'] = 'attachment; filename="{0}"'.format(archive_name)
+    return response
@@ -0,0 +1,394 @@
+
+import os
+import json
+import time
+import hashlib
+import mimetypes
+import threading
+from io import BytesIO
+from contextlib import contextmanager
+from urllib.parse import urljoin
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files import File
+from django.utils.deconstruct import deconstructible
+
+import swiftclient
+from swift import storage
+
+
+class SwiftConnectionPool(object):
+    """
+    A process-wide pool of reusable Swift connections. A connection keeps its auth
+    token between uses so that only the first use and the uses after the token has
+    expired need an auth round-trip.
+    """
+
+    def __init__(self, max_size, token_duration):
+        self.max_size = max_size
+        self.token_duration = token_duration
+        self._lock = threading.Lock()
+        self._idle = []
+        self.stats = {'hits': 0, 'misses': 0, 'reauths': 0}
+
+    def get(self):
+        """
+        Take a connection from the pool or create a new one if the pool is empty.
+        """
+        with self._lock:
+            if self._idle:
+                (conn, auth_time) = self._idle.pop()
+                self.stats['hits'] += 1
+            else:
+                conn = None
+                self.stats['misses'] += 1
+        if conn is None:
+            conn = swiftclient.Connection(user=settings.SWIFT_USERNAME,
+                                          key=settings.SWIFT_KEY,
+                                          authurl=settings.SWIFT_AUTH_URL)
+            auth_time = time.time()
+        elif time.time() - auth_time >= self.token_duration:
+            # the connection lazily gets a new token the next time it is used
+            conn.url = conn.token = None
+            auth_time = time.time()
+            with self._lock:
+                self.stats['reauths'] += 1
+        conn.pool_auth_time = auth_time
+        return conn
+
+    def put(self, conn):
+        """
+        Give a connection back to the pool. Connections beyond the pool's maximum
+        size are closed.
+        """
+        with self._lock:
+            if len(self._idle) < self.max_size:
+                self._idle.append((conn, conn.pool_auth_time))
+                return
+        conn.close()
+
+    @contextmanager
+    def connection(self):
+        """
+        Context manager to use a pooled connection.
+        """
+        conn = self.get()
+        try:
+            yield conn
+        finally:
+            self.put(conn)
+
+    def get_auth(self):
+        """
+        Get a storage url and a valid auth token from a pooled connection.
+        """
+        with self.connection() as conn:
+            if not conn.url or not conn.token:
+                conn.url, conn.token = conn.get_auth()
+            return conn.url, conn.token
+
+    def clear(self):
+        """
+        Drop all the idle connections and reset the pool's metrics.
+        """
+        with self._lock:
+            self._idle = []
+            self.stats = {'hits': 0, 'misses': 0, 'reauths': 0}
+
+
+swift_pool = SwiftConnectionPool(settings.SWIFT_CONNECTION_POOL_SIZE,
+                                 settings.SWIFT_AUTH_TOKEN_DURATION)
+
+
+def iter_file(storage, name, start, end, chunk_size):
+    """
+    Generator to read a file from any storage backend in chunks.
+    """
+    with storage.open(name, 'rb') as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def iter_file_content(storage, name, chunk_size):
+    """
+    Generator to read a whole file in chunks from any storage backend.
+    """
+    if hasattr(storage, 'iter_range'):
+        return storage.iter_range(name, chunk_size=chunk_size)
+    return iter_file(storage, name, 0, storage.size(name) - 1, chunk_size)
+
+
+class HashingReader(object):
+    """
+    Read-only file-like wrapper that computes the SHA-256 hash of the bytes read
+    through it.
+    """
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.hasher = hashlib.sha256()
+
+    def read(self, size=-1):
+        data = self.fileobj.read(size)
+        self.hasher.update(data)
+        return data
+
+    def hexdigest(self):
+        return self.hasher.hexdigest()
+
+
+def hash_chunks(chunks):
+    """
+    Compute the SHA-256 hash of the content given by an iterable of byte chunks.
+    """
+    hasher = hashlib.sha256()
+    for chunk in chunks:
+        hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def get_blob_name(sha256):
+    """
+    Get the storage name of a deduplicated content blob from its SHA-256 hash.
+    """
+    return 'blobs/sha256/{0}'.format(sha256)
+
+
+def reference_blob(sha256):
+    """
+    Count a new file referencing the content with the given hash. A file must be
+    counted before its content is looked up in or saved to the stored content blobs so
+    that the blob can not be deleted meanwhile.
+    """
+    from uploadedfiles.models import ContentBlob
+
+    if not sha256:
+        return
+    with transaction.atomic():
+        (blob, created) = ContentBlob.objects.select_for_update().get_or_create(
+            sha256=sha256, defaults={'refcount': 1})
+        if not created:
+            ContentBlob.objects.filter(pk=blob.pk).update(refcount=F('refcount') + 1)
+
+
+def release_blob(storage, sha256, count=1):
+    """
+    Stop counting the given number of deleted files referencing the content with the
+    given hash and delete the deduplicated content blob once no file references it
+    anymore. Return whether the blob was deleted.
+    """
+    from uploadedfiles.models import ContentBlob
+
+    if not sha256:
+        return False
+    with transaction.atomic():
+        # the blob's row stays locked until the blob has been deleted so that a
+        # concurrent reference waits and then finds that the blob must be saved again
+        blob = ContentBlob.objects.select_for_update().filter(sha256=sha256).first()
+        if blob is None:
+            return False
+        if blob.refcount > count:
+            ContentBlob.objects.filter(pk=blob.pk).update(refcount=F('refcount') - count)
+            return False
+        blob.delete()
+        if not (settings.DEDUPLICATE_FILES and hasattr(storage, 'delete_blob')):
+            return False
+        storage.delete_blob(sha256)
+    return True
+
+
+@deconstructible
+class SwiftStorage(storage.SwiftStorage):
+    """
+    Swift storage backend that uses the process-wide Swift connection pool instead
+    of authenticating and keeping a single HTTP connection on its own.
+    """
+
+    def __init__(self, **kwargs):
+        for name, value in kwargs.items():
+            if hasattr(self, name):
+                setattr(self, name, value)
+        storage.validate_settings(self)
+
+        self.last_headers_name = None
+        self.last_headers_value = None
+
+        with swift_pool.connection() as conn:
+            try:
+                conn.head_container(self.container_name)
+            except swiftclient.ClientException:
+                if not self.auto_create_container:
+                    raise ImproperlyConfigured(
+                        "Container %s does not exist." % self.container_name)
+                conn.put_container(self.container_name)
+
+        self.base_url = self.override_base_url
+        if self.auto_base_url and self.override_base_url is None:
+            self.base_url = urljoin(self.storage_url + '/', self.container_name) + '/'
+
+    @property
+    def storage_url(self):
+        return swift_pool.get_auth()[0]
+
+    @property
+    def token(self):
+        return swift_pool.get_auth()[1]
+
+    def _open(self, name, mode='rb'):
+        original_name = name
+        name = self.name_prefix + name
+        with swift_pool.connection() as conn:
+            headers, content = conn.get_object(self.container_name, name)
+        buf = BytesIO(content)
+        buf.name = os.path.basename(original_name)
+        buf.mode = mode
+        return File(buf)
+
+    def _save(self, name, content, headers=None):
+        original_name = name
+        name = self.name_prefix + name
+        if self.content_type_from_fd:
+            content_type = storage.magic.from_buffer(content.read(1024), mime=True)
+            # go back to the beginning of the file
+            content.seek(0)
+        else:
+            content_type = mimetypes.guess_type(name)[0]
+        with swift_pool.connection() as conn:
+            conn.put_object(self.container_name, name, content,
+                            content_type=content_type,
+                            content_length=content.size,
+                            headers=headers)
+        return original_name
+
+    def get_headers(self, name):
+        if name != self.last_headers_name:
+            with swift_pool.connection() as conn:
+                self.last_headers_value = conn.head_object(self.container_name, name)
+            self.last_headers_name = name
+        return self.last_headers_value
+
+    @storage.prepend_name_prefix
+    def etag(self, name):
+        # the etag of a large object is quoted
+        return self.get_headers(name)['etag'].strip('"')
+
+    def iter_range(self, name, start=None, end=None, chunk_size=64 * 1024):
+        """
+        Generator to read an object in chunks without buffering the whole object in
+        memory. Only the bytes from start to end (inclusive) are read when a range is
+        given. The pooled connection is given back to the pool once the object has
+        been read.
+        """
+        name = self.name_prefix + name
+        headers = None
+        if start is not None:
+            headers = {'Range': 'bytes={0}-{1}'.format(start, end)}
+        with swift_pool.connection() as conn:
+            (resp_headers, chunks) = conn.get_object(self.container_name, name,
+                                                     resp_chunk_size=chunk_size,
+                                                     headers=headers)
+            for chunk in chunks:
+                yield chunk
+
+    def save_segment(self, name, content, content_length):
+        """
+        Upload a segment of a large object straight from a file-like object without
+        buffering it in memory. Return the segment's etag.
+        """
+        name = self.name_prefix + name
+        with swift_pool.connection() as conn:
+            return conn.put_object(self.container_name, name, content,
+                                   content_length=content_length)
+
+    def save_large_object(self, name, segments):
+        """
+        Create a static large object from a list of (segment name, etag, size) tuples
+        previously uploaded with save_segment. Return the name of the new object.
+        """
+        original_name = name
+        name = self.name_prefix + name
+        manifest = [{'path': '/{0}/{1}{2}'.format(self.container_name, self.name_prefix,
+                                                 segment_name),
+                     'etag': etag,
+                     'size_bytes': size} for (segment_name, etag, size) in segments]
+        with swift_pool.connection() as conn:
+            conn.put_object(self.container_name, name, json.dumps(manifest),
+                            content_type=mimetypes.guess_type(name)[0],
+                            query_string='multipart-manifest=put')
+        return original_name
+
+    def blob_exists(self, sha256):
+        """
+        Check whether a deduplicated content blob is already stored.
+        """
+        with swift_pool.connection() as conn:
+            try:
+                conn.head_object(self.container_name,
+                                 self.name_prefix + get_blob_name(sha256))
+            except swiftclient.ClientException:
+                return False
+        return True
+
+    def _save_blob_manifest(self, name, sha256):
+        """
+        Store at the given name a manifest object whose content is the content blob
+        with the given hash so that the content is only stored once.
+        """
+        manifest = '{0}/{1}{2}'.format(self.container_name, self.name_prefix,
+                                       get_blob_name(sha256))
+        with swift_pool.connection() as conn:
+            conn.put_object(self.container_name, self.name_prefix + name, b'',
+                            content_type=mimetypes.guess_type(name)[0],
+                            headers={'X-Object-Manifest': manifest})
+
+    def save_deduplicated(self, name, content, sha256):
+        """
+        Save a file whose content is only uploaded if no content blob with the same
+        hash is stored yet. Return the name of the saved file. The file must have been
+        counted with reference_blob beforehand.
+        """
+        if not self.blob_exists(sha256):
+            with swift_pool.connection() as conn:
+                conn.put_object(self.container_name,
+                                self.name_prefix + get_blob_name(sha256), content,
+                                content_length=content.size)
+        self._save_blob_manifest(name, sha256)
+        return name
+
+    def deduplicate(self, name, sha256):
+        """
+        Replace an already stored file by a manifest of the content blob with the
+        same hash. The file's content is copied server-side into a new blob when no
+        blob with the same hash is stored yet. The file must have been counted with
+        reference_blob beforehand.
+        """
+        if not self.blob_exists(sha256):
+            with swift_pool.connection() as conn:
+                conn.copy_object(self.container_name, self.name_prefix + name,
+                                 destination='/{0}/{1}{2}'.format(
+                                     self.container_name, self.name_prefix,
+                                     get_blob_name(sha256)))
+        self._save_blob_manifest(name, sha256)
+
+    def delete_blob(self, sha256):
+        """
+        Delete a deduplicated content blob.
+        """
+        self.delete(get_blob_name(sha256))
+
+    @storage.prepend_name_prefix
+    def delete(self, name):
+        try:
+            with swift_pool.connection() as conn:
+                conn.delete_object(self.container_name, name)
+        except swiftclient.ClientException:
+            pass
@@ -0,0 +1,90 @@
+
+from django.test import TestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.pagination import CollectionPagination, ModelCursorPagination
+from feeds.models import Feed, FeedFile
+from plugins.models import Plugin
+
+
+class CollectionPaginationTests(TestCase):
+
+    def setUp(self):
+        self.factory = APIRequestFactory()
+        for i in range(5):
+            Plugin.objects.create(name='plugin{0}'.format(i),
+                                  type='fs' if i < 3 else 'ds')
+
+    def paginate(self, url, queryset):
+        pagination = CollectionPagination()
+        request = Request(self.factory.get(url))
+        page = pagination.paginate_queryset(queryset, request)
+        response = pagination.get_paginated_response([plugin.id for plugin in page])
+        return response.data
+
+    def test_limit_offset_pagination_by_default(self):
+        """
+        Test whether the pagination uses limit/offset and counts the objects when no
+        cursor is given.
+        """
+        data = self.paginate('/api/v1/?limit=2&offset=2', Plugin.objects.all())
+        self.assertEqual(data['count'], 5)
+        self.assertIn('offset=4', data['next'])
+        self.assertEqual(len(data['results']), 2)
+
+    def test_limit_offset_pagination_without_count(self):
+        """
+        Test whether the pagination skips counting the objects when the count query
+        parameter is 'false' while still linking to the next page.
+        """
+        with CaptureQueriesContext(connection) as context:
+            data = self.paginate('/api/v1/?limit=2&count=false', Plugin.objects.all())
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertNotIn('COUNT', context.captured_queries[0]['sql'].upper())
+        self.assertNotIn('count', data)
+        self.assertIn('offset=2', data['next'])
+        data = self.paginate('/api/v1/?limit=2&offset=4&count=false',
+                             Plugin.objects.all())
+        self.assertIsNone(data['next'])
+        self.assertEqual(len(data['results']), 1)
+
+    def test_cursor_pagination_follows_queryset_ordering(self):
+        """
+        Test whether the cursor pagination traverses all the objects in the
+        queryset's ordering through the next links and back through the previous
+        links.
+        """
+        expected_ids = list(Plugin.objects.order_by('id').values_list('id', flat=True))
+        url = '/api/v1/?limit=2&cursor='
+        ids = []
+        while url:
+            data = self.paginate(url, Plugin.objects.all())
+            self.assertNotIn('count', data)
+            ids.extend(data['results'])
+            last_url = url
+            url = data['next']
+        self.assertEqual(ids, expected_ids)
+        data = self.paginate(last_url, Plugin.objects.all())
+        data = self.paginate(data['previous'], Plugin.objects.all())
+        self.assertEqual(data['results'], expected_ids[2:4])
+
+    def test_cursor_ordering(self):
+        """
+        Test whether the cursor pagination is keyed on the queryset's ordering with
+        the id as a tie-breaker and falls back to the id for unordered querysets and
+        orderings with many ties.
+        """
+        pagination = ModelCursorPagination()
+        self.assertEqual(pagination.get_ordering(None, Feed.objects.all(), None),
+                         ('-creation_date', '-id'))
+        self.assertEqual(
+            pagination.get_ordering(None, Feed.objects.order_by('creation_date'), None),
+            ('creation_date', 'id'))
+        self.assertEqual(pagination.get_ordering(None, FeedFile.objects.all(), None),
+                         ('id',))
+        self.assertEqual(pagination.get_ordering(None, Plugin.objects.all(), None),
+                         ('id',))
@@ -0,0 +1,103 @@
+
+import io
+import os
+import shutil
+import zipfile
+import tempfile
+from types import SimpleNamespace
+
+from django.test import TestCase, RequestFactory
+from django.core.files.storage import FileSystemStorage
+
+from core.responses import get_file_response, parse_range_header, iter_zip_archive
+
+
+class GetFileResponseTests(TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.storage = FileSystemStorage(location=self.test_dir)
+        with open(os.path.join(self.test_dir, 'file1.txt'), 'wb') as f:
+            f.write(b'0123456789')
+        self.field_file = SimpleNamespace(storage=self.storage, name='file1.txt')
+        self.factory = RequestFactory()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_get_file_response_streams_whole_file(self):
+        """
+        Test whether get_file_response streams the whole file with its metadata.
+        """
+        request = self.factory.get('/file1.txt')
+        response = get_file_response(request, self.field_file)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertEqual(response['Content-Type'], 'text/plain')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertTrue(response['ETag'].startswith('"'))
+
+    def test_get_file_response_streams_requested_range(self):
+        """
+        Test whether get_file_response only streams the requested byte range.
+        """
+        request = self.factory.get('/file1.txt', HTTP_RANGE='bytes=2-5')
+        response = get_file_response(request, self.field_file)
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), b'2345')
+        self.assertEqual(response['Content-Length'], '4')
+        self.assertEqual(response['Content-Range'], 'bytes 2-5/10')
+
+    def test_get_file_response_ignores_range_for_changed_file(self):
+        """
+        Test whether get_file_response serves the whole file when the If-Range entity
+        tag does not match the file's current entity tag.
+        """
+        request = self.factory.get('/file1.txt', HTTP_RANGE='bytes=2-5',
+                                   HTTP_IF_RANGE='"outdated"')
+        response = get_file_response(request, self.field_file)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+
+    def test_get_file_response_unsatisfiable_range(self):
+        """
+        Test whether get_file_response returns a 416 response for a range that starts
+        beyond the end of the file.
+        """
+        request = self.factory.get('/file1.txt', HTTP_RANGE='bytes=20-')
+        response = get_file_response(request, self.field_file)
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */10')
+
+    def test_parse_range_header(self):
+        """
+        Test whether parse_range_header parses single byte ranges and ignores the
+        ranges it can not serve.
+        """
+        self.assertEqual(parse_range_header('bytes=0-', 10), (0, 9))
+        self.assertEqual(parse_range_header('bytes=5-100', 10), (5, 9))
+        self.assertEqual(parse_range_header('bytes=-3', 10), (7, 9))
+        self.assertIsNone(parse_range_header('bytes=0-1,4-5', 10))
+        self.assertIsNone(parse_range_header('items=0-1', 10))
+        self.assertIsNone(parse_range_header(None, 10))
+        with self.assertRaises(ValueError):
+            parse_range_header('bytes=-0', 10)
+
+
+    def test_iter_zip_archive_streams_archive_of_files(self):
+        """
+        Test whether iter_zip_archive yields a valid zip archive of the files.
+        """
+        with open(os.path.join(self.test_dir, 'file2.txt'), 'wb') as f:
+            f.write(b'abc')
+        files = [('data/file1.txt', self.field_file),
+                 ('data/file2.txt', SimpleNamespace(storage=self.storage,
+                                                    name='file2.txt'))]
+        chunks = list(iter_zip_archive(iter(files), chunk_size=4))
+        self.assertGreater(len(chunks), 2)
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(chunks)))
+        self.assertIsNone(archive.testzip())
+        self.assertEqual(archive.read('data/file1.txt'), b'0123456789')
+        self.assertEqual(archive.read('data/file2.txt'), b'abc')
@@ -0,0 +1,147 @@
+
+from unittest import mock
+
+from django.test import TestCase
+from django.conf import settings
+
+from django.core.files.base import ContentFile
+
+from core.storage import SwiftConnectionPool, SwiftStorage, swift_pool, swiftclient
+from core.storage import reference_blob, release_blob, get_blob_name
+from uploadedfiles.models import ContentBlob
+
+
+class SwiftConnectionPoolTests(TestCase):
+
+    def setUp(self):
+        self.pool = SwiftConnectionPool(1, 60)
+
+    def test_pool_reuses_connections(self):
+        """
+        Test whether a connection given back to the pool is reused by the next user.
+        """
+        with mock.patch.object(swiftclient.Connection, '__init__',
+                               return_value=None) as conn_init_mock:
+            with self.pool.connection() as conn1:
+                pass
+            with self.pool.connection() as conn2:
+                pass
+            self.assertIs(conn1, conn2)
+            conn_init_mock.assert_called_once_with(user=settings.SWIFT_USERNAME,
+                                                   key=settings.SWIFT_KEY,
+                                                   authurl=settings.SWIFT_AUTH_URL)
+            self.assertEqual(self.pool.stats, {'hits': 1, 'misses': 1, 'reauths': 0})
+
+    def test_pool_closes_connections_beyond_max_size(self):
+        """
+        Test whether the pool closes the connections that do not fit in it.
+        """
+        with mock.patch.object(swiftclient.Connection, '__init__', return_value=None):
+            with mock.patch.object(swiftclient.Connection, 'close') as conn_close_mock:
+                conn1 = self.pool.get()
+                conn2 = self.pool.get()
+                self.pool.put(conn1)
+                self.pool.put(conn2)
+                conn_close_mock.assert_called_once_with()
+                self.assertEqual(self.pool.stats['misses'], 2)
+
+    def test_pool_drops_expired_tokens(self):
+        """
+        Test whether the pool forces a new authentication for a connection whose
+        token has expired.
+        """
+        with mock.patch.object(swiftclient.Connection, '__init__', return_value=None):
+            conn = self.pool.get()
+            conn.url, conn.token = ('http://swift/v1/AUTH_chris', 'token')
+            # pretend the connection was authenticated a long time ago
+            conn.pool_auth_time = 0
+            self.pool.put(conn)
+            conn = self.pool.get()
+            self.assertIsNone(conn.token)
+            self.assertEqual(self.pool.stats['reauths'], 1)
+
+
+class SwiftStorageTests(TestCase):
+
+    def test_iter_range_streams_object_range_with_pooled_connection(self):
+        """
+        Test whether iter_range reads only the requested range of an object in
+        chunks and gives the connection back to the pool once the object is read.
+        """
+        conn = mock.Mock(url='http://swift/v1/AUTH_chris', token='token')
+        conn.get_object = mock.Mock(return_value=({}, iter([b'23', b'45'])))
+        with mock.patch.object(swift_pool, 'get', return_value=conn):
+            with mock.patch.object(swift_pool, 'put') as pool_put_mock:
+                storage = SwiftStorage()
+                pool_put_mock.reset_mock()
+                chunks = storage.iter_range('file1.txt', 2, 5, chunk_size=2)
+                self.assertEqual(next(chunks), b'23')
+                # the connection is still being used to read the object
+                self.assertEqual(pool_put_mock.call_count, 0)
+                self.assertEqual(list(chunks), [b'45'])
+                pool_put_mock.assert_called_once_with(conn)
+        conn.get_object.assert_called_with(storage.container_name, 'file1.txt',
+                                           resp_chunk_size=2,
+                                           headers={'Range': 'bytes=2-5'})
+
+    def test_save_deduplicated_uploads_content_only_once(self):
+        """
+        Test whether save_deduplicated uploads a content blob only when no blob with
+        the same hash is stored yet and always stores a manifest at the file's name.
+        """
+        conn = mock.Mock(url='http://swift/v1/AUTH_chris', token='token')
+        conn.head_object = mock.Mock(side_effect=[swiftclient.ClientException(''), {}])
+        with mock.patch.object(swift_pool, 'get', return_value=conn):
+            with mock.patch.object(swift_pool, 'put'):
+                storage = SwiftStorage()
+                conn.put_object.reset_mock()
+                storage.save_deduplicated('foo/file1.txt', ContentFile(b'data'), 'abc')
+                storage.save_deduplicated('foo/file2.txt', ContentFile(b'data'), 'abc')
+        blob_puts = [c for c in conn.put_object.call_args_list
+                     if c[0][1] == get_blob_name('abc')]
+        self.assertEqual(len(blob_puts), 1)
+        manifest = '{0}/{1}'.format(storage.container_name, get_blob_name('abc'))
+        conn.put_object.assert_called_with(storage.container_name, 'foo/file2.txt',
+                                           b'', content_type='text/plain',
+                                           headers={'X-Object-Manifest': manifest})
+
+
+class ContentBlobReferenceTests(TestCase):
+
+    def test_reference_blob_counts_referencing_files(self):
+        """
+        Test whether reference_blob counts each new file referencing a content.
+        """
+        reference_blob('abc')
+        reference_blob('abc')
+        reference_blob('')
+        self.assertEqual(ContentBlob.objects.get(sha256='abc').refcount, 2)
+        self.assertEqual(ContentBlob.objects.count(), 1)
+
+    def test_release_blob(self):
+        """
+        Test whether release_blob only deletes a content blob once it is no longer
+        referenced by any file.
+        """
+        ContentBlob.objects.create(sha256='abc', refcount=3)
+        storage = mock.Mock()
+        with self.settings(DEDUPLICATE_FILES=True):
+            self.assertFalse(release_blob(storage, 'abc'))
+            self.assertEqual(ContentBlob.objects.get(sha256='abc').refcount, 2)
+            storage.delete_blob.assert_not_called()
+            self.assertTrue(release_blob(storage, 'abc', 2))
+            self.assertFalse(release_blob(storage, 'abc'))
+        storage.delete_blob.assert_called_once_with('abc')
+        self.assertFalse(ContentBlob.objects.filter(sha256='abc').exists())
+
+    def test_release_blob_keeps_blob_when_deduplication_is_disabled(self):
+        """
+        Test whether release_blob stops counting the files referencing a content but
+        does not delete any blob when deduplication is disabled.
+        """
+        ContentBlob.objects.create(sha256='abc', refcount=1)
+        storage = mock.Mock()
+        with self.settings(DEDUPLICATE_FILES=False):
+            self.assertFalse(release_blob(storage, 'abc'))
+        storage.delete_blob.assert_not_called()
+        self.assertFalse(ContentBlob.objects.filter(sha256='abc').exists())
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.2 on 2026-10-18 21:04
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feeds', '0006_feedfile_sha256'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='feed',
+            name='creation_date',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='feed',
+            name='name',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=100),
+        ),
+    ]
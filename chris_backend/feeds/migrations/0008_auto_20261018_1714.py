@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.2 on 2026-10-18 21:14
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('feeds', '0007_auto_20261018_1704'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='feed',
+            name='modification_date',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -1,14 +1,18 @@
 
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
 
 import django_filters
 from rest_framework.filters import FilterSet
 
+from core.storage import release_blob
+
 
 class Feed(models.Model):
-    creation_date = models.DateTimeField(auto_now_add=True)
-    modification_date = models.DateTimeField(auto_now_add=True)
-    name = models.CharField(max_length=100, blank=True, default='')
+    creation_date = models.DateTimeField(auto_now_add=True, db_index=True)
+    modification_date = models.DateTimeField(auto_now=True)
+    name = models.CharField(max_length=100, blank=True, default='', db_index=True)
     plugin_inst = models.OneToOneField('plugins.PluginInstance',
                                        on_delete=models.CASCADE, related_name='feed')
     owner = models.ManyToManyField('auth.User', related_name='feed')
@@ -88,8 +92,21 @@ class Comment(models.Model):
 class FeedFile(models.Model):
     creation_date = models.DateTimeField(auto_now_add=True)
     fname = models.FileField(max_length=2048)
+    sha256 = models.CharField(max_length=64, blank=True, db_index=True)
     feed = models.ForeignKey(Feed, on_delete=models.CASCADE, related_name='files')
     plugin_inst = models.ForeignKey('plugins.PluginInstance', on_delete=models.CASCADE, related_name='file')
 
     def __str__(self):
-        return self.fname.name
\ No newline at end of file
+        return self.fname.name
+
+
+@receiver(post_delete, sender=FeedFile)
+def release_feed_file_content(sender, instance, **kwargs):
+    """
+    Release the deleted file's reference to its content once the deletion is
+    committed, including when the file is deleted in cascade with its feed or its
+    plugin instance.
+    """
+    if instance.sha256:
+        storage = instance.fname.storage
+        transaction.on_commit(lambda: release_blob(storage, instance.sha256))
@@ -1,5 +1,28 @@
 from rest_framework import permissions
 
+from .models import Feed
+
+
+def is_owner(user, obj):
+    """
+    Check whether a user owns an object with a single indexed lookup instead of
+    loading the object's owners.
+    """
+    if obj._meta.get_field('owner').many_to_many:
+        return obj.owner.filter(pk=user.pk).exists()
+    return obj.owner_id == user.pk
+
+
+def is_related_feed_owner(user, obj):
+    """
+    Check whether a user owns the feed or any of the feeds an object is related to
+    with a single indexed lookup.
+    """
+    if obj._meta.get_field('feed').many_to_many:
+        return obj.feed.filter(owner=user).exists()
+    return Feed.owner.through.objects.filter(feed_id=obj.feed_id,
+                                             user_id=user.pk).exists()
+
 
 class IsOwnerOrChris(permissions.BasePermission):
     """
@@ -10,9 +33,7 @@ class IsOwnerOrChris(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         # Read and write permissions are only allowed to
         # the owner and superuser 'chris'.
-        if hasattr(obj.owner, 'all'):
-            return (request.user in obj.owner.all()) or (request.user.username == 'chris')
-        return (obj.owner == request.user) or (request.user.username == 'chris')
+        return (request.user.username == 'chris') or is_owner(request.user, obj)
     
 
 class IsOwnerOrChrisOrReadOnly(permissions.BasePermission):
@@ -28,9 +49,7 @@ class IsOwnerOrChrisOrReadOnly(permissions.BasePermission):
             return True
 
         # Write permissions are only allowed to the owner and superuser 'chris'.
-        if hasattr(obj.owner, 'all'):
-            return (request.user in obj.owner.all()) or (request.user.username == 'chris')
-        return (obj.owner == request.user) or (request.user.username == 'chris')
+        return (request.user.username == 'chris') or is_owner(request.user, obj)
 
 
 class IsRelatedFeedOwnerOrChris(permissions.BasePermission):
@@ -42,18 +61,5 @@ class IsRelatedFeedOwnerOrChris(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         # Read and write permissions are only allowed to
         # the owner and superuser 'chris'.
-        #import pdb; pdb.set_trace()
-        if request.user.username == 'chris':
-            return True
-        if hasattr(obj.feed, 'all'):
-            owner_lists = [feed.owner.all() for feed in obj.feed.all()]
-            for owner_list in owner_lists:
-                if request.user in owner_list:
-                    return True
-        elif request.user in obj.feed.owner.all():
-            return True
-        return False
-
-
-
-
+        return (request.user.username == 'chris') or \
+               is_related_feed_owner(request.user, obj)
@@ -106,8 +106,8 @@ class FeedFileSerializer(serializers.HyperlinkedModelSerializer):
 
     class Meta:
         model = FeedFile
-        fields = ('url', 'fname', 'feed_id', 'plugin_inst_id', 'file_resource', 'feed',
-                  'plugin_inst')
+        fields = ('url', 'fname', 'sha256', 'feed_id', 'plugin_inst_id', 'file_resource',
+                  'feed', 'plugin_inst')
 
     def _get_file_link(self, obj):
         """
@@ -1,9 +1,12 @@
 
+from unittest import mock
+
 from django.test import TestCase
 from django.contrib.auth.models import User
 
 from plugins.models import Plugin, PluginParameter, PluginInstance
-from feeds.models import Note, Feed
+from feeds.models import Note, Feed, FeedFile
+from feeds import models
 
 
 class FeedModelTests(TestCase):
@@ -41,3 +44,21 @@ class FeedModelTests(TestCase):
         pl_inst = PluginInstance.objects.create(plugin=plugin, owner=user)
         pl_inst.feed.name = self.feed_name
         self.assertEquals(Note.objects.count(), 1)
+
+    def test_deleting_plugin_instance_releases_the_content_of_its_feed_files(self):
+        """
+        Test whether the content of a feed's files is released after the files are
+        deleted in cascade with their plugin instance.
+        """
+        user = User.objects.get(username=self.username)
+        plugin = Plugin.objects.get(name=self.plugin_name)
+        pl_inst = PluginInstance.objects.create(plugin=plugin, owner=user)
+        for (name, sha256) in [('file1.txt', 'abc'), ('file2.txt', '')]:
+            feedfile = FeedFile(plugin_inst=pl_inst, feed=pl_inst.feed, sha256=sha256)
+            feedfile.fname.name = name
+            feedfile.save()
+        with mock.patch.object(models, 'release_blob') as release_blob_mock:
+            with mock.patch('django.db.transaction.on_commit',
+                            side_effect=lambda func: func()):
+                pl_inst.delete()
+        release_blob_mock.assert_called_once_with(mock.ANY, 'abc')
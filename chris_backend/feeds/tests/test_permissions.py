@@ -0,0 +1,59 @@
+
+from django.test import TestCase
+from django.contrib.auth.models import User
+
+from plugins.models import Plugin, PluginInstance
+from feeds.models import Tag, Comment
+from feeds.permissions import is_owner, is_related_feed_owner
+
+
+class PermissionTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='foo', password='foo-pass')
+        self.other_user = User.objects.create_user(username='boo', password='boo-pass')
+        (plugin, tf) = Plugin.objects.get_or_create(name="pacspull", type="fs")
+        self.feeds = []
+        for i in range(3):
+            pl_inst = PluginInstance.objects.create(plugin=plugin, owner=self.user)
+            self.feeds.append(pl_inst.feed)
+        # the feeds have several owners
+        for i in range(5):
+            owner = User.objects.create_user(username='owner{0}'.format(i),
+                                             password='owner-pass')
+            for feed in self.feeds:
+                feed.owner.add(owner)
+
+    def test_is_owner(self):
+        """
+        Test whether is_owner checks the ownership of objects with many owners and
+        with a single owner in at most one query.
+        """
+        feed = self.feeds[0]
+        with self.assertNumQueries(1):
+            self.assertTrue(is_owner(self.user, feed))
+        with self.assertNumQueries(1):
+            self.assertFalse(is_owner(self.other_user, feed))
+        tag = Tag.objects.create(name='Tag1', color='blue', owner=self.user)
+        tag = Tag.objects.get(pk=tag.id)
+        with self.assertNumQueries(0):
+            self.assertTrue(is_owner(self.user, tag))
+            self.assertFalse(is_owner(self.other_user, tag))
+
+    def test_is_related_feed_owner(self):
+        """
+        Test whether is_related_feed_owner checks the ownership of the feeds related
+        to an object in a single query.
+        """
+        tag = Tag.objects.create(name='Tag1', color='blue', owner=self.other_user)
+        tag.feed.add(*self.feeds)
+        with self.assertNumQueries(1):
+            self.assertTrue(is_related_feed_owner(self.user, tag))
+        with self.assertNumQueries(1):
+            self.assertFalse(is_related_feed_owner(self.other_user, tag))
+        comment = Comment.objects.create(feed=self.feeds[0], owner=self.other_user)
+        comment = Comment.objects.get(pk=comment.id)
+        with self.assertNumQueries(1):
+            self.assertTrue(is_related_feed_owner(self.user, comment))
+        with self.assertNumQueries(1):
+            self.assertFalse(is_related_feed_owner(self.other_user, comment))
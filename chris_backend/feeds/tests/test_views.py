@@ -1,11 +1,13 @@
 
-import os, json, shutil
+import os, io, json, shutil, zipfile
 from unittest import mock
 
 from django.test import TestCase, tag
 from django.core.urlresolvers import reverse
 from django.contrib.auth.models import User
 from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from rest_framework import status
 
@@ -13,7 +15,7 @@ import swiftclient
 
 from plugins.models import Plugin, PluginInstance
 from feeds.models import Note, Tag, Feed, Comment, FeedFile
-from feeds import views
+from feeds import views, models
 
 
 class ViewTests(TestCase):
@@ -138,6 +140,22 @@ class FeedListViewTests(ViewTests):
         self.assertContains(response, "Feed1")
         self.assertContains(response, "Feed2")
 
+    def test_feed_list_conditional_get(self):
+        self.client.login(username=self.username, password=self.password)
+        response = self.client.get(self.list_url)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+        # modifying a feed changes the collection's version
+        feed = Feed.objects.get(name="Feed2")
+        feed.name = "Feed3"
+        feed.save()
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, "Feed3")
+        self.assertNotEqual(response['ETag'], etag)
+
     def test_feed_list_success_chris_user_lists_all_users_feeds(self):
         self.client.login(username=self.chris_username, password=self.chris_password)
         response = self.client.get(self.list_url)
@@ -183,6 +201,30 @@ class FeedListQuerySearchViewTests(ViewTests):
         response = self.client.get(self.list_url)
         self.assertContains(response, self.feedname)
 
+    def test_feed_list_query_search_uses_name_index(self):
+        """
+        Test whether the database plans the query of all the feeds searched by name
+        with the index on the feeds' name.
+        """
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, Feed._meta.db_table)
+        index_name = [name for (name, c) in constraints.items() if c['index'] and
+                      c['columns'] == ['name']][0]
+        # the chris user's search is not restricted to the feeds of an owner
+        self.client.login(username=self.chris_username, password=self.chris_password)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(self.list_url)
+        table = connection.ops.quote_name(Feed._meta.db_table)
+        # the query that fetches the page of feeds
+        sql = [q['sql'] for q in context.captured_queries if 'ORDER BY' in q['sql']
+               and q['sql'].split(' FROM ')[1].startswith(table)][0]
+        explain = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+        with connection.cursor() as cursor:
+            cursor.execute(explain + sql)
+            query_plan = str(cursor.fetchall())
+        self.assertIn(index_name, query_plan)
+
     def test_feed_list_query_search_failure_unauthenticated(self):
         response = self.client.get(self.list_url)
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -255,6 +297,22 @@ class FeedDetailViewTests(ViewTests):
         self.assertEquals(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEquals(Feed.objects.count(), 0)
 
+    def test_feed_delete_releases_the_content_of_its_files(self):
+        feed = Feed.objects.get(name=self.feedname)
+        pl_inst = PluginInstance.objects.all()[0]
+        for (name, sha256) in [('file1.txt', 'abc'), ('file2.txt', 'abc'),
+                               ('file3.txt', 'def'), ('file4.txt', '')]:
+            feedfile = FeedFile(plugin_inst=pl_inst, feed=feed, sha256=sha256)
+            feedfile.fname.name = name
+            feedfile.save()
+        self.client.login(username=self.username, password=self.password)
+        with mock.patch.object(models, 'release_blob') as release_blob_mock:
+            with mock.patch('django.db.transaction.on_commit',
+                            side_effect=lambda func: func()):
+                self.client.delete(self.read_update_delete_url)
+        self.assertEqual(sorted(c[0][1:] for c in release_blob_mock.call_args_list),
+                         [('abc',), ('abc',), ('def',)])
+
     def test_feed_delete_failure_unauthenticated(self):
         response = self.client.delete(self.read_update_delete_url)
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -720,6 +778,73 @@ class FeedFileDetailViewTests(FeedFileViewTests):
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
+class FeedFileArchiveViewTests(FeedFileViewTests):
+    """
+    Test the feedfile-archive view
+    """
+
+    def setUp(self):
+        super(FeedFileArchiveViewTests, self).setUp()
+        feed = Feed.objects.get(name=self.feedname)
+        self.archive_url = reverse("feedfile-archive", kwargs={"pk": feed.id})
+
+        # create two files in the DB "already uploaded" to the server by two
+        # different plugin instances
+        self.pl_inst = PluginInstance.objects.all()[0]
+        feedfile = FeedFile(plugin_inst=self.pl_inst, feed=feed)
+        feedfile.fname.name = '{0}/feed_{1}/pacspull_{2}/data/file1.txt'.format(
+            self.username, feed.id, self.pl_inst.id)
+        feedfile.save()
+        plugin = Plugin.objects.get(name="mri_convert")
+        user = User.objects.get(username=self.username)
+        self.other_pl_inst = PluginInstance.objects.create(plugin=plugin, owner=user,
+                                                           previous=self.pl_inst)
+        feedfile = FeedFile(plugin_inst=self.other_pl_inst, feed=feed)
+        feedfile.fname.name = '{0}/feed_{1}/pacspull_{2}/mri_convert_{3}/data/' \
+                              'file2.txt'.format(self.username, feed.id,
+                                                 self.pl_inst.id, self.other_pl_inst.id)
+        feedfile.save()
+        self.feed = feed
+
+    def get_archive(self, response):
+        content = b''.join(response.streaming_content)
+        return zipfile.ZipFile(io.BytesIO(content))
+
+    def test_feedfile_archive_success(self):
+        self.client.login(username=self.username, password=self.password)
+        with mock.patch('core.responses.iter_file_content',
+                        side_effect=lambda storage, name, chunk_size:
+                        iter([b'content of ', os.path.basename(name).encode()])):
+            response = self.client.get(self.archive_url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response['Content-Type'], 'application/zip')
+            archive = self.get_archive(response)
+        feed_dir = 'feed_{0}/pacspull_{1}/'.format(self.feed.id, self.pl_inst.id)
+        file1 = feed_dir + 'data/file1.txt'
+        file2 = feed_dir + 'mri_convert_{0}/data/file2.txt'.format(self.other_pl_inst.id)
+        self.assertEqual(archive.namelist(), [file1, file2])
+        self.assertEqual(archive.read(file1), b'content of file1.txt')
+
+    def test_feedfile_archive_success_filtered_by_plugin_instance(self):
+        self.client.login(username=self.username, password=self.password)
+        with mock.patch('core.responses.iter_file_content',
+                        return_value=iter([b'content'])):
+            response = self.client.get(self.archive_url,
+                                       {'plugin_inst_id': self.other_pl_inst.id})
+            archive = self.get_archive(response)
+        self.assertEqual(len(archive.namelist()), 1)
+        self.assertTrue(archive.namelist()[0].endswith('file2.txt'))
+
+    def test_feedfile_archive_failure_not_related_feed_owner(self):
+        self.client.login(username=self.other_username, password=self.other_password)
+        response = self.client.get(self.archive_url)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_feedfile_archive_failure_unauthenticated(self):
+        response = self.client.get(self.archive_url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
 class FileResourceViewTests(FeedFileViewTests):
     """
     Test the feedfile-resource view
@@ -742,9 +867,9 @@ class FileResourceViewTests(FeedFileViewTests):
         fileresource_view_inst = mock.Mock()
         fileresource_view_inst.get_object = mock.Mock(return_value=feedfile)
         request_mock = mock.Mock()
-        with mock.patch('feeds.views.Response') as response_mock:
+        with mock.patch('feeds.views.get_file_response') as get_file_response_mock:
             views.FileResource.get(fileresource_view_inst, request_mock)
-            response_mock.assert_called_with(feedfile.fname)
+            get_file_response_mock.assert_called_with(request_mock, feedfile.fname)
 
     @tag('integration')
     def test_integration_fileresource_download_success(self):
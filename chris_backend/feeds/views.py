@@ -1,10 +1,12 @@
 
-from rest_framework import generics, permissions
-from rest_framework.response import Response
+from rest_framework import generics, permissions, serializers
 from rest_framework.reverse import reverse
 
 from collectionjson import services
+from collectionjson.mixins import StreamingCollectionMixin
+from core.mixins import MemoizedObjectMixin, ConditionalGetMixin
 from core.renderers import BinaryFileRenderer
+from core.responses import get_file_response, get_zip_archive_response
 
 from .models import Note, Tag, Feed, FeedFilter, Comment, FeedFile
 from .serializers import FeedSerializer, FeedFileSerializer
@@ -30,7 +32,7 @@ class NoteDetail(generics.RetrieveUpdateAPIView):
         return services.append_collection_template(response, template_data)
 
 
-class TagList(generics.ListCreateAPIView):
+class TagList(MemoizedObjectMixin, generics.ListCreateAPIView):
     """
     A view for a feed-specific collection of tags.
     """
@@ -114,7 +116,7 @@ class TagDetail(generics.RetrieveUpdateDestroyAPIView):
         return services.append_collection_template(response, template_data)
 
 
-class FeedList(generics.ListAPIView):
+class FeedList(ConditionalGetMixin, generics.ListAPIView):
     """
     A view for the collection of feeds.
     """
@@ -148,6 +150,12 @@ class FeedList(generics.ListAPIView):
                  'user': reverse('user-detail', request=request, kwargs={"pk": user.id})}
         return services.append_collection_links(response, links)
 
+    def get_version(self):
+        """
+        Custom method to get the version of the collection of the user's feeds.
+        """
+        return self.get_collection_version(self.get_queryset(), 'modification_date')
+
 
 class FeedListQuerySearch(generics.ListAPIView):
     """
@@ -169,7 +177,7 @@ class FeedListQuerySearch(generics.ListAPIView):
         return Feed.objects.filter(owner=user)
 
 
-class FeedDetail(generics.RetrieveUpdateDestroyAPIView):
+class FeedDetail(MemoizedObjectMixin, generics.RetrieveUpdateDestroyAPIView):
     """
     A feed view.
     """
@@ -184,7 +192,7 @@ class FeedDetail(generics.RetrieveUpdateDestroyAPIView):
         if 'owner' in self.request.data:
             self.update_owners(serializer)
         super(FeedDetail, self).perform_update(serializer)
-        
+
     def update_owners(self, serializer):
         """
         Custom method to update the feed's owners.
@@ -207,7 +215,7 @@ class FeedDetail(generics.RetrieveUpdateDestroyAPIView):
         return services.append_collection_template(response, template_data)
 
 
-class CommentList(generics.ListCreateAPIView):
+class CommentList(MemoizedObjectMixin, generics.ListCreateAPIView):
     """
     A view for the collection of comments.
     """
@@ -261,7 +269,8 @@ class CommentDetail(generics.RetrieveUpdateDestroyAPIView):
         return services.append_collection_template(response, template_data)
 
 
-class FeedFileList(generics.ListAPIView):
+class FeedFileList(MemoizedObjectMixin, StreamingCollectionMixin,
+                   generics.ListAPIView):
     """
     A view for the collection of feeds' files.
     """
@@ -289,6 +298,43 @@ class FeedFileList(generics.ListAPIView):
         return self.filter_queryset(feed.files.all())
 
 
+class FeedFileArchive(generics.GenericAPIView):
+    """
+    A view to enable downloading all the files of a feed as a single zip archive.
+    """
+    queryset = Feed.objects.all()
+    renderer_classes = (BinaryFileRenderer,)
+    permission_classes = (permissions.IsAuthenticated, IsOwnerOrChris,)
+
+    def get(self, request, *args, **kwargs):
+        """
+        Overriden to stream a zip archive of the feed's files that is built on the fly
+        from the storage backend. The archive can be restricted to the files created
+        by a plugin instance through the 'plugin_inst_id' query parameter.
+        """
+        feed = self.get_object()
+        feed_files = feed.files.all()
+        plugin_inst_id = request.query_params.get('plugin_inst_id')
+        if plugin_inst_id:
+            if not plugin_inst_id.isdigit():
+                raise serializers.ValidationError(
+                    {'detail': "Invalid plugin instance id %s" % plugin_inst_id})
+            feed_files = feed_files.filter(plugin_inst_id=plugin_inst_id)
+        feed_files = feed_files.order_by('id').only('fname').iterator()
+        feed_dir = 'feed_{0}/'.format(feed.id)
+        files = ((self.get_archive_name(f.fname.name, feed_dir), f.fname)
+                 for f in feed_files)
+        return get_zip_archive_response(files, 'feed_{0}.zip'.format(feed.id))
+
+    def get_archive_name(self, fname, feed_dir):
+        """
+        Custom method to get the path of a file within the archive relative to the
+        feed's directory.
+        """
+        index = fname.find(feed_dir)
+        return fname[index:] if index >= 0 else fname.lstrip('/')
+
+
 class FeedFileDetail(generics.RetrieveAPIView):
     """
     A feed's file view.
@@ -308,7 +354,8 @@ class FileResource(generics.GenericAPIView):
 
     def get(self, request, *args, **kwargs):
         """
-        Overriden to be able to make a GET request to an actual file resource.
+        Overriden to be able to make a GET request to an actual file resource. The
+        file is streamed from the storage backend and HTTP byte ranges are supported.
         """
         feed_file = self.get_object()
-        return Response(feed_file.fname)
\ No newline at end of file
+        return get_file_response(request, feed_file.fname)
\ No newline at end of file
@@ -0,0 +1,69 @@
+"""
+Cache of the serialized responses of the plugin metadata views. Plugins and their
+parameters are only modified by the plugin manager, which invalidates all the cached
+responses at once by changing the cache's generation.
+"""
+
+import uuid
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+
+from rest_framework.response import Response
+
+
+GENERATION_KEY = 'plugin-metadata-generation'
+
+
+def get_cache():
+    """
+    Get the configured cache backend of the plugin metadata.
+    """
+    return caches[settings.PLUGIN_METADATA_CACHE]
+
+
+def get_cache_key(cache, url, version_data=None):
+    """
+    Get the cache key of the response for a url in the cache's current generation. The
+    responses of versioned views are also keyed on the version of their data.
+    """
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, uuid.uuid4().hex, None)
+        generation = cache.get(GENERATION_KEY)
+    key = repr((url, version_data))
+    return 'plugin-metadata:{0}:{1}'.format(generation,
+                                            hashlib.md5(key.encode('utf-8')).hexdigest())
+
+
+def invalidate_plugin_metadata():
+    """
+    Invalidate all the cached plugin metadata responses by starting a new generation.
+    """
+    get_cache().set(GENERATION_KEY, uuid.uuid4().hex, None)
+
+
+class PluginMetadataCacheMixin(object):
+    """
+    View mixin to cache the serialized data of successful GET responses so that the
+    following requests for the same url are answered without DB queries nor
+    serialization. Only meant for views whose data is the same for all the users who
+    are allowed to read it. When combined with ConditionalGetMixin (listed first) the
+    data is cached per version so that it always matches the response's ETag.
+    """
+
+    def get(self, request, *args, **kwargs):
+        """
+        Overriden to answer the request from the cache when possible.
+        """
+        cache = get_cache()
+        key = get_cache_key(cache, request.build_absolute_uri(),
+                            getattr(self, 'version_data', None))
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+        response = super(PluginMetadataCacheMixin, self).get(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data)
+        return response
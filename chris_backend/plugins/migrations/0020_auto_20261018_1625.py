@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.2 on 2026-10-18 20:25
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plugins', '0019_auto_20180402_1102'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plugin',
+            name='execshell',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='plugin',
+            name='selfexec',
+            field=models.CharField(blank=True, max_length=512),
+        ),
+        migrations.AddField(
+            model_name='plugin',
+            name='selfpath',
+            field=models.CharField(blank=True, max_length=512),
+        ),
+        migrations.AddField(
+            model_name='pluginparameter',
+            name='action',
+            field=models.CharField(default='store', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='pluginparameter',
+            name='flag',
+            field=models.CharField(blank=True, max_length=52),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.2 on 2026-10-18 20:26
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plugins', '0020_auto_20261018_1625'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PluginInstanceJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('creation_date', models.DateTimeField(auto_now_add=True)),
+                ('status', models.CharField(choices=[('queued', 'Waiting to be dispatched'), ('dispatching', 'Being dispatched by a worker'), ('dispatched', 'Successfully dispatched'), ('failed', 'Failed after the maximum number of attempts')], default='queued', max_length=20)),
+                ('compute_host', models.CharField(default='host', max_length=100)),
+                ('attempts', models.IntegerField(default=0)),
+                ('next_attempt_date', models.DateTimeField(default=django.utils.timezone.now)),
+                ('plugin_inst', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='job', to='plugins.PluginInstance')),
+            ],
+            options={
+                'ordering': ('creation_date',),
+            },
+        ),
+    ]
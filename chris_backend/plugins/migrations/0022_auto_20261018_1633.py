@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.2 on 2026-10-18 20:33
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def save_ancestry(apps, schema_editor):
+    """
+    Compute the root and ancestry path of the existing plugin instances. A previous
+    plugin instance is always created before its next instances.
+    """
+    PluginInstance = apps.get_model('plugins', 'PluginInstance')
+    ancestry = {}
+    for inst in PluginInstance.objects.order_by('id'):
+        if inst.previous_id:
+            (root_id, path) = ancestry[inst.previous_id]
+            path = '{0}{1}/'.format(path, inst.id)
+        else:
+            (root_id, path) = (inst.id, '/{0}/'.format(inst.id))
+        ancestry[inst.id] = (root_id, path)
+        PluginInstance.objects.filter(pk=inst.id).update(root=root_id, path=path)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plugins', '0021_plugininstancejob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plugininstance',
+            name='path',
+            field=models.CharField(blank=True, max_length=2048),
+        ),
+        migrations.AddField(
+            model_name='plugininstance',
+            name='root',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='descendants', to='plugins.PluginInstance'),
+        ),
+        migrations.RunPython(save_ancestry, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.2 on 2026-10-18 21:04
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('plugins', '0022_auto_20261018_1633'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='plugin',
+            name='category',
+            field=models.CharField(blank=True, db_index=True, max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='plugin',
+            name='creation_date',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='plugin',
+            name='dock_image',
+            field=models.CharField(db_index=True, max_length=500),
+        ),
+        migrations.AlterField(
+            model_name='plugin',
+            name='type',
+            field=models.CharField(choices=[('ds', 'Data plugin'), ('fs', 'Filesystem plugin')], db_index=True, default='ds', max_length=4),
+        ),
+        migrations.AlterField(
+            model_name='plugininstance',
+            name='end_date',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='plugininstance',
+            name='start_date',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterIndexTogether(
+            name='plugininstance',
+            index_together=set([('owner', 'status', 'start_date')]),
+        ),
+    ]
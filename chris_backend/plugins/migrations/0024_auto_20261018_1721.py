@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.2 on 2026-10-18 21:21
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('plugins', '0023_auto_20261018_1704'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='plugininstancejob',
+            name='status',
+            field=models.CharField(choices=[('waiting', 'Waiting for the previous plugin instance'), ('queued', 'Waiting to be dispatched'), ('dispatching', 'Being dispatched by a worker'), ('dispatched', 'Successfully dispatched'), ('failed', 'Failed after the maximum number of attempts')], default='queued', max_length=20),
+        ),
+    ]
@@ -1,13 +1,14 @@
 
 from django.db import models
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 import django_filters
 
 from rest_framework.filters import FilterSet
 
 from django.conf import settings
-import swiftclient
 
+from core.storage import swift_pool, hash_chunks, iter_file_content, reference_blob
 from feeds.models import Feed, FeedFile
 
 
@@ -22,7 +23,15 @@ TYPES = {'string': 'str', 'integer': 'int', 'float': 'float', 'boolean': 'bool',
 
 PLUGIN_TYPE_CHOICES = [("ds", "Data plugin"), ("fs", "Filesystem plugin")]
 
-STATUS_TYPES = ['started', 'running-on-remote', 'finished-on-remote']
+STATUS_TYPES = ['started', 'running-on-remote', 'finished-on-remote', 'queued']
+
+TERMINAL_STATUS_TYPES = ['finishedSuccessfully', 'finishedWithError']
+
+DISPATCH_STATUS_CHOICES = [("waiting", "Waiting for the previous plugin instance"),
+                           ("queued", "Waiting to be dispatched"),
+                           ("dispatching", "Being dispatched by a worker"),
+                           ("dispatched", "Successfully dispatched"),
+                           ("failed", "Failed after the maximum number of attempts")]
 
 class MemoryInt(int):
     def __new__(cls, memory_str, *args, **kwargs):
@@ -124,18 +133,22 @@ class Plugin(models.Model):
                 'memory_limit'     : 200   # in Mi
                }
     maxint = 2147483647
-    creation_date = models.DateTimeField(auto_now_add=True)
+    creation_date = models.DateTimeField(auto_now_add=True, db_index=True)
     modification_date = models.DateTimeField(auto_now_add=True)
     name = models.CharField(max_length=100, unique=True)
-    dock_image = models.CharField(max_length=500)
-    type = models.CharField(choices=PLUGIN_TYPE_CHOICES, default='ds', max_length=4)
+    dock_image = models.CharField(max_length=500, db_index=True)
+    type = models.CharField(choices=PLUGIN_TYPE_CHOICES, default='ds', max_length=4,
+                            db_index=True)
     authors = models.CharField(max_length=200, blank=True)
     title = models.CharField(max_length=400, blank=True)
-    category = models.CharField(max_length=100, blank=True)
+    category = models.CharField(max_length=100, blank=True, db_index=True)
     description = models.CharField(max_length=800, blank=True)
     documentation = models.CharField(max_length=800, blank=True)
     license = models.CharField(max_length=50, blank=True)
     version = models.CharField(max_length=10, blank=True)
+    selfpath = models.CharField(max_length=512, blank=True)
+    selfexec = models.CharField(max_length=512, blank=True)
+    execshell = models.CharField(max_length=50, blank=True)
     min_gpu_limit = models.IntegerField(null=True)
     max_gpu_limit = models.IntegerField(null=True)
     min_number_of_workers = models.IntegerField(null=True, default=1)
@@ -170,6 +183,8 @@ class PluginFilter(FilterSet):
 
 class PluginParameter(models.Model):
     name = models.CharField(max_length=100)
+    flag = models.CharField(max_length=52, blank=True)
+    action = models.CharField(max_length=20, default='store')
     optional = models.BooleanField(default=True)
     default = models.CharField(max_length=200, blank=True)
     type = models.CharField(choices=TYPE_CHOICES, default='string', max_length=10)
@@ -185,11 +200,16 @@ class PluginParameter(models.Model):
     
 
 class PluginInstance(models.Model):
-    start_date = models.DateTimeField(auto_now_add=True)
-    end_date = models.DateTimeField(auto_now_add=True)
+    start_date = models.DateTimeField(auto_now_add=True, db_index=True)
+    end_date = models.DateTimeField(auto_now_add=True, db_index=True)
     status = models.CharField(max_length=30, default=STATUS_TYPES[0])
     previous = models.ForeignKey("self", on_delete=models.CASCADE, null=True,
                                  related_name='next')
+    # root instance of the instance's DAG and materialized path of ancestor ids
+    # from the root down to the instance itself, eg. /<root id>/.../<id>/
+    root = models.ForeignKey("self", on_delete=models.CASCADE, null=True,
+                             related_name='descendants')
+    path = models.CharField(max_length=2048, blank=True)
     plugin = models.ForeignKey(Plugin, on_delete=models.CASCADE, related_name='instances')
     owner = models.ForeignKey('auth.User')
     cpu_limit = CPUField(null=True)
@@ -199,18 +219,47 @@ class PluginInstance(models.Model):
 
     class Meta:
         ordering = ('start_date',)
+        # match the searches of an owner's instances by status
+        index_together = [('owner', 'status', 'start_date')]
 
     def __str__(self):
         return str(self.id)
 
     def save(self, *args, **kwargs):
         """
-        Overriden to save a new feed to the DB the first time the instance is saved.
+        Overriden to save the instance's root and ancestry path and a new feed to the
+        DB the first time the instance is saved.
         """
         super(PluginInstance, self).save(*args, **kwargs)
+        if not self.path:
+            self._save_ancestry()
         if not hasattr(self, 'feed') and self.plugin.type=='fs':
             self._save_feed()
-            
+
+    def _save_ancestry(self):
+        """
+        Custom method to compute and save the instance's root and ancestry path.
+        """
+        if self.previous:
+            self.root_id = self.previous.root_id
+            self.path = '{0}{1}/'.format(self.previous.path, self.id)
+        else:
+            self.root_id = self.id
+            self.path = '/{0}/'.format(self.id)
+        PluginInstance.objects.filter(pk=self.pk).update(root=self.root_id,
+                                                         path=self.path)
+
+    def get_ancestors(self):
+        """
+        Custom method to return the list of plugin instances from the root plugin
+        instance down to this plugin instance.
+        """
+        ids = [int(id) for id in self.path.strip('/').split('/')]
+        instances = PluginInstance.objects.filter(pk__in=ids).select_related('plugin',
+                                                                             'feed')
+        instances_by_id = {inst.id: inst for inst in instances}
+        return [instances_by_id[id] for id in ids]
+
     def _save_feed(self):
         """
         Custom method to create and save a new feed to the DB.
@@ -222,14 +271,31 @@ class PluginInstance(models.Model):
         feed.owner = [self.owner]
         feed.save()
 
+    def release_next_jobs(self):
+        """
+        Custom method to release the dispatch jobs of the next plugin instances that
+        wait for this plugin instance to finish. The jobs are queued when this instance
+        finished successfully, otherwise the jobs of all the waiting descendant
+        instances fail. Return the number of released jobs.
+        """
+        waiting_jobs = PluginInstanceJob.objects.filter(status='waiting')
+        if self.status == 'finishedSuccessfully':
+            return waiting_jobs.filter(plugin_inst__previous=self).update(
+                status='queued', next_attempt_date=timezone.now())
+        # MySQL can not update a table filtered by a subquery on the same table
+        ids = list(waiting_jobs.filter(
+            plugin_inst__root_id=self.root_id,
+            plugin_inst__path__startswith=self.path).exclude(
+            plugin_inst=self).values_list('plugin_inst_id', flat=True))
+        PluginInstance.objects.filter(pk__in=ids).update(status='finishedWithError',
+                                                         end_date=timezone.now())
+        return waiting_jobs.filter(plugin_inst_id__in=ids).update(status='failed')
+
     def get_root_instance(self):
         """
         Custom method to return the root plugin instance for this plugin instance.
         """
-        current = self
-        while not current.plugin.type == 'fs':
-            current = current.previous
-        return current
+        return self.root
             
     def get_output_path(self):
         """
@@ -241,40 +307,81 @@ class PluginInstance(models.Model):
         # 'ds' plugins will output files to:
         # SWIFT_CONTAINER_NAME/<username>/feed_<id>/...
         #/previous_plugin_name_plugin_inst_<id>/plugin_name_plugin_inst_<id>/data
-        current = self
-        path = '/{0}_{1}/data'.format(current.plugin.name, current.id)
-        while not current.plugin.type == 'fs':
-            current = current.previous
-            path = '/{0}_{1}'.format(current.plugin.name, current.id) + path
+        ancestors = self.get_ancestors()
+        path = ''.join(['/{0}_{1}'.format(inst.plugin.name, inst.id) for inst in ancestors])
         username = self.owner.username
-        output_path = '{0}/feed_{1}'.format(username, current.feed.id) + path
+        output_path = '{0}/feed_{1}{2}/data'.format(username, ancestors[0].feed.id, path)
         return output_path
 
+    def get_parameter_dict(self):
+        """
+        Custom method to get a dictionary with the values of the plugin instance's
+        parameters keyed by parameter name.
+        """
+        parameter_dict = {}
+        for param_type in ('string_param', 'int_param', 'float_param', 'bool_param',
+                           'path_param'):
+            for param in getattr(self, param_type).all():
+                parameter_dict[param.plugin_param.name] = str(param.value)
+        return parameter_dict
+
     def register_output_files(self):
         """
         Custom method to register files generated by the plugin instance object
-        with the REST API.
+        with the REST API. The Swift listing is consumed in pages and the files are
+        inserted in batches. Files that are already registered are skipped so the
+        method can safely be called several times for the same plugin instance.
+        When deduplication is enabled the content of the new files is hashed and only
+        stored once. No transaction is kept open while the files are hashed and copied
+        so that the references to their content are only locked for a short time.
+        Return the number of newly registered files.
         """
-        # initiate a Swift service connection
-        conn = swiftclient.Connection(
-            user=settings.SWIFT_USERNAME,
-            key=settings.SWIFT_KEY,
-            authurl=settings.SWIFT_AUTH_URL,
-        )
         output_path = self.get_output_path()
-        # get the full list of objects with prefix output_path in Swift storage
-        object_list = conn.get_container(settings.SWIFT_CONTAINER_NAME, prefix=output_path,
-                                         full_listing=True)[1]
         root_instance = self.get_root_instance()
         feed = root_instance.feed
+        batch_size = settings.OUTPUT_FILES_REGISTRATION_BATCH_SIZE
         fileCount = 0
-        for object in object_list:
-            feedfile = FeedFile(plugin_inst=self, feed=feed)
-            feedfile.fname.name = object['name']
-            feedfile.save()
-            fileCount += 1
+        marker = ''
+        # take an already authenticated Swift service connection from the pool
+        with swift_pool.connection() as conn:
+            while True:
+                # get the next page of objects with prefix output_path in Swift storage
+                object_list = conn.get_container(settings.SWIFT_CONTAINER_NAME,
+                                                 prefix=output_path, marker=marker,
+                                                 limit=batch_size)[1]
+                if not object_list:
+                    break
+                names = [object['name'] for object in object_list]
+                registered_names = set(FeedFile.objects.filter(
+                    plugin_inst=self, fname__in=names).values_list('fname', flat=True))
+                feedfiles = []
+                for name in names:
+                    if name not in registered_names:
+                        feedfile = FeedFile(plugin_inst=self, feed=feed)
+                        feedfile.fname.name = name
+                        if settings.DEDUPLICATE_FILES:
+                            self._deduplicate_output_file(feedfile)
+                        feedfiles.append(feedfile)
+                FeedFile.objects.bulk_create(feedfiles, batch_size=batch_size)
+                fileCount += len(feedfiles)
+                # a page can be shorter than requested (eg. Swift caps the listing's
+                # limit), so the listing is only over once an empty page is returned
+                marker = names[-1]
         return fileCount
 
+    def _deduplicate_output_file(self, feedfile):
+        """
+        Custom method to hash the content of an output file by streaming it from the
+        storage and replace it by a reference to the stored content with the same hash.
+        """
+        storage = feedfile.fname.storage
+        name = feedfile.fname.name
+        feedfile.sha256 = hash_chunks(iter_file_content(
+            storage, name, settings.FILE_DOWNLOAD_CHUNK_SIZE))
+        reference_blob(feedfile.sha256)
+        if hasattr(storage, 'deduplicate'):
+            storage.deduplicate(name, feedfile.sha256)
+
 
 class PluginInstanceFilter(FilterSet):
     min_start_date = django_filters.DateFilter(name="start_date", lookup_expr='gte')
@@ -288,17 +395,11 @@ class PluginInstanceFilter(FilterSet):
         Custom method to return the plugin instances in a queryset with a common root
         plugin instance.
         """
-        filtered_queryset = []
-        root_queryset = queryset.filter(pk=value)
-        # check whether the root id value is in the DB 
-        if not root_queryset.exists():
-            return root_queryset
-        queue = [root_queryset[0]]
-        while len(queue) > 0:
-            visited = queue.pop()
-            queue.extend(list(visited.next.all()))
-            filtered_queryset.append(visited)
-        return filtered_queryset     
+        root = queryset.filter(pk=value).values('root_id', 'path').first()
+        # check whether the root id value is in the DB
+        if root is None:
+            return queryset.none()
+        return queryset.filter(root_id=root['root_id'], path__startswith=root['path'])
 
     class Meta:
         model = PluginInstance
@@ -306,6 +407,24 @@ class PluginInstanceFilter(FilterSet):
                   'min_end_date', 'max_end_date']
         
         
+class PluginInstanceJob(models.Model):
+    creation_date = models.DateTimeField(auto_now_add=True)
+    status = models.CharField(choices=DISPATCH_STATUS_CHOICES, default='queued',
+                              max_length=20)
+    compute_host = models.CharField(max_length=100, default='host')
+    attempts = models.IntegerField(default=0)
+    next_attempt_date = models.DateTimeField(default=timezone.now)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    plugin_inst = models.OneToOneField(PluginInstance, on_delete=models.CASCADE,
+                                       related_name='job')
+
+    class Meta:
+        ordering = ('creation_date',)
+
+    def __str__(self):
+        return str(self.plugin_inst.id)
+
+
 class StringParameter(models.Model):
     value = models.CharField(max_length=200, blank=True)
     plugin_inst = models.ForeignKey(PluginInstance, on_delete=models.CASCADE,
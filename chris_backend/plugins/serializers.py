@@ -61,6 +61,17 @@ class PluginInstanceSerializer(serializers.HyperlinkedModelSerializer):
                   'float_param', 'bool_param', 'path_param', 'cpu_limit', 'memory_limit',
                   'number_of_workers', 'gpu_limit')
 
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """
+        Custom method to fetch all the relations serialized for each plugin instance
+        along with the queryset so that the number of queries does not grow with the
+        number of serialized plugin instances.
+        """
+        queryset = queryset.select_related('plugin', 'owner', 'previous', 'feed')
+        return queryset.prefetch_related('string_param', 'int_param', 'float_param',
+                                         'bool_param', 'path_param')
+
     @collection_serializer_is_valid
     def is_valid(self, raise_exception=False):
         """
@@ -139,6 +150,14 @@ class PluginInstanceSerializer(serializers.HyperlinkedModelSerializer):
         if val < min_val or val > max_val:
             raise serializers.ValidationError({'detail':"%s out of range." % val_str})
 
+class PluginInstanceStatusSerializer(serializers.HyperlinkedModelSerializer):
+    previous_id = serializers.ReadOnlyField()
+
+    class Meta:
+        model = PluginInstance
+        fields = ('url', 'id', 'previous_id', 'status', 'end_date')
+
+
 class StringParameterSerializer(serializers.HyperlinkedModelSerializer):
     param_name = serializers.ReadOnlyField(source='plugin_param.name')
     plugin_inst = serializers.HyperlinkedRelatedField(view_name='plugininstance-detail',
@@ -203,3 +222,126 @@ PARAMETER_SERIALIZERS={'string': StringParameterSerializer,
                        'boolean': BoolParameterSerializer,
                        'path': PathParameterSerializer }
 
+
+
+class PluginInstancePipelineSerializer(serializers.Serializer):
+    """
+    Serializer for the submission of a pipeline of plugin instances. Each step of the
+    pipeline is a dictionary with a 'plugin_id', an optional dictionary of
+    'parameters' and, for 'ds' plugins, either the 'previous_index' of an earlier
+    step of the pipeline or the 'previous_id' of an existing plugin instance.
+    """
+    steps = serializers.ListField(child=serializers.DictField())
+
+    @collection_serializer_is_valid
+    def is_valid(self, raise_exception=False):
+        """
+        Overriden to generate a properly formatted message for validation errors
+        """
+        return super(PluginInstancePipelineSerializer, self).is_valid(
+            raise_exception=raise_exception)
+
+    def validate_steps(self, steps):
+        """
+        Custom method to check the pipeline's steps. The steps' plugins and existing
+        previous plugin instances are fetched from the DB at once. Return the list of
+        validated steps with their plugin, previous step or instance and a list of
+        (plugin parameter, value) pairs.
+        """
+        if not steps:
+            raise serializers.ValidationError("A pipeline requires at least one step")
+        try:
+            plugin_ids = [int(step['plugin_id']) for step in steps]
+            previous_ids = [int(step['previous_id']) for step in steps
+                            if step.get('previous_id')]
+        except (KeyError, TypeError, ValueError):
+            raise serializers.ValidationError(
+                "Each step requires a valid 'plugin_id' and 'previous_id'")
+        plugins = Plugin.objects.filter(pk__in=plugin_ids).prefetch_related('parameters')
+        plugins = {plugin.id: plugin for plugin in plugins}
+        previous_insts = PluginInstance.objects.filter(pk__in=previous_ids)
+        previous_insts = {inst.id: inst for inst in previous_insts}
+        validated_steps = []
+        for (index, step) in enumerate(steps):
+            if plugin_ids[index] not in plugins:
+                raise serializers.ValidationError(
+                    "Couldn't find any plugin with id %s" % plugin_ids[index])
+            plugin = plugins[plugin_ids[index]]
+            validated_step = {'plugin': plugin, 'previous_index': None,
+                              'previous': None}
+            if plugin.type == 'ds':
+                validated_step.update(self.validate_step_previous(step, index,
+                                                                  previous_insts))
+            validated_step['parameters'] = self.validate_step_parameters(
+                step.get('parameters') or {}, plugin)
+            validated_steps.append(validated_step)
+        return validated_steps
+
+    def validate_step_previous(self, step, index, previous_insts):
+        """
+        Custom method to check that a step of a 'ds' plugin refers to either an
+        earlier step of the pipeline or an existing plugin instance.
+        """
+        previous_index = step.get('previous_index')
+        if previous_index is not None:
+            if not isinstance(previous_index, int) or not 0 <= previous_index < index:
+                raise serializers.ValidationError(
+                    "Step %s must refer to an earlier step of the pipeline" % index)
+            return {'previous_index': previous_index}
+        previous_id = step.get('previous_id')
+        if not previous_id:
+            raise serializers.ValidationError(
+                "A previous step or plugin instance id is required for step %s" % index)
+        if int(previous_id) not in previous_insts:
+            raise serializers.ValidationError(
+                "Couldn't find any 'previous' plugin instance with id %s" % previous_id)
+        return {'previous': previous_insts[int(previous_id)]}
+
+    def validate_step_parameters(self, parameters, plugin):
+        """
+        Custom method to validate the values of a step's parameters with the
+        serializer of each parameter's type.
+        """
+        if not isinstance(parameters, dict):
+            raise serializers.ValidationError("A step's parameters must be a dictionary")
+        validated_parameters = []
+        for parameter in plugin.parameters.all():
+            if parameter.name in parameters:
+                data = {'value': parameters[parameter.name]}
+                parameter_serializer = PARAMETER_SERIALIZERS[parameter.type](data=data)
+                if not parameter_serializer.is_valid():
+                    raise serializers.ValidationError(
+                        {parameter.name: parameter_serializer.errors['value']})
+                value = parameter_serializer.validated_data['value']
+                validated_parameters.append((parameter, value))
+        return validated_parameters
+
+    def create(self, validated_data):
+        """
+        Overriden to create the plugin instances of all the pipeline's steps and
+        their parameters. The instances are saved one by one as their ids are needed
+        by the next steps while all their parameters are inserted in bulk.
+        """
+        owner = validated_data['owner']
+        plugin_insts = []
+        parameters = {}
+        for step in validated_data['steps']:
+            plugin = step['plugin']
+            previous = step['previous']
+            if step['previous_index'] is not None:
+                previous = plugin_insts[step['previous_index']]
+            plugin_inst = PluginInstance(plugin=plugin, owner=owner, previous=previous,
+                                         status='queued',
+                                         gpu_limit=plugin.min_gpu_limit,
+                                         number_of_workers=plugin.min_number_of_workers,
+                                         cpu_limit=CPUInt(plugin.min_cpu_limit),
+                                         memory_limit=MemoryInt(plugin.min_memory_limit))
+            plugin_inst.save()
+            plugin_insts.append(plugin_inst)
+            for (parameter, value) in step['parameters']:
+                model = PARAMETER_SERIALIZERS[parameter.type].Meta.model
+                parameters.setdefault(model, []).append(
+                    model(plugin_inst=plugin_inst, plugin_param=parameter, value=value))
+        for (model, objs) in parameters.items():
+            model.objects.bulk_create(objs)
+        return plugin_insts
@@ -0,0 +1,97 @@
+"""
+Optional audit log of the messages sent to pfcon to run plugin instances. Each message
+is recorded as a JSON line in a rotating file written by a background thread, so that
+launching a job never waits on disk I/O. The log is disabled by default.
+"""
+
+import os
+import json
+import queue
+import atexit
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from django.conf import settings
+from django.utils import timezone
+
+
+class DispatchAuditLog(object):
+    """
+    A process-wide dispatch audit log configured by the PLUGIN_DISPATCH_AUDIT_LOG
+    setting. The background writer thread is started on the first record of each
+    process and restarted when the log's configuration changes.
+    """
+
+    def __init__(self, name='plugins.dispatch_audit'):
+        self.logger = logging.getLogger(name)
+        self.logger.setLevel(logging.INFO)
+        # the records must not reach the application's own log handlers
+        self.logger.propagate = False
+        self._lock = threading.Lock()
+        self._listener = None
+        self._key = None
+
+    def get_config(self):
+        """
+        Get the log's configuration as a (filename, max bytes, backup count) tuple.
+        """
+        config = settings.PLUGIN_DISPATCH_AUDIT_LOG
+        return (config['filename'], config['max_bytes'], config['backup_count'])
+
+    def is_enabled(self):
+        """
+        Whether the dispatch messages are recorded.
+        """
+        return bool(settings.PLUGIN_DISPATCH_AUDIT_LOG['filename'])
+
+    def start(self):
+        """
+        Start the background writer thread of the current process for the current
+        configuration unless it is already running.
+        """
+        key = (os.getpid(),) + self.get_config()
+        with self._lock:
+            if self._key == key:
+                return
+            self._stop()
+            (filename, max_bytes, backup_count) = key[1:]
+            handler = RotatingFileHandler(filename, maxBytes=max_bytes,
+                                          backupCount=backup_count, delay=True)
+            records = queue.Queue()
+            self._listener = QueueListener(records, handler)
+            self._listener.start()
+            self.logger.handlers = [QueueHandler(records)]
+            self._key = key
+
+    def _stop(self):
+        if self._listener is not None and self._key[0] == os.getpid():
+            # wait for the queued records to be written
+            self._listener.stop()
+            for handler in self._listener.handlers:
+                handler.close()
+        self.logger.handlers = []
+        self._listener = None
+        self._key = None
+
+    def stop(self):
+        """
+        Write the queued records and stop the background writer thread.
+        """
+        with self._lock:
+            self._stop()
+
+    def record(self, plugin_inst_id, d_msg):
+        """
+        Record a message sent to pfcon to run a plugin instance.
+        """
+        if not self.is_enabled():
+            return
+        self.start()
+        self.logger.info(json.dumps({'date': timezone.now().isoformat(),
+                                     'plugin_inst': plugin_inst_id,
+                                     'msg': d_msg}, default=str))
+
+
+dispatch_audit_log = DispatchAuditLog()
+atexit.register(dispatch_audit_log.stop)
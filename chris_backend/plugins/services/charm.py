@@ -17,6 +17,39 @@ from urllib.parse import urlparse, parse_qs
 from django.utils import timezone
 from django.conf import settings
 
+from plugins.services.pfcon import pfcon_client
+from plugins.services.audit import dispatch_audit_log
+
+
+class CharmDebug():
+    """
+    Debug output sink that only creates its underlying pfmisc debug object the first
+    time a message is actually printed. Messages above the verbosity level are
+    discarded before any formatting or stack inspection.
+    """
+
+    def __init__(self, **kwargs):
+        self.verbosity  = 0
+        self.within     = ''
+        for key, val in kwargs.items():
+            if key == 'verbosity':  self.verbosity  = val
+            if key == 'within':     self.within     = val
+        self._dp        = None
+
+    def enabled(self, level = 0):
+        """
+        Whether messages of the given level are printed.
+        """
+        return level <= self.verbosity
+
+    def qprint(self, msg, **kwargs):
+        if not self.enabled(kwargs.get('level', 0)):
+            return
+        if self._dp is None:
+            self._dp    = pfmisc.debug(verbosity = self.verbosity, within = self.within)
+        self._dp.verbosity = self.verbosity
+        self._dp.qprint(msg, **kwargs)
+
 
 class Charm():
 
@@ -30,8 +63,25 @@ class Charm():
         if len(args):
             self._log = args[0]
         else:
+            if self._log is None:
+                self._log               = pfurl.Message()
+                self._log._b_syslog     = True
             return self._log
 
+    @property
+    def debug(self):
+        """
+        The debug file log, only created (along with its directory) when first used.
+        """
+        if self._debug is None:
+            str_debugDir    = os.path.dirname(self.str_debugFile)
+            if str_debugDir and not os.path.exists(str_debugDir):
+                os.makedirs(str_debugDir)
+            self._debug                 = pfurl.Message(logTo = self.str_debugFile)
+            self._debug._b_syslog       = True
+            self._debug._b_flushNewLine = True
+        return self._debug
+
     def name(self, *args):
         """
         get/set the descriptive name text of this object.
@@ -101,15 +151,13 @@ class Charm():
     def __init__(self, **kwargs):
         # threading.Thread.__init__(self)
 
-        self._log                   = pfurl.Message()
-        self._log._b_syslog         = True
+        # the logs are only created when first used
+        self._log                   = None
+        self._debug                 = None
         self.__name__               = "Charm"
         self.b_useDebug             = settings.CHRIS_DEBUG['useDebug']
 
-        str_debugDir                = '%s/tmp' % os.environ['HOME']
-        if not os.path.exists(str_debugDir):
-            os.makedirs(str_debugDir)
-        self.str_debugFile          = '%s/debug-charm.log' % str_debugDir
+        self.str_debugFile          = '%s/tmp/debug-charm.log' % os.environ['HOME']
 
         if len(settings.CHRIS_DEBUG['debugFile']):
             self.str_debugFile      = settings.CHRIS_DEBUG['debugFile']
@@ -123,10 +171,9 @@ class Charm():
         self.d_msg                  = {}
         self.str_protocol           = "http"
 
-        self.dp                     = pfmisc.debug(    
+        self.dp                     = CharmDebug(
                                             verbosity   = 0,
-                                            level       = -1,
-                                            within      = self.__name__ 
+                                            within      = self.__name__
                                             )
 
         self.pp                     = pprint.PrettyPrinter(indent=4)
@@ -164,11 +211,6 @@ class Charm():
             if key == 'quiet':          self.b_quiet           = val
             if key == 'IOPhost':        self.str_IOPhost       = val
 
-        if self.b_useDebug:
-            self.debug                  = pfurl.Message(logTo = self.str_debugFile)
-            self.debug._b_syslog        = True
-            self.debug._b_flushNewLine  = True
-
         if self.b_quiet:
             self.dp.verbosity = -10
 
@@ -179,36 +221,14 @@ class Charm():
         except:
             self.d_pluginInst   = {}
 
-        # pudb.set_trace()
-
-        if not self.b_quiet:
-            print(pfurl.Colors.LIGHT_GREEN)
-            print("""
-            \t\t\t+---------------------+
-            \t\t\t|  Welcome to charm!  |
-            \t\t\t+---------------------+
-            """)
-            print(pfurl.Colors.CYAN + """
-            'charm' is the interface class/code between ChRIS and a remote 
-            REST-type server, typically 'pfcon'.
-
-            """)
-            if self.b_useDebug:
-                print("""
-            Debugging output is directed to the file '%s'.
-                """ % (self.str_debugFile))
-            else:
-                print("""
-            Debugging output will appear in *this* console.
-                """)
-
-        self.dp.qprint('d_args         = %s'   % self.pp.pformat(self.d_args).strip())
-        self.dp.qprint('app_args       = %s'   % self.l_appArgs)
-        self.dp.qprint('d_pluginInst   = %s'   % self.pp.pformat(self.d_pluginInst).strip())
-        self.dp.qprint('d_pluginRepr   = %s'   % self.pp.pformat(self.d_pluginRepr).strip())
-        self.dp.qprint('app            = %s'   % self.app)
-        self.dp.qprint('inputdir       = %s'   % self.str_inputdir)
-        self.dp.qprint('outputdir      = %s'   % self.str_outputdir)
+        if self.dp.enabled():
+            self.dp.qprint('d_args         = %s'   % self.pp.pformat(self.d_args).strip())
+            self.dp.qprint('app_args       = %s'   % self.l_appArgs)
+            self.dp.qprint('d_pluginInst   = %s'   % self.pp.pformat(self.d_pluginInst).strip())
+            self.dp.qprint('d_pluginRepr   = %s'   % self.pp.pformat(self.d_pluginRepr).strip())
+            self.dp.qprint('app            = %s'   % self.app)
+            self.dp.qprint('inputdir       = %s'   % self.str_inputdir)
+            self.dp.qprint('outputdir      = %s'   % self.str_outputdir)
 
     def app_manage(self, **kwargs):
         """
@@ -333,30 +353,11 @@ class Charm():
 
         # pudb.set_trace()
 
-        str_setting     = 'settings.%s' % str_service.upper()
-        str_http        = '%s:%s' % (eval(str_setting)['host'], 
-                                     eval(str_setting)['port'])
         if str_service == 'pman': b_httpResponseBodyParse = False
 
-        str_debugFile       = '%s/tmp/debug-pfurl.log' % os.environ['HOME']
-        if self.str_debugFile == '/dev/null':
-            str_debugFile   = self.str_debugFile
-
-        serviceCall = pfurl.Pfurl(
-            msg                     = json.dumps(d_msg),
-            http                    = str_http,
-            verb                    = 'POST',
-            # contentType             = 'application/json',
-            b_raw                   = True,
-            b_quiet                 = self.b_quiet,
-            b_httpResponseBodyParse = b_httpResponseBodyParse,
-            jsonwrapper             = 'payload',
-            debugFile               = str_debugFile,
-            useDebug                = self.b_useDebug
-        )
-
-        # speak to the service...
-        d_response      = json.loads(serviceCall())
+        # speak to the service through the pooled keep-alive client...
+        d_response      = pfcon_client.post(str_service, d_msg,
+                                            parse_body = b_httpResponseBodyParse)
         if not b_httpResponseBodyParse:
             d_response  = parse_qs(d_response)
         return d_response
@@ -585,25 +586,25 @@ class Charm():
                     "service":              str_IOPhost
                 }
             }
-            str_dmsg = self.pp.pformat(d_msg).strip()
             # pudb.set_trace()
-            if os.path.exists('/data'):
-                if not os.path.exists('/data/tmp'):
-                    os.makedirs('/data/tmp')
-                self.dp.qprint(str_dmsg, teeFile = '/data/tmp/dmsg-exec.json', teeMode = 'w+')
-            else:
-                self.dp.qprint(str_dmsg, teeFile = '/tmp/dmsg-exec.json', teeMode = 'w+')
+            if self.dp.enabled():
+                self.dp.qprint(self.pp.pformat(d_msg).strip())
+            dispatch_audit_log.record(self.d_pluginInst['id'], d_msg)
 
         d_response  = self.app_service_call(msg = d_msg, **kwargs)
 
         if isinstance(d_response, dict):
             self.dp.qprint("looks like we got a successful response from %s" % str_service)
-            self.dp.qprint('response from pfurl(): %s ' % json.dumps(d_response, indent=2))
+            if self.dp.enabled():
+                self.dp.qprint('response from pfurl(): %s ' % json.dumps(d_response, indent=2))
         else:
             self.dp.qprint("looks like we got an UNSUCCESSFUL response from %s" % str_service)
             self.dp.qprint('response from pfurl(): %s' % d_response)
             if "Connection refused" in d_response:
                 self.dp.qprint('fatal error in talking to %s' % str_service, comms = 'error')
+            # let the caller retry or fail the dispatch
+            raise ConnectionError("Couldn't run plugin instance %s through %s: %s" %
+                                  (self.d_pluginInst['id'], str_service, d_response))
 
     def app_statusCheckAndRegister(self, *args, **kwargs):
         """
@@ -626,6 +627,10 @@ class Charm():
         # pudb.set_trace()
         d_response  = self.app_service_call(msg = d_msg, service = 'pfcon', **kwargs)
         self.dp.qprint('d_response = %s' % d_response)
+        if not isinstance(d_response, dict):
+            raise ConnectionError("Couldn't check the status of plugin instance %s "
+                                  "through pfcon: %s" % (self.d_pluginInst['id'],
+                                                         d_response))
 
         str_responseStatus  = ""
         for str_action in ['pushPath', 'compute', 'pullPath']:
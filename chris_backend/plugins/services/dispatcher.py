@@ -0,0 +1,237 @@
+"""
+Plugin instance dispatcher module that provides a DB-backed job queue and a pool of
+worker processes to run plugin apps outside of the HTTP request/response cycle.
+"""
+
+import os
+import sys
+import time
+import datetime
+import multiprocessing
+from argparse import ArgumentParser
+
+if "DJANGO_SETTINGS_MODULE" not in os.environ:
+    # django needs to be loaded (eg. when this script is run from the command line)
+    sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.local")
+    import django
+    django.setup()
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Count, F
+from django.utils import timezone
+
+from plugins.models import PluginInstance, PluginInstanceJob, TERMINAL_STATUS_TYPES
+from plugins.services.manager import PluginManager
+
+
+class PluginInstanceDispatcher(object):
+    def __init__(self):
+        parser = ArgumentParser(description='Dispatch queued plugin instances')
+        parser.add_argument("-w", "--workers", type=int, default=1,
+                            help="number of worker processes")
+        parser.add_argument("--once", action='store_true',
+                            help="dispatch the currently queued jobs and exit")
+        self.parser = parser
+
+        self.max_attempts = settings.PLUGIN_DISPATCH['max_attempts']
+        self.backoff = settings.PLUGIN_DISPATCH['backoff']
+        self.max_concurrency_per_host = settings.PLUGIN_DISPATCH['max_concurrency_per_host']
+        self.poll_interval = settings.PLUGIN_DISPATCH['poll_interval']
+        self.claim_timeout = settings.PLUGIN_DISPATCH['claim_timeout']
+
+    @staticmethod
+    def enqueue(plugin_inst, compute_host='host'):
+        """
+        Add a plugin instance to the dispatch queue.
+        """
+        return PluginInstanceJob.objects.create(plugin_inst=plugin_inst,
+                                                compute_host=compute_host)
+
+    @staticmethod
+    def enqueue_pipeline(plugin_insts, compute_host='host'):
+        """
+        Add the plugin instances of a pipeline to the dispatch queue at once. The
+        instances wait for their previous instance, whether it is part of the pipeline
+        or not, to finish successfully before being dispatched. The instances whose
+        previous instance already finished with error fail at once along with their
+        descendants.
+        """
+        jobs = []
+        failed_insts = []
+        for plugin_inst in plugin_insts:
+            previous = plugin_inst.previous
+            status = 'queued'
+            if previous is not None and previous.status != 'finishedSuccessfully':
+                status = 'waiting'
+                if previous.status == 'finishedWithError':
+                    status = 'failed'
+                    failed_insts.append(plugin_inst)
+            jobs.append(PluginInstanceJob(plugin_inst=plugin_inst,
+                                          compute_host=compute_host, status=status))
+        jobs = PluginInstanceJob.objects.bulk_create(jobs)
+        for plugin_inst in failed_insts:
+            plugin_inst.status = 'finishedWithError'
+            plugin_inst.end_date = timezone.now()
+            plugin_inst.save()
+            plugin_inst.release_next_jobs()
+        return jobs
+
+    @staticmethod
+    def release_pipeline(plugin_insts):
+        """
+        Release the waiting jobs of the plugin instances of a pipeline whose previous
+        instance outside the pipeline has finished since the pipeline was enqueued. Meant
+        to be called once the pipeline's jobs are committed as the jobs that were not
+        committed yet when the previous instance finished are not released by it.
+        """
+        ids = set(plugin_inst.id for plugin_inst in plugin_insts)
+        previous_ids = set(plugin_inst.previous_id for plugin_inst in plugin_insts
+                           if plugin_inst.previous_id
+                           and plugin_inst.previous_id not in ids)
+        finished = PluginInstance.objects.filter(pk__in=previous_ids,
+                                                 status__in=TERMINAL_STATUS_TYPES)
+        for previous in finished:
+            previous.release_next_jobs()
+
+    def get_stale_claim_date(self):
+        """
+        Get the date before which a job still being dispatched is considered abandoned.
+        """
+        return timezone.now() - datetime.timedelta(seconds=self.claim_timeout)
+
+    def get_busy_hosts(self):
+        """
+        Get the compute hosts that already have the maximum number of jobs being
+        dispatched. Abandoned jobs do not count.
+        """
+        jobs = PluginInstanceJob.objects.filter(
+            status='dispatching', claimed_at__gte=self.get_stale_claim_date())
+        counts = jobs.order_by().values('compute_host').annotate(count=Count('id'))
+        return [c['compute_host'] for c in counts
+                if c['count'] >= self.max_concurrency_per_host]
+
+    def claim_next_job(self):
+        """
+        Claim the next queued job that is ready to be dispatched. The claim is an
+        atomic conditional update so that several workers can safely share the queue.
+        """
+        jobs = PluginInstanceJob.objects.filter(status='queued',
+                                                next_attempt_date__lte=timezone.now())
+        busy_hosts = self.get_busy_hosts()
+        if busy_hosts:
+            jobs = jobs.exclude(compute_host__in=busy_hosts)
+        for job in jobs[:self.max_concurrency_per_host]:
+            claimed = PluginInstanceJob.objects.filter(pk=job.pk, status='queued').update(
+                status='dispatching', attempts=F('attempts') + 1,
+                claimed_at=timezone.now())
+            if claimed:
+                job.refresh_from_db()
+                return job
+        return None
+
+    def dispatch(self, job):
+        """
+        Run the plugin app for the job's plugin instance. Failed dispatches are
+        requeued with an exponential backoff until the maximum number of attempts.
+        """
+        plugin_inst = job.plugin_inst
+        plugin_inst.status = 'started'
+        plugin_inst.save()
+        try:
+            pl_manager = PluginManager()
+            pl_manager.run_plugin_app(plugin_inst,
+                                      plugin_inst.get_parameter_dict(),
+                                      service='pfcon',
+                                      inputDirOverride='/share/incoming',
+                                      outputDirOverride='/share/outgoing',
+                                      IOPhost=job.compute_host)
+        except Exception:
+            self.retry_or_fail(job)
+        else:
+            job.status = 'dispatched'
+        job.save()
+        return job
+
+    def retry_or_fail(self, job):
+        """
+        Requeue a job whose dispatch attempt failed with an exponential backoff or fail
+        it along with its plugin instance after the maximum number of attempts.
+        """
+        plugin_inst = job.plugin_inst
+        if job.attempts >= self.max_attempts:
+            job.status = 'failed'
+            plugin_inst.status = 'finishedWithError'
+            plugin_inst.end_date = timezone.now()
+            plugin_inst.save()
+            plugin_inst.release_next_jobs()
+        else:
+            job.status = 'queued'
+            delay = self.backoff * 2 ** (job.attempts - 1)
+            job.next_attempt_date = timezone.now() + datetime.timedelta(seconds=delay)
+            plugin_inst.status = 'queued'
+            plugin_inst.save()
+
+    def requeue_abandoned_jobs(self):
+        """
+        Retry the jobs whose worker died while dispatching them, as if their dispatch
+        attempt had failed. Return the number of retried jobs.
+        """
+        count = 0
+        jobs = PluginInstanceJob.objects.filter(
+            status='dispatching', claimed_at__lt=self.get_stale_claim_date())
+        for job in jobs.select_related('plugin_inst'):
+            # another worker might be requeuing the same job
+            reclaimed = PluginInstanceJob.objects.filter(
+                pk=job.pk, status='dispatching', claimed_at=job.claimed_at).update(
+                claimed_at=timezone.now())
+            if reclaimed:
+                self.retry_or_fail(job)
+                job.save()
+                count += 1
+        return count
+
+    def dispatch_queued_jobs(self):
+        """
+        Dispatch all the jobs that are currently ready to be dispatched.
+        """
+        self.requeue_abandoned_jobs()
+        count = 0
+        job = self.claim_next_job()
+        while job is not None:
+            self.dispatch(job)
+            count += 1
+            job = self.claim_next_job()
+        return count
+
+    def run_worker(self):
+        """
+        Worker loop that polls the queue for jobs to be dispatched.
+        """
+        while True:
+            if not self.dispatch_queued_jobs():
+                time.sleep(self.poll_interval)
+
+    def run(self, args=None):
+        """
+        Parse the arguments passed to the dispatcher and start the worker processes.
+        """
+        options = self.parser.parse_args(args)
+        self.args = options
+        if options.once:
+            return self.dispatch_queued_jobs()
+        # DB connections can not be shared with the forked worker processes
+        connections.close_all()
+        workers = [multiprocessing.Process(target=self.run_worker)
+                   for i in range(options.workers)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+
+# ENTRYPOINT
+if __name__ == "__main__":
+    dispatcher = PluginInstanceDispatcher()
+    dispatcher.run()
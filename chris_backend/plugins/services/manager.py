@@ -21,8 +21,10 @@ if "DJANGO_SETTINGS_MODULE" not in os.environ:
 
 from django.utils import timezone
 from plugins.models import Plugin, PluginParameter, TYPES, PLUGIN_TYPE_CHOICES, STATUS_TYPES
+from plugins.models import TERMINAL_STATUS_TYPES
 from plugins.models import CPUInt, MemoryInt
 from plugins.services import charm
+from plugins.cache import invalidate_plugin_metadata
 
 
 class PluginManager(object):
@@ -63,6 +65,29 @@ class PluginManager(object):
                              % (plugin_types, dock_image_name))
         return app_repr
 
+    def get_registered_plugin_app_representation(self, plugin):
+        """
+        Get a plugin app representation from the data stored in the DB at registration
+        time. This avoids pulling and running the plugin's docker image every time the
+        representation is needed (eg. when running the plugin's app).
+        """
+        # plugins registered before the representation was stored in the DB need to
+        # get it once from the corresponding app
+        if not plugin.selfexec:
+            app_repr = self.get_plugin_app_representation(plugin.dock_image)
+            self._save_plugin_app_representation(plugin, app_repr)
+            return app_repr
+        app_repr = {'type': plugin.type, 'selfpath': plugin.selfpath,
+                    'selfexec': plugin.selfexec, 'execshell': plugin.execshell}
+        parameters = []
+        for param in plugin.parameters.all():
+            parameters.append({'name': param.name, 'type': TYPES[param.type],
+                               'optional': param.optional, 'default': param.default,
+                               'help': param.help, 'flag': param.flag,
+                               'action': param.action})
+        app_repr['parameters'] = parameters
+        return app_repr
+
     def get_plugin_name(self, app_repr):
         """
         Get a plugin app's name from the plugin app's representation.
@@ -72,6 +97,19 @@ class PluginManager(object):
             raise KeyError("Missing 'selfexec' from plugin app's representation")
         return app_repr['selfexec'].rsplit( ".", 1 )[ 0 ]
 
+    def _save_plugin_app_representation(self, plugin, app_repr):
+        """
+        Internal method to save the parts of a plugin app representation needed to run
+        the app into the DB of a plugin registered before they were stored.
+        """
+        plugin.selfpath = app_repr['selfpath']
+        plugin.selfexec = app_repr['selfexec']
+        plugin.execshell = app_repr['execshell']
+        plugin.save(update_fields=['selfpath', 'selfexec', 'execshell'])
+        for param in app_repr['parameters']:
+            plugin.parameters.filter(name=param['name']).update(flag=param['flag'],
+                                                                action=param['action'])
+
     def _save_plugin_param(self, plugin, param):
         """
         Internal method to save a plugin parameter into the DB.
@@ -88,6 +126,8 @@ class PluginManager(object):
         else:
             plugin_param.default = str(param['default'])
         plugin_param.help = param['help']
+        plugin_param.flag = param['flag']
+        plugin_param.action = param['action']
         plugin_param.save()
         
     def add_plugin(self, dock_image_name):
@@ -119,6 +159,9 @@ class PluginManager(object):
         plugin.documentation = app_repr['documentation']
         plugin.license       = app_repr['license']
         plugin.version       = app_repr['version']
+        plugin.selfpath      = app_repr['selfpath']
+        plugin.selfexec      = app_repr['selfexec']
+        plugin.execshell     = app_repr['execshell']
         plugin.max_cpu_limit         = self.insert_default(max_cpu_limit, CPUInt(Plugin.maxint))
         plugin.min_cpu_limit         = self.insert_default(min_cpu_limit,
                                                            Plugin.defaults['cpu_limit'])
@@ -135,6 +178,7 @@ class PluginManager(object):
         params = app_repr['parameters']
         for param in params:
             self._save_plugin_param(plugin, param)
+        invalidate_plugin_metadata()
 
     def get_plugin(self, name):
         """
@@ -152,6 +196,7 @@ class PluginManager(object):
         """
         plugin = self.get_plugin(name)
         plugin.delete()
+        invalidate_plugin_metadata()
 
     def register_plugin_app_modification(self, dock_image_name):
         """
@@ -177,6 +222,9 @@ class PluginManager(object):
         plugin.documentation = app_repr['documentation']
         plugin.license       = app_repr['license']
         plugin.version       = app_repr['version']
+        plugin.selfpath      = app_repr['selfpath']
+        plugin.selfexec      = app_repr['selfexec']
+        plugin.execshell     = app_repr['execshell']
         plugin.max_cpu_limit         = self.insert_default(max_cpu_limit, Plugin.maxint)
         plugin.min_cpu_limit         = self.insert_default(min_cpu_limit,
                                                            Plugin.defaults['cpu_limit'])
@@ -188,15 +236,22 @@ class PluginManager(object):
         plugin.max_gpu_limit         = self.insert_default(max_gpu_limit, Plugin.maxint)
         plugin.min_gpu_limit         = self.insert_default(min_gpu_limit, 0)
 
-        # add there are new parameters then add them
+        # add there are new parameters then add them, otherwise refresh the stored
+        # flag and action of the existing ones
         new_params = app_repr['parameters']
-        existing_param_names = [parameter.name for parameter in plugin.parameters.all()]
+        existing_params = {param.name: param for param in plugin.parameters.all()}
         for param in new_params:
-            if param['name'] not in existing_param_names:
+            if param['name'] not in existing_params:
                 self._save_plugin_param(plugin, param)
+            else:
+                plugin_param = existing_params[param['name']]
+                plugin_param.flag = param['flag']
+                plugin_param.action = param['action']
+                plugin_param.save()
 
         plugin.modification_date = timezone.now()
         plugin.save()
+        invalidate_plugin_metadata()
 
     def get_gpu_limit(self, app_repr):
         """
@@ -310,7 +365,7 @@ class PluginManager(object):
             if k == 'outputDirOverride':    str_outputDirOverride   = v
             if k == 'IOPhost':              self.str_IOPhost        = v
 
-        plugin_repr = self.get_plugin_app_representation(plugin_inst.plugin.dock_image)
+        plugin_repr = self.get_registered_plugin_app_representation(plugin_inst.plugin)
         # get input dir
         inputdir            = ""
         inputdirManagerFS   = ""
@@ -411,11 +466,18 @@ class PluginManager(object):
         service to determine job status.
         """
         str_responseStatus  = ''
+        # plugin instances still waiting in the dispatch queue are unknown to the
+        # remote service
+        if plugin_inst.status == 'queued':
+            return plugin_inst.status
         # pudb.set_trace()
         chris_service   = charm.Charm(
             plugin_inst = plugin_inst
         )
         str_responseStatus = chris_service.app_statusCheckAndRegister()
+        # the next plugin instances of a pipeline wait for this instance to finish
+        if str_responseStatus in TERMINAL_STATUS_TYPES:
+            plugin_inst.release_next_jobs()
         return str_responseStatus
 
 
@@ -0,0 +1,99 @@
+"""
+Pooled HTTP client to send JSON messages to the remote services (eg. pfcon). The
+connections to a service are kept alive between messages instead of opening a new TCP
+connection for every message.
+"""
+
+import os
+import json
+import threading
+
+import yaml
+import requests
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
+
+from django.conf import settings
+
+
+class PfconClient(object):
+    """
+    A process-wide HTTP client with a bounded pool of keep-alive connections to each
+    remote service. A message is retried with an exponential backoff when the
+    connection to the service can not be established, but never once it has been
+    sent as messages are not idempotent.
+    """
+
+    def __init__(self, pool_size, timeout, retries, backoff):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self._lock = threading.Lock()
+        self._session = None
+        self._pid = None
+
+    def get_session(self):
+        """
+        Get the client's HTTP session. A new session is created in a forked process
+        as connections can not be shared between processes.
+        """
+        with self._lock:
+            if self._session is None or self._pid != os.getpid():
+                retry = Retry(total=self.retries, connect=self.retries, read=0,
+                              status=0, backoff_factor=self.backoff)
+                adapter = HTTPAdapter(pool_maxsize=self.pool_size, max_retries=retry)
+                session = requests.Session()
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._session = session
+                self._pid = os.getpid()
+            return self._session
+
+    def post(self, service, d_msg, parse_body=True):
+        """
+        Send a JSON message to a remote service whose host and port are given by the
+        setting named after the service. Return the service's decoded response or an
+        error message when the service can not be reached.
+        """
+        d_service = getattr(settings, service.upper())
+        url = 'http://%s:%s/' % (d_service['host'], d_service['port'])
+        try:
+            response = self.get_session().post(url,
+                                               data=json.dumps({'payload': d_msg}),
+                                               timeout=self.timeout)
+        except requests.RequestException as e:
+            return str(e)
+        return self.parse_response(response.text, parse_body)
+
+    @staticmethod
+    def parse_response(str_response, parse_body=True):
+        """
+        Decode a service's response. pfcon embeds a whole HTTP response in the body
+        of its responses, in which case the decoded document is the embedded body.
+        Responses that can not be decoded are returned as they are.
+        """
+        if parse_body:
+            try:
+                return yaml.safe_load(str_response.split('\r\n\r\n')[1])
+            except (IndexError, yaml.YAMLError):
+                pass
+        try:
+            return json.loads(str_response)
+        except ValueError:
+            return str_response
+
+    def close(self):
+        """
+        Close all the pooled connections.
+        """
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+            self._session = None
+
+
+pfcon_client = PfconClient(settings.PFCON_CLIENT['pool_size'],
+                           settings.PFCON_CLIENT['timeout'],
+                           settings.PFCON_CLIENT['retries'],
+                           settings.PFCON_CLIENT['backoff'])
@@ -0,0 +1,91 @@
+"""
+Plugin instance status poller module that periodically checks the execution status of
+all the dispatched non-terminal plugin instances with the remote service and saves it
+to the DB, so that API reads can serve the stored status.
+"""
+
+import os
+import sys
+import time
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+
+if "DJANGO_SETTINGS_MODULE" not in os.environ:
+    # django needs to be loaded (eg. when this script is run from the command line)
+    sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.local")
+    import django
+    django.setup()
+
+from django.conf import settings
+from django.db import connection
+
+from plugins.models import PluginInstance, TERMINAL_STATUS_TYPES
+from plugins.services.manager import PluginManager
+
+
+class PluginInstanceStatusPoller(object):
+    def __init__(self):
+        parser = ArgumentParser(description='Poll the status of running plugin instances')
+        parser.add_argument("-i", "--interval", type=float,
+                            default=settings.PLUGIN_STATUS_POLL_INTERVAL,
+                            help="seconds between two consecutive polls")
+        parser.add_argument("--once", action='store_true',
+                            help="poll the status of the plugin instances once and exit")
+        self.parser = parser
+
+    def get_pending_plugin_instances(self):
+        """
+        Get the plugin instances already dispatched to the remote service whose status
+        can still change.
+        """
+        return PluginInstance.objects.filter(job__status='dispatched').exclude(
+            status__in=TERMINAL_STATUS_TYPES).select_related('plugin', 'owner')
+
+    def check_status(self, plugin_inst):
+        """
+        Check the execution status of a plugin instance from a worker thread. Return
+        the status or the error message when the status could not be checked.
+        """
+        try:
+            return PluginManager().check_plugin_app_exec_status(plugin_inst)
+        except Exception as e:
+            # an unreachable job must not prevent checking the remaining ones
+            return str(e)
+        finally:
+            # each worker thread uses its own DB connection
+            connection.close()
+
+    def poll(self):
+        """
+        Check the execution status of all the pending plugin instances concurrently
+        from at most PLUGIN_STATUS_POLL_WORKERS threads, so that a cycle is not the sum
+        of every request to the remote service. Return a dictionary with the status of
+        each plugin instance keyed by id.
+        """
+        plugin_instances = list(self.get_pending_plugin_instances())
+        if not plugin_instances:
+            return {}
+        workers = min(settings.PLUGIN_STATUS_POLL_WORKERS, len(plugin_instances))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            statuses = executor.map(self.check_status, plugin_instances)
+            return {plugin_inst.id: status for (plugin_inst, status)
+                    in zip(plugin_instances, statuses)}
+
+    def run(self, args=None):
+        """
+        Parse the arguments passed to the poller and poll at the requested interval.
+        """
+        options = self.parser.parse_args(args)
+        self.args = options
+        if options.once:
+            return self.poll()
+        while True:
+            self.poll()
+            time.sleep(options.interval)
+
+
+# ENTRYPOINT
+if __name__ == "__main__":
+    poller = PluginInstanceStatusPoller()
+    poller.run()
@@ -0,0 +1,61 @@
+
+import os
+import json
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from plugins.services import audit
+
+
+class DispatchAuditLogTests(TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.test_dir, 'dispatch-audit.log')
+        self.audit_log = audit.DispatchAuditLog(name='plugins.tests.dispatch_audit')
+        self.d_msg = {'action': 'coordinate', 'meta-compute': {'jid': '1'}}
+
+    def tearDown(self):
+        self.audit_log.stop()
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_record_writes_json_lines(self):
+        """
+        Test whether the audit log writes each recorded message as a JSON line.
+        """
+        config = {'filename': self.filename, 'max_bytes': 1024 * 1024,
+                  'backup_count': 1}
+        with override_settings(PLUGIN_DISPATCH_AUDIT_LOG=config):
+            self.audit_log.record(1, self.d_msg)
+            self.audit_log.record(2, self.d_msg)
+            self.audit_log.stop()
+        with open(self.filename) as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual([record['plugin_inst'] for record in records], [1, 2])
+        self.assertEqual(records[0]['msg'], self.d_msg)
+
+    def test_record_rotates_the_log(self):
+        """
+        Test whether the audit log is rotated once it reaches its maximum size.
+        """
+        config = {'filename': self.filename, 'max_bytes': 200, 'backup_count': 1}
+        with override_settings(PLUGIN_DISPATCH_AUDIT_LOG=config):
+            for i in range(5):
+                self.audit_log.record(i, self.d_msg)
+            self.audit_log.stop()
+        self.assertTrue(os.path.exists(self.filename + '.1'))
+        self.assertFalse(os.path.exists(self.filename + '.2'))
+
+    def test_record_does_nothing_when_disabled(self):
+        """
+        Test whether the audit log neither starts a writer thread nor writes any file
+        when it is disabled, which is the default.
+        """
+        with mock.patch.object(audit, 'QueueListener') as listener_mock:
+            self.audit_log.record(1, self.d_msg)
+        listener_mock.assert_not_called()
+        self.assertEqual(os.listdir(self.test_dir), [])
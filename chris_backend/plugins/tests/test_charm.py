@@ -0,0 +1,89 @@
+
+from unittest import mock
+
+from django.test import TestCase
+from django.contrib.auth.models import User
+
+from plugins.models import Plugin, PluginInstance
+from plugins.services import charm
+
+
+class CharmTests(TestCase):
+
+    def setUp(self):
+        user = User.objects.create_user(username='foo', password='foo-pass')
+        (plugin, tf) = Plugin.objects.get_or_create(name="simplefsapp", type='fs')
+        self.pl_inst = PluginInstance.objects.create(plugin=plugin, owner=user)
+
+    def test_construction_is_free_of_side_effects_when_quiet(self):
+        """
+        Test whether a quiet Charm is constructed without creating any directory, log
+        or debug object and without formatting its arguments.
+        """
+        with mock.patch.object(charm.os, 'makedirs') as makedirs_mock, \
+                mock.patch.object(charm.pfmisc, 'debug') as debug_mock, \
+                mock.patch.object(charm.pfurl, 'Message') as message_mock, \
+                mock.patch.object(charm.pprint.PrettyPrinter, 'pformat'
+                                  ) as pformat_mock:
+            chris_service = charm.Charm(plugin_inst=self.pl_inst, quiet=True,
+                                        d_args={'dir': './'})
+            chris_service.dp.qprint('discarded message')
+        makedirs_mock.assert_not_called()
+        debug_mock.assert_not_called()
+        message_mock.assert_not_called()
+        pformat_mock.assert_not_called()
+        self.assertEqual(chris_service.d_pluginInst['id'], self.pl_inst.id)
+
+    def test_construction_prints_arguments_when_verbose(self):
+        """
+        Test whether a verbose Charm prints its arguments through a pfmisc debug
+        object created on first use.
+        """
+        with mock.patch.object(charm.pfmisc, 'debug') as debug_mock:
+            charm.Charm(plugin_inst=self.pl_inst, quiet=False, d_args={'dir': './'})
+        debug_mock.assert_called_once_with(verbosity=0, within='Charm')
+        messages = [c[0][0] for c in debug_mock.return_value.qprint.call_args_list]
+        self.assertIn("d_args         = {'dir': './'}", messages)
+
+    def test_app_service_records_the_dispatch_message_in_the_audit_log(self):
+        """
+        Test whether the message sent to pfcon to run a plugin instance is recorded
+        in the dispatch audit log instead of being written to disk by Charm.
+        """
+        chris_service = charm.Charm(plugin_inst=self.pl_inst, quiet=True,
+                                    inputdir='/share/incoming',
+                                    outputdir='/share/outgoing',
+                                    plugin_repr={'selfpath': '/usr/src',
+                                                 'selfexec': 'simplefsapp.py'})
+        with mock.patch.object(chris_service, 'app_service_call',
+                               return_value={'status': True}) as app_service_call_mock, \
+                mock.patch.object(charm.dispatch_audit_log, 'record') as record_mock, \
+                mock.patch.object(charm.os, 'makedirs') as makedirs_mock:
+            chris_service.app_service(service='pfcon', IOPhost='host')
+        d_msg = app_service_call_mock.call_args[1]['msg']
+        record_mock.assert_called_with(self.pl_inst.id, d_msg)
+        makedirs_mock.assert_not_called()
+
+    def test_status_check_fails_with_connection_error_on_unsuccessful_response(self):
+        """
+        Test whether checking the status of a plugin instance raises a ConnectionError
+        when pfcon does not reply with a JSON object.
+        """
+        chris_service = charm.Charm(plugin_inst=self.pl_inst, quiet=True)
+        with mock.patch.object(chris_service, 'app_service_call',
+                               return_value='Connection refused'):
+            with self.assertRaises(ConnectionError):
+                chris_service.app_statusCheckAndRegister()
+
+    def test_quiet_construction_does_no_file_io(self):
+        """
+        Test whether constructing a quiet Charm with many arguments neither opens nor
+        creates any debug or log file.
+        """
+        d_args = {'arg{0}'.format(i): 'value{0}'.format(i) for i in range(100)}
+        with mock.patch('builtins.open') as open_mock, \
+                mock.patch.object(charm.os, 'makedirs') as makedirs_mock:
+            for _ in range(10):
+                charm.Charm(plugin_inst=self.pl_inst, quiet=True, d_args=d_args)
+        open_mock.assert_not_called()
+        makedirs_mock.assert_not_called()
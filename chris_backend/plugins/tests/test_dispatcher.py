@@ -0,0 +1,227 @@
+
+from unittest import mock
+
+import requests
+
+from django.test import TestCase
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from plugins.models import Plugin, PluginParameter, PluginInstance, PluginInstanceJob
+from plugins.models import StringParameter
+from plugins.services import dispatcher
+
+
+class PluginInstanceDispatcherTests(TestCase):
+
+    def setUp(self):
+        self.plugin_fs_name = "simplefsapp"
+        self.username = 'foo'
+        self.password = 'foo-pass'
+        self.dispatcher = dispatcher.PluginInstanceDispatcher()
+
+        # create a plugin
+        (plugin_fs, tf) = Plugin.objects.get_or_create(name=self.plugin_fs_name,
+                                                       type='fs',
+                                                       selfpath='/usr/src/simplefsapp',
+                                                       selfexec='simplefsapp.py',
+                                                       execshell='python3')
+        # add plugin's parameters
+        (param, tf) = PluginParameter.objects.get_or_create(plugin=plugin_fs,
+                                                            name='dir', type='string',
+                                                            optional=False, flag='--dir')
+        # create user
+        user = User.objects.create_user(username=self.username,
+                                        password=self.password)
+
+        # create a queued plugin instance
+        self.pl_inst = PluginInstance.objects.create(plugin=plugin_fs, owner=user,
+                                                     status='queued')
+        StringParameter.objects.create(plugin_inst=self.pl_inst, plugin_param=param,
+                                       value='./')
+
+    def test_dispatcher_can_enqueue_plugin_instance(self):
+        """
+        Test whether the dispatcher can add a plugin instance to the dispatch queue.
+        """
+        job = self.dispatcher.enqueue(self.pl_inst, compute_host='host')
+        self.assertEqual(job.status, 'queued')
+        self.assertEqual(job.attempts, 0)
+        self.assertEqual(PluginInstanceJob.objects.count(), 1)
+
+    def test_dispatcher_can_enqueue_pipeline(self):
+        """
+        Test whether the dispatcher can add the plugin instances of a pipeline to the
+        dispatch queue, the next instances of the pipeline waiting for the previous
+        ones to finish.
+        """
+        plugin = Plugin.objects.get(name=self.plugin_fs_name)
+        pl_inst = PluginInstance.objects.create(plugin=plugin, owner=self.pl_inst.owner,
+                                                previous=self.pl_inst, status='queued')
+        self.dispatcher.enqueue_pipeline([self.pl_inst, pl_inst], compute_host='host')
+        job = PluginInstanceJob.objects.get(plugin_inst=self.pl_inst)
+        self.assertEqual(job.status, 'queued')
+        self.assertEqual(PluginInstanceJob.objects.get(plugin_inst=pl_inst).status,
+                         'waiting')
+        self.assertEqual(self.dispatcher.claim_next_job(), job)
+        self.assertIsNone(self.dispatcher.claim_next_job())
+
+    def test_dispatcher_pipeline_waits_for_running_previous_instance(self):
+        """
+        Test whether the instances of a pipeline wait for a previous instance outside
+        the pipeline that is still running and are released once it finishes.
+        """
+        self.pl_inst.status = 'started'
+        self.pl_inst.save()
+        plugin = Plugin.objects.get(name=self.plugin_fs_name)
+        pl_inst = PluginInstance.objects.create(plugin=plugin, owner=self.pl_inst.owner,
+                                                previous=self.pl_inst, status='queued')
+        self.dispatcher.enqueue_pipeline([pl_inst], compute_host='host')
+        self.assertEqual(PluginInstanceJob.objects.get(plugin_inst=pl_inst).status,
+                         'waiting')
+        # the previous instance finishes before the pipeline is released
+        PluginInstance.objects.filter(pk=self.pl_inst.pk).update(
+            status='finishedSuccessfully')
+        self.dispatcher.release_pipeline([pl_inst])
+        self.assertEqual(PluginInstanceJob.objects.get(plugin_inst=pl_inst).status,
+                         'queued')
+
+    def test_dispatcher_pipeline_fails_after_failed_previous_instance(self):
+        """
+        Test whether the instances of a pipeline whose previous instance outside the
+        pipeline finished with error fail at once along with their descendants.
+        """
+        self.pl_inst.status = 'finishedWithError'
+        self.pl_inst.save()
+        plugin = Plugin.objects.get(name=self.plugin_fs_name)
+        pl_inst1 = PluginInstance.objects.create(plugin=plugin, owner=self.pl_inst.owner,
+                                                 previous=self.pl_inst, status='queued')
+        pl_inst2 = PluginInstance.objects.create(plugin=plugin, owner=self.pl_inst.owner,
+                                                 previous=pl_inst1, status='queued')
+        self.dispatcher.enqueue_pipeline([pl_inst1, pl_inst2], compute_host='host')
+        for pl_inst in (pl_inst1, pl_inst2):
+            job = PluginInstanceJob.objects.get(plugin_inst=pl_inst)
+            self.assertEqual(job.status, 'failed')
+            self.assertEqual(job.plugin_inst.status, 'finishedWithError')
+
+    def test_dispatcher_can_dispatch_queued_jobs(self):
+        """
+        Test whether the dispatcher runs the plugin app of queued plugin instances.
+        """
+        with mock.patch.object(dispatcher.PluginManager, 'run_plugin_app',
+                               return_value=None) as run_plugin_app_mock:
+            self.dispatcher.enqueue(self.pl_inst, compute_host='host')
+            count = self.dispatcher.dispatch_queued_jobs()
+            self.assertEqual(count, 1)
+            run_plugin_app_mock.assert_called_with(self.pl_inst,
+                                                   {'dir': './'},
+                                                   service='pfcon',
+                                                   inputDirOverride='/share/incoming',
+                                                   outputDirOverride='/share/outgoing',
+                                                   IOPhost='host')
+            job = PluginInstanceJob.objects.get(plugin_inst=self.pl_inst)
+            self.assertEqual(job.status, 'dispatched')
+            self.assertEqual(job.attempts, 1)
+            self.assertEqual(job.plugin_inst.status, 'started')
+
+    def test_dispatcher_requeues_failed_jobs_with_backoff(self):
+        """
+        Test whether the dispatcher requeues a failed job with a backoff delay and
+        gives up after the maximum number of attempts.
+        """
+        # pfcon is unreachable
+        with mock.patch.object(requests.Session, 'post',
+                               side_effect=requests.ConnectionError('Connection refused')
+                               ) as post_mock:
+            self.dispatcher.max_attempts = 2
+            self.dispatcher.enqueue(self.pl_inst, compute_host='host')
+            self.dispatcher.dispatch_queued_jobs()
+            job = PluginInstanceJob.objects.get(plugin_inst=self.pl_inst)
+            self.assertEqual(job.status, 'queued')
+            self.assertTrue(job.next_attempt_date > timezone.now())
+            self.assertEqual(job.plugin_inst.status, 'queued')
+
+            # the job is not ready to be dispatched again until the backoff has passed
+            self.assertEqual(self.dispatcher.dispatch_queued_jobs(), 0)
+            PluginInstanceJob.objects.filter(pk=job.pk).update(
+                next_attempt_date=timezone.now())
+            self.dispatcher.dispatch_queued_jobs()
+            job = PluginInstanceJob.objects.get(plugin_inst=self.pl_inst)
+            self.assertEqual(job.status, 'failed')
+            self.assertEqual(job.plugin_inst.status, 'finishedWithError')
+            self.assertEqual(post_mock.call_count, 2)
+
+    def test_dispatcher_fails_waiting_jobs_of_failed_jobs(self):
+        """
+        Test whether the dispatcher fails the waiting jobs of the next plugin
+        instances of a job that failed after the maximum number of attempts.
+        """
+        plugin = Plugin.objects.get(name=self.plugin_fs_name)
+        pl_inst = PluginInstance.objects.create(plugin=plugin, owner=self.pl_inst.owner,
+                                                previous=self.pl_inst, status='queued')
+        self.dispatcher.enqueue_pipeline([self.pl_inst, pl_inst], compute_host='host')
+        with mock.patch.object(dispatcher.PluginManager, 'run_plugin_app',
+                               side_effect=ValueError):
+            self.dispatcher.max_attempts = 1
+            self.dispatcher.dispatch_queued_jobs()
+        job = PluginInstanceJob.objects.get(plugin_inst=pl_inst)
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(job.plugin_inst.status, 'finishedWithError')
+
+    def test_dispatcher_limits_concurrency_per_compute_host(self):
+        """
+        Test whether the dispatcher does not claim jobs for a compute host that
+        already has the maximum number of jobs being dispatched.
+        """
+        self.dispatcher.max_concurrency_per_host = 1
+        job = self.dispatcher.enqueue(self.pl_inst, compute_host='host')
+        job.status = 'dispatching'
+        job.claimed_at = timezone.now()
+        job.save()
+        plugin = Plugin.objects.get(name=self.plugin_fs_name)
+        pl_inst = PluginInstance.objects.create(plugin=plugin, owner=self.pl_inst.owner,
+                                                status='queued')
+        self.dispatcher.enqueue(pl_inst, compute_host='host')
+        self.assertIsNone(self.dispatcher.claim_next_job())
+        pl_inst.job.compute_host = 'otherhost'
+        pl_inst.job.save()
+        self.assertEqual(self.dispatcher.claim_next_job(), pl_inst.job)
+
+    def test_dispatcher_requeues_abandoned_jobs(self):
+        """
+        Test whether the dispatcher retries a job whose claim has timed out because
+        its worker died and whether the abandoned job no longer counts towards the
+        concurrency limit of its compute host.
+        """
+        self.dispatcher.max_concurrency_per_host = 1
+        job = self.dispatcher.enqueue(self.pl_inst, compute_host='host')
+        self.assertEqual(self.dispatcher.claim_next_job(), job)
+        self.pl_inst.status = 'started'
+        self.pl_inst.save()
+        self.assertEqual(self.dispatcher.get_busy_hosts(), ['host'])
+        # the claim is not abandoned until the timeout has passed
+        self.assertEqual(self.dispatcher.requeue_abandoned_jobs(), 0)
+
+        self.dispatcher.claim_timeout = -1
+        self.assertEqual(self.dispatcher.get_busy_hosts(), [])
+        self.assertEqual(self.dispatcher.requeue_abandoned_jobs(), 1)
+        job = PluginInstanceJob.objects.get(plugin_inst=self.pl_inst)
+        self.assertEqual(job.status, 'queued')
+        self.assertEqual(job.plugin_inst.status, 'queued')
+
+    def test_dispatcher_fails_abandoned_jobs_after_maximum_attempts(self):
+        """
+        Test whether the dispatcher fails an abandoned job along with its plugin
+        instance when it has already been attempted the maximum number of times.
+        """
+        self.dispatcher.max_attempts = 1
+        self.dispatcher.claim_timeout = -1
+        self.dispatcher.enqueue(self.pl_inst, compute_host='host')
+        self.dispatcher.claim_next_job()
+        with mock.patch.object(dispatcher.PluginManager, 'run_plugin_app'
+                               ) as run_plugin_app_mock:
+            self.assertEqual(self.dispatcher.dispatch_queued_jobs(), 0)
+        run_plugin_app_mock.assert_not_called()
+        job = PluginInstanceJob.objects.get(plugin_inst=self.pl_inst)
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(job.plugin_inst.status, 'finishedWithError')
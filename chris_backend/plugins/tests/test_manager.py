@@ -27,11 +27,15 @@ class PluginManagerTests(TestCase):
         # create a plugin
         (plugin_fs, tf) = Plugin.objects.get_or_create( name        = self.plugin_fs_name,
                                                         dock_image  = self.plugin_fs_docker_image_name,
-                                                        type        = 'fs')
+                                                        type        = 'fs',
+                                                        selfpath    = '/usr/src/simplefsapp',
+                                                        selfexec    = 'simplefsapp.py',
+                                                        execshell   = 'python3')
         # add plugin's parameters
         PluginParameter.objects.get_or_create(
             plugin=plugin_fs,
             name='dir',
+            flag='--dir',
             type=self.plugin_fs_parameters['dir']['type'],
             optional=self.plugin_fs_parameters['dir']['optional'])
 
@@ -49,6 +53,50 @@ class PluginManagerTests(TestCase):
         self.assertEquals(plugin.type, app_repr['type'])
         self.assertIn('parameters', app_repr)
 
+    def test_mananger_can_get_registered_plugin_app_representation(self):
+        """
+        Test whether the manager can return a plugin's app representation from the DB
+        without running the plugin's docker image.
+        """
+        with mock.patch.object(manager.PluginManager, 'get_plugin_app_representation',
+                               return_value=None) as get_plugin_app_repr_mock:
+            plugin = Plugin.objects.get(name=self.plugin_fs_name)
+            app_repr = self.pl_manager.get_registered_plugin_app_representation(plugin)
+            get_plugin_app_repr_mock.assert_not_called()
+            self.assertEquals(app_repr['type'], 'fs')
+            self.assertEquals(app_repr['selfexec'], 'simplefsapp.py')
+            self.assertEquals(app_repr['parameters'][0]['flag'], '--dir')
+            self.assertEquals(app_repr['parameters'][0]['action'], 'store')
+
+    def test_mananger_saves_plugin_app_representation_of_old_plugins(self):
+        """
+        Test whether the manager gets the app representation of a plugin registered
+        before the representation was stored in the DB from the plugin's docker image
+        only once and then saves it to the DB.
+        """
+        plugin = Plugin.objects.get(name=self.plugin_fs_name)
+        Plugin.objects.filter(pk=plugin.pk).update(selfpath='', selfexec='',
+                                                   execshell='')
+        PluginParameter.objects.filter(plugin=plugin).update(flag='')
+        app_repr = {'type': 'fs', 'selfpath': '/usr/src/simplefsapp',
+                    'selfexec': 'simplefsapp.py', 'execshell': 'python3',
+                    'parameters': [{'name': 'dir', 'type': 'string', 'optional': False,
+                                    'default': None, 'help': '', 'flag': '--dir',
+                                    'action': 'store'}]}
+        with mock.patch.object(manager.PluginManager, 'get_plugin_app_representation',
+                               return_value=app_repr) as get_plugin_app_repr_mock:
+            plugin = Plugin.objects.get(name=self.plugin_fs_name)
+            self.assertEquals(
+                self.pl_manager.get_registered_plugin_app_representation(plugin),
+                app_repr)
+            plugin = Plugin.objects.get(name=self.plugin_fs_name)
+            app_repr = self.pl_manager.get_registered_plugin_app_representation(plugin)
+            get_plugin_app_repr_mock.assert_called_once_with(
+                self.plugin_fs_docker_image_name)
+        self.assertEquals(app_repr['selfexec'], 'simplefsapp.py')
+        self.assertEquals(app_repr['execshell'], 'python3')
+        self.assertEquals(app_repr['parameters'][0]['flag'], '--dir')
+
     def test_mananger_can_get_plugin(self):
         """
         Test whether the manager can return a plugin object.
@@ -68,7 +116,10 @@ class PluginManagerTests(TestCase):
         """
         Test whether the manager can remove an existing plugin app from the system.
         """
-        self.pl_manager.run(['--remove', self.plugin_fs_name])
+        with mock.patch.object(manager, 'invalidate_plugin_metadata'
+                               ) as invalidate_plugin_metadata_mock:
+            self.pl_manager.run(['--remove', self.plugin_fs_name])
+            invalidate_plugin_metadata_mock.assert_called_once_with()
         self.assertEquals(Plugin.objects.count(), 0)
         self.assertEquals(PluginParameter.objects.count(), 0)
 
@@ -164,6 +215,22 @@ class PluginManagerTests(TestCase):
                 charm_init_mock.assert_called_with(plugin_inst=pl_inst)
                 app_statusCheckAndRegister_mock.assert_called_with()
 
+    def test_mananger_releases_next_jobs_when_plugin_app_exec_finishes(self):
+        """
+        Test whether the manager releases the dispatch jobs waiting for a plugin
+        instance once its app execution has finished.
+        """
+        with mock.patch.object(manager.charm.Charm, '__init__', return_value=None):
+            with mock.patch.object(manager.charm.Charm, 'app_statusCheckAndRegister',
+                                   return_value='finishedSuccessfully'):
+                user = User.objects.get(username=self.username)
+                plugin = Plugin.objects.get(name=self.plugin_fs_name)
+                pl_inst = PluginInstance.objects.create(plugin=plugin, owner=user)
+                with mock.patch.object(PluginInstance, 'release_next_jobs'
+                                       ) as release_next_jobs_mock:
+                    self.pl_manager.check_plugin_app_exec_status(pl_inst)
+                release_next_jobs_mock.assert_called_with()
+
     @tag('integration')
     def test_integration_mananger_can_check_plugin_app_exec_status(self):
         """
@@ -1,15 +1,20 @@
 
 import os, shutil
+import hashlib
 from unittest import mock
 
 from django.test import TestCase, tag
 from django.contrib.auth.models import User
 from django.conf import settings
+from django.db import connection
 
 import swiftclient
 
+from core.storage import swift_pool
 from feeds.models import Feed, FeedFile
-from plugins.models import Plugin, PluginParameter, PluginInstance, swiftclient
+from plugins.models import Plugin, PluginParameter, PluginInstance
+from plugins.models import PluginInstanceJob
+from uploadedfiles.models import ContentBlob
 
 
 class PluginModelTests(TestCase):
@@ -65,6 +70,9 @@ class PluginInstanceModelTests(TestCase):
         User.objects.create_user(username=self.username,
                                         password=self.password)
 
+        # make sure new Swift connections are created
+        swift_pool.clear()
+
     def test_save_creates_new_feed_just_after_fs_plugininstance_is_created(self):
         """
         Test whether overriden save method creates a feed just after an 'fs' plugin 
@@ -105,6 +113,59 @@ class PluginInstanceModelTests(TestCase):
         root_instance = pl_inst.get_root_instance()
         self.assertEquals(root_instance, pl_inst_root)
 
+    def test_save_saves_root_and_ancestry_path(self):
+        """
+        Test whether overriden save method saves the plugin instance's root and
+        ancestry path the first time the instance is saved.
+        """
+        user = User.objects.get(username=self.username)
+        plugin_fs = Plugin.objects.get(name=self.plugin_fs_name)
+        pl_inst_fs = PluginInstance.objects.create(plugin=plugin_fs, owner=user)
+        plugin_ds = Plugin.objects.get(name=self.plugin_ds_name)
+        pl_inst_ds1 = PluginInstance.objects.create(plugin=plugin_ds, owner=user,
+                                                    previous=pl_inst_fs)
+        pl_inst_ds2 = PluginInstance.objects.create(plugin=plugin_ds, owner=user,
+                                                    previous=pl_inst_ds1)
+        pl_inst_ds2 = PluginInstance.objects.get(pk=pl_inst_ds2.id)
+        self.assertEquals(pl_inst_ds2.root_id, pl_inst_fs.id)
+        self.assertEquals(pl_inst_ds2.path, '/{0}/{1}/{2}/'.format(pl_inst_fs.id,
+                                                                  pl_inst_ds1.id,
+                                                                  pl_inst_ds2.id))
+        self.assertEquals(pl_inst_ds2.get_ancestors(),
+                          [pl_inst_fs, pl_inst_ds1, pl_inst_ds2])
+
+    def test_release_next_jobs(self):
+        """
+        Test whether custom release_next_jobs method queues the waiting jobs of the
+        next plugin instances when the instance finished successfully and fails the
+        waiting jobs of all the descendant instances otherwise.
+        """
+        user = User.objects.get(username=self.username)
+        plugin_fs = Plugin.objects.get(name=self.plugin_fs_name)
+        plugin_ds = Plugin.objects.get(name=self.plugin_ds_name)
+        pl_inst_fs = PluginInstance.objects.create(plugin=plugin_fs, owner=user)
+        pl_inst_ds1 = PluginInstance.objects.create(plugin=plugin_ds, owner=user,
+                                                    previous=pl_inst_fs, status='queued')
+        pl_inst_ds2 = PluginInstance.objects.create(plugin=plugin_ds, owner=user,
+                                                    previous=pl_inst_ds1, status='queued')
+        for pl_inst in (pl_inst_ds1, pl_inst_ds2):
+            PluginInstanceJob.objects.create(plugin_inst=pl_inst, status='waiting')
+
+        pl_inst_fs.status = 'finishedSuccessfully'
+        self.assertEquals(pl_inst_fs.release_next_jobs(), 1)
+        self.assertEquals(PluginInstanceJob.objects.get(plugin_inst=pl_inst_ds1).status,
+                          'queued')
+        self.assertEquals(PluginInstanceJob.objects.get(plugin_inst=pl_inst_ds2).status,
+                          'waiting')
+
+        pl_inst_ds1 = PluginInstance.objects.get(pk=pl_inst_ds1.id)
+        pl_inst_ds1.status = 'finishedWithError'
+        self.assertEquals(pl_inst_ds1.release_next_jobs(), 1)
+        self.assertEquals(PluginInstanceJob.objects.get(plugin_inst=pl_inst_ds2).status,
+                          'failed')
+        self.assertEquals(PluginInstance.objects.get(pk=pl_inst_ds2.id).status,
+                          'finishedWithError')
+
     def test_get_output_path(self):
         """
         Test whether custom get_output_path method returns appropriate output paths
@@ -154,17 +215,121 @@ class PluginInstanceModelTests(TestCase):
         with mock.patch.object(swiftclient.Connection, '__init__',
                                return_value=None) as conn_init_mock:
             with mock.patch.object(swiftclient.Connection, 'get_container',
-                                   return_value=container_data) as conn_get_container_mock:
+                                   side_effect=[container_data, ['', []]]
+                                   ) as conn_get_container_mock:
                 pl_inst.register_output_files()
                 conn_init_mock.assert_called_with(user=settings.SWIFT_USERNAME,
                                                   key=settings.SWIFT_KEY,
                                                   authurl=settings.SWIFT_AUTH_URL,)
-                conn_get_container_mock.assert_called_with(settings.SWIFT_CONTAINER_NAME,
-                                                   prefix=output_path, full_listing=True)
+                conn_get_container_mock.assert_any_call(
+                    settings.SWIFT_CONTAINER_NAME, prefix=output_path, marker='',
+                    limit=settings.OUTPUT_FILES_REGISTRATION_BATCH_SIZE)
                 self.assertEquals(FeedFile.objects.count(), 1)
                 feedfile = FeedFile.objects.get(plugin_inst=pl_inst, feed=pl_inst.feed)
                 self.assertEquals(feedfile.fname.name, output_path + '/file1.txt')
 
+    def test_register_output_files_in_batches_skipping_registered_files(self):
+        """
+        Test whether custom register_output_files method consumes the Swift listing
+        in pages and does not register the same file twice.
+        """
+        # create an 'fs' plugin instance
+        user = User.objects.get(username=self.username)
+        plugin = Plugin.objects.get(name=self.plugin_fs_name)
+        pl_inst = PluginInstance.objects.create(plugin=plugin, owner=user)
+        output_path = pl_inst.get_output_path()
+        page1 = ['', [{'name': output_path + '/file1.txt'},
+                      {'name': output_path + '/file2.txt'}]]
+        page2 = ['', [{'name': output_path + '/file3.txt'}]]
+        empty_page = ['', []]
+
+        with self.settings(OUTPUT_FILES_REGISTRATION_BATCH_SIZE=2):
+            with mock.patch.object(swiftclient.Connection, '__init__',
+                                   return_value=None):
+                with mock.patch.object(swiftclient.Connection, 'get_container',
+                                       side_effect=[page1, page2, empty_page,
+                                                    page1, page2, empty_page]
+                                       ) as conn_get_container_mock:
+                    self.assertEquals(pl_inst.register_output_files(), 3)
+                    conn_get_container_mock.assert_called_with(
+                        settings.SWIFT_CONTAINER_NAME, prefix=output_path,
+                        marker=output_path + '/file3.txt', limit=2)
+                    self.assertEquals(pl_inst.register_output_files(), 0)
+                    self.assertEquals(FeedFile.objects.count(), 3)
+
+    def test_register_output_files_keeps_listing_after_short_pages(self):
+        """
+        Test whether custom register_output_files method keeps consuming the Swift
+        listing when a page has less objects than requested.
+        """
+        user = User.objects.get(username=self.username)
+        plugin = Plugin.objects.get(name=self.plugin_fs_name)
+        pl_inst = PluginInstance.objects.create(plugin=plugin, owner=user)
+        output_path = pl_inst.get_output_path()
+        page1 = ['', [{'name': output_path + '/file1.txt'}]]
+        page2 = ['', [{'name': output_path + '/file2.txt'}]]
+
+        with self.settings(OUTPUT_FILES_REGISTRATION_BATCH_SIZE=2):
+            with mock.patch.object(swiftclient.Connection, '__init__',
+                                   return_value=None):
+                with mock.patch.object(swiftclient.Connection, 'get_container',
+                                       side_effect=[page1, page2, ['', []]]):
+                    self.assertEquals(pl_inst.register_output_files(), 2)
+
+    def test_register_output_files_deduplicates_content(self):
+        """
+        Test whether custom register_output_files method hashes the content of the
+        new output files and lets the storage deduplicate it when deduplication is
+        enabled.
+        """
+        user = User.objects.get(username=self.username)
+        plugin = Plugin.objects.get(name=self.plugin_fs_name)
+        pl_inst = PluginInstance.objects.create(plugin=plugin, owner=user)
+        output_path = pl_inst.get_output_path()
+        container_data = ['', [{'name': output_path + '/file1.txt'}]]
+        storage = mock.Mock()
+        storage.iter_range = mock.Mock(return_value=iter([b'test ', b'file']))
+        fname_field = FeedFile._meta.get_field('fname')
+
+        with self.settings(DEDUPLICATE_FILES=True):
+            with mock.patch.object(fname_field, 'storage', storage):
+                with mock.patch.object(swiftclient.Connection, '__init__',
+                                       return_value=None):
+                    with mock.patch.object(swiftclient.Connection, 'get_container',
+                                           side_effect=[container_data, ['', []]]):
+                        self.assertEquals(pl_inst.register_output_files(), 1)
+        sha256 = hashlib.sha256(b'test file').hexdigest()
+        storage.deduplicate.assert_called_with(output_path + '/file1.txt', sha256)
+        self.assertEquals(ContentBlob.objects.get(sha256=sha256).refcount, 1)
+        self.assertEquals(FeedFile.objects.get(plugin_inst=pl_inst).sha256, sha256)
+
+    def test_register_output_files_hashes_content_outside_transactions(self):
+        """
+        Test whether custom register_output_files method does not keep a transaction
+        open while the content of the new output files is hashed.
+        """
+        user = User.objects.get(username=self.username)
+        plugin = Plugin.objects.get(name=self.plugin_fs_name)
+        pl_inst = PluginInstance.objects.create(plugin=plugin, owner=user)
+        output_path = pl_inst.get_output_path()
+        container_data = ['', [{'name': output_path + '/file1.txt'}]]
+        savepoints = []
+        def iter_range(*args, **kwargs):
+            savepoints.append(len(connection.savepoint_ids))
+            return iter([b'test file'])
+        storage = mock.Mock()
+        storage.iter_range = mock.Mock(side_effect=iter_range)
+        fname_field = FeedFile._meta.get_field('fname')
+
+        with self.settings(DEDUPLICATE_FILES=True):
+            with mock.patch.object(fname_field, 'storage', storage):
+                with mock.patch.object(swiftclient.Connection, '__init__',
+                                       return_value=None):
+                    with mock.patch.object(swiftclient.Connection, 'get_container',
+                                           side_effect=[container_data, ['', []]]):
+                        pl_inst.register_output_files()
+        self.assertEqual(savepoints, [len(connection.savepoint_ids)])
+
     @tag('integration')
     def test_integration_register_output_files(self):
         """
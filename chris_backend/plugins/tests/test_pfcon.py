@@ -0,0 +1,69 @@
+
+import json
+from unittest import mock
+
+import requests
+
+from django.test import TestCase
+
+from plugins.services import pfcon
+
+
+class PfconClientTests(TestCase):
+
+    def setUp(self):
+        self.client = pfcon.PfconClient(2, (1, 1), 3, 0)
+        self.d_msg = {'action': 'status', 'meta': {'remote': {'key': '1'}}}
+
+    def tearDown(self):
+        self.client.close()
+
+    def test_post_reuses_the_same_session(self):
+        """
+        Test whether the client sends all the messages through the same pooled
+        keep-alive session.
+        """
+        response = mock.Mock(text=json.dumps({'status': True}))
+        with mock.patch.object(requests.Session, 'post',
+                               return_value=response) as post_mock:
+            self.assertEqual(self.client.post('pfcon', self.d_msg), {'status': True})
+            session = self.client.get_session()
+            self.client.post('pfcon', self.d_msg)
+            self.assertIs(self.client.get_session(), session)
+        self.assertEqual(post_mock.call_count, 2)
+        post_mock.assert_called_with('http://pfcon_service:5005/',
+                                     data=json.dumps({'payload': self.d_msg}),
+                                     timeout=(1, 1))
+        adapter = session.get_adapter('http://pfcon_service:5005/')
+        self.assertEqual(adapter._pool_maxsize, 2)
+        self.assertEqual(adapter.max_retries.connect, 3)
+        self.assertEqual(adapter.max_retries.read, 0)
+
+    def test_get_session_creates_a_new_session_in_forked_processes(self):
+        """
+        Test whether the client does not share its session with a forked process.
+        """
+        session = self.client.get_session()
+        with mock.patch.object(pfcon.os, 'getpid', return_value=-1):
+            self.assertIsNot(self.client.get_session(), session)
+
+    def test_post_returns_error_message_when_service_is_unreachable(self):
+        """
+        Test whether the client returns the error message when the connection to the
+        service fails.
+        """
+        with mock.patch.object(requests.Session, 'post',
+                               side_effect=requests.ConnectionError('Connection refused')):
+            self.assertEqual(self.client.post('pfcon', self.d_msg), 'Connection refused')
+
+    def test_parse_response(self):
+        """
+        Test whether the client decodes the HTTP response embedded in pfcon's
+        responses as well as plain JSON responses.
+        """
+        str_response = 'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n\r\n' + \
+                       json.dumps({'status': True})
+        self.assertEqual(self.client.parse_response(str_response), {'status': True})
+        self.assertEqual(self.client.parse_response('{"status": false}'),
+                         {'status': False})
+        self.assertEqual(self.client.parse_response('not json'), 'not json')
@@ -0,0 +1,75 @@
+
+from unittest import mock
+
+from django.test import TestCase
+from django.contrib.auth.models import User
+
+from plugins.models import Plugin, PluginInstance, PluginInstanceJob
+from plugins.services import poller
+
+
+class PluginInstanceStatusPollerTests(TestCase):
+
+    def setUp(self):
+        self.plugin_fs_name = "simplefsapp"
+        self.username = 'foo'
+        self.password = 'foo-pass'
+        self.poller = poller.PluginInstanceStatusPoller()
+
+        # create a plugin
+        (plugin_fs, tf) = Plugin.objects.get_or_create(name=self.plugin_fs_name,
+                                                       type='fs')
+        # create user
+        User.objects.create_user(username=self.username, password=self.password)
+
+    def test_poller_checks_status_of_pending_plugin_instances_only(self):
+        """
+        Test whether the poller checks the execution status of the plugin instances
+        that have not finished yet and have already been dispatched.
+        """
+        with mock.patch.object(poller.PluginManager, 'check_plugin_app_exec_status',
+                               return_value='finishedSuccessfully') as check_status_mock:
+            user = User.objects.get(username=self.username)
+            plugin = Plugin.objects.get(name=self.plugin_fs_name)
+            pl_inst = PluginInstance.objects.create(plugin=plugin, owner=user)
+            PluginInstanceJob.objects.create(plugin_inst=pl_inst, status='dispatched')
+            finished_inst = PluginInstance.objects.create(plugin=plugin, owner=user,
+                                                          status='finishedSuccessfully')
+            PluginInstanceJob.objects.create(plugin_inst=finished_inst,
+                                             status='dispatched')
+            queued_inst = PluginInstance.objects.create(plugin=plugin, owner=user,
+                                                        status='queued')
+            PluginInstanceJob.objects.create(plugin_inst=queued_inst)
+            dispatching_inst = PluginInstance.objects.create(plugin=plugin, owner=user)
+            PluginInstanceJob.objects.create(plugin_inst=dispatching_inst,
+                                             status='dispatching')
+
+            statuses = self.poller.run(['--once'])
+            self.assertEqual(statuses, {pl_inst.id: 'finishedSuccessfully'})
+            check_status_mock.assert_called_once_with(pl_inst)
+
+    def test_poller_returns_error_of_plugin_instances_that_can_not_be_checked(self):
+        """
+        Test whether the poller keeps checking the remaining plugin instances and
+        returns the error message of a plugin instance whose status can not be
+        checked.
+        """
+        user = User.objects.get(username=self.username)
+        plugin = Plugin.objects.get(name=self.plugin_fs_name)
+        pl_insts = []
+        for _ in range(3):
+            pl_inst = PluginInstance.objects.create(plugin=plugin, owner=user)
+            PluginInstanceJob.objects.create(plugin_inst=pl_inst, status='dispatched')
+            pl_insts.append(pl_inst)
+
+        def check_status(plugin_inst):
+            if plugin_inst.id == pl_insts[1].id:
+                raise ConnectionError('Connection refused')
+            return 'started'
+
+        with mock.patch.object(poller.PluginManager, 'check_plugin_app_exec_status',
+                               side_effect=check_status):
+            statuses = self.poller.run(['--once'])
+        self.assertEqual(statuses, {pl_insts[0].id: 'started',
+                                    pl_insts[1].id: 'Connection refused',
+                                    pl_insts[2].id: 'started'})
@@ -8,11 +8,15 @@ from django.test import TestCase, tag
 from django.core.urlresolvers import reverse
 from django.contrib.auth.models import User
 from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from rest_framework import status
 
 from plugins.models import Plugin, PluginParameter, PluginInstance, STATUS_TYPES
+from plugins.models import StringParameter, IntParameter
 from plugins.services.manager import PluginManager
+from plugins.cache import invalidate_plugin_metadata
 from plugins import views
 
 import pudb
@@ -39,6 +43,9 @@ class ViewTests(TestCase):
         Plugin.objects.get_or_create(name="pacspull", type="fs")
         Plugin.objects.get_or_create(name="mri_convert", type="ds")
 
+        # the cached plugin metadata responses are shared by all the tests
+        invalidate_plugin_metadata()
+
 
 class PluginListViewTests(ViewTests):
     """
@@ -55,6 +62,27 @@ class PluginListViewTests(ViewTests):
         self.assertContains(response, "pacspull")
         self.assertContains(response, "mri_convert")
 
+    def test_plugin_list_conditional_get(self):
+        self.client.login(username=self.username, password=self.password)
+        etag = self.client.get(self.list_url)['ETag']
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        # adding a plugin changes the collection's version
+        Plugin.objects.get_or_create(name="simplefsapp", type="fs")
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, "simplefsapp")
+
+    def test_plugin_list_cached_data_matches_etag_without_invalidation(self):
+        self.client.login(username=self.username, password=self.password)
+        etag = self.client.get(self.list_url)['ETag']
+        # a plugin added by another process whose invalidation is not seen
+        Plugin.objects.get_or_create(name="simplefsapp", type="fs")
+        response = self.client.get(self.list_url)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertContains(response, "simplefsapp")
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
     def test_plugin_list_failure_unauthenticated(self):
         response = self.client.get(self.list_url)
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -96,6 +124,20 @@ class PluginDetailViewTests(ViewTests):
         response = self.client.get(self.read_url)
         self.assertContains(response, "pacspull")
 
+    def test_plugin_detail_success_from_cache_until_invalidated(self):
+        self.client.login(username=self.username, password=self.password)
+        self.client.get(self.read_url)
+        Plugin.objects.filter(name="pacspull").update(title="PACS pull")
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.read_url)
+        # the cached response was served without querying the plugin
+        self.assertFalse([q for q in context.captured_queries
+                          if 'plugins_plugin' in q['sql']])
+        self.assertNotContains(response, "PACS pull")
+        invalidate_plugin_metadata()
+        response = self.client.get(self.read_url)
+        self.assertContains(response, "PACS pull")
+
     def test_plugin_detail_failure_unauthenticated(self):
         response = self.client.get(self.read_url)
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -181,15 +223,40 @@ class PluginInstanceListViewTests(ViewTests):
                                         content_type=self.content_type)
             self.assertEqual(response.status_code, status.HTTP_201_CREATED)
 
-            # check that manager's run_plugin_app method was called with appropriate args
-            (plugin_inst, tf) = PluginInstance.objects.get_or_create(plugin=plugin)
-            parameters_dict = {'dir': './'}
-            run_plugin_app_mock.assert_called_with( plugin_inst,
-                                    parameters_dict,
-                                    service             = 'pfcon',
-                                    inputDirOverride    = '/share/incoming',
-                                    outputDirOverride   = '/share/outgoing',
-                                    IOPhost             = 'host')
+            # check that the plugin instance was queued instead of run in the request
+            plugin_inst = PluginInstance.objects.get(plugin=plugin)
+            self.assertEqual(plugin_inst.status, 'queued')
+            self.assertEqual(plugin_inst.job.status, 'queued')
+            self.assertEqual(plugin_inst.get_parameter_dict(), {'dir': './'})
+            run_plugin_app_mock.assert_not_called()
+
+    def test_plugin_instance_create_resolves_plugin_once(self):
+        plugin = Plugin.objects.get(name="pacspull")
+        PluginParameter.objects.get_or_create(plugin=plugin, name='dir', type='string',
+                                              optional=False)
+        post = json.dumps(
+            {"template": {"data": [{"name": "dir", "value": "./"},
+                                   {"name": "cpu_limit", "value": "1000m"},
+                                   {"name": "number_of_workers", "value": 1}]}})
+        self.client.login(username=self.username, password=self.password)
+        with mock.patch.object(views.PluginInstanceList, 'check_object_permissions'
+                               ) as check_object_permissions_mock:
+            response = self.client.post(self.create_read_url, data=post,
+                                        content_type=self.content_type)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        # the view, its serializer's validators and save share the same plugin
+        self.assertEqual(check_object_permissions_mock.call_count, 1)
+
+    def test_plugin_instance_create_failure_invalid_parameter(self):
+        plugin = Plugin.objects.get(name="pacspull")
+        PluginParameter.objects.get_or_create(plugin=plugin, name='dir', type='integer',
+                                              optional=False)
+        self.client.login(username=self.username, password=self.password)
+        response = self.client.post(self.create_read_url, data=self.post,
+                                    content_type=self.content_type)
+        self.assertContains(response, 'dir', status_code=status.HTTP_400_BAD_REQUEST)
+        # no plugin instance is left queued without a job
+        self.assertFalse(PluginInstance.objects.filter(plugin=plugin).exists())
 
     @tag('integration')
     def test_integration_plugin_instance_create_success(self):
@@ -234,11 +301,163 @@ class PluginInstanceListViewTests(ViewTests):
         response = self.client.get(self.create_read_url)
         self.assertContains(response, "pacspull")
 
+    def test_plugin_instance_list_number_of_queries_does_not_grow_with_page_size(self):
+        # create several pacspull plugin instances with a parameter
+        plugin = Plugin.objects.get(name="pacspull")
+        user = User.objects.get(username=self.username)
+        (param, tf) = PluginParameter.objects.get_or_create(plugin=plugin, name='dir',
+                                                            type='string')
+        for i in range(6):
+            inst = PluginInstance.objects.create(plugin=plugin, owner=user)
+            StringParameter.objects.create(plugin_inst=inst, plugin_param=param,
+                                           value='./')
+        self.client.login(username=self.username, password=self.password)
+        with CaptureQueriesContext(connection) as small_page_queries:
+            self.client.get(self.create_read_url + '?limit=2')
+        with CaptureQueriesContext(connection) as large_page_queries:
+            self.client.get(self.create_read_url + '?limit=6')
+        self.assertEqual(len(small_page_queries), len(large_page_queries))
+
     def test_plugin_instance_list_failure_unauthenticated(self):
         response = self.client.get(self.create_read_url)
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
+class PluginInstancePipelineViewTests(ViewTests):
+    """
+    Test the plugininstance-pipeline view
+    """
+
+    def setUp(self):
+        super(PluginInstancePipelineViewTests, self).setUp()
+        self.create_url = reverse("plugininstance-pipeline")
+        plugin_fs = Plugin.objects.get(name="pacspull")
+        plugin_ds = Plugin.objects.get(name="mri_convert")
+        PluginParameter.objects.get_or_create(plugin=plugin_fs, name='dir',
+                                              type='string')
+        PluginParameter.objects.get_or_create(plugin=plugin_ds, name='slices',
+                                              type='integer')
+        self.steps = [{'plugin_id': plugin_fs.id, 'parameters': {'dir': './'}},
+                      {'plugin_id': plugin_ds.id, 'previous_index': 0,
+                       'parameters': {'slices': 3}},
+                      {'plugin_id': plugin_ds.id, 'previous_index': 1}]
+
+    def post_steps(self, steps):
+        post = json.dumps({"template": {"data": [{"name": "steps", "value": steps}]}})
+        return self.client.post(self.create_url, data=post,
+                                content_type=self.content_type)
+
+    def test_plugin_instance_pipeline_create_success(self):
+        with mock.patch.object(views.PluginManager, 'run_plugin_app',
+                               return_value=None) as run_plugin_app_mock:
+            self.client.login(username=self.username, password=self.password)
+            response = self.post_steps(self.steps)
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.assertContains(response, "mri_convert", status_code=201)
+
+            # only the first step is ready to be dispatched
+            (pl_inst_fs, pl_inst_ds1, pl_inst_ds2) = PluginInstance.objects.order_by('id')
+            self.assertEqual(pl_inst_ds1.previous, pl_inst_fs)
+            self.assertEqual(pl_inst_ds2.previous, pl_inst_ds1)
+            self.assertEqual(pl_inst_ds2.root, pl_inst_fs)
+            self.assertEqual(pl_inst_fs.job.status, 'queued')
+            self.assertEqual(pl_inst_ds1.job.status, 'waiting')
+            self.assertEqual(pl_inst_ds2.job.status, 'waiting')
+            self.assertEqual(pl_inst_fs.get_parameter_dict(), {'dir': './'})
+            self.assertEqual(pl_inst_ds1.get_parameter_dict(), {'slices': '3'})
+            self.assertEqual(IntParameter.objects.count(), 1)
+            run_plugin_app_mock.assert_not_called()
+
+    def test_plugin_instance_pipeline_waits_for_running_previous_instance(self):
+        user = User.objects.get(username=self.username)
+        plugin_fs = Plugin.objects.get(name="pacspull")
+        previous = PluginInstance.objects.create(plugin=plugin_fs, owner=user,
+                                                 status='started')
+        steps = [{'plugin_id': self.steps[1]['plugin_id'], 'previous_id': previous.id}]
+        self.client.login(username=self.username, password=self.password)
+        response = self.post_steps(steps)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        pl_inst = PluginInstance.objects.get(previous=previous)
+        self.assertEqual(pl_inst.job.status, 'waiting')
+
+    def test_plugin_instance_pipeline_create_failure_invalid_previous_step(self):
+        self.steps[1]['previous_index'] = 2
+        self.client.login(username=self.username, password=self.password)
+        response = self.post_steps(self.steps)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(PluginInstance.objects.count(), 0)
+
+    def test_plugin_instance_pipeline_create_failure_invalid_parameter(self):
+        self.steps[1]['parameters']['slices'] = 'three'
+        self.client.login(username=self.username, password=self.password)
+        response = self.post_steps(self.steps)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(PluginInstance.objects.count(), 0)
+
+    def test_plugin_instance_pipeline_create_failure_unauthenticated(self):
+        response = self.post_steps(self.steps)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PluginInstanceStatusListViewTests(ViewTests):
+    """
+    Test the plugininstance-status-list view
+    """
+
+    def setUp(self):
+        super(PluginInstanceStatusListViewTests, self).setUp()
+        self.read_url = reverse("plugininstance-status-list")
+        user = User.objects.get(username=self.username)
+        plugin_fs = Plugin.objects.get(name="pacspull")
+        plugin_ds = Plugin.objects.get(name="mri_convert")
+        self.pl_inst_fs = PluginInstance.objects.create(plugin=plugin_fs, owner=user,
+                                                        status='finishedSuccessfully')
+        self.pl_inst_ds = PluginInstance.objects.create(plugin=plugin_ds, owner=user,
+                                                        previous=self.pl_inst_fs)
+        # an instance of another feed
+        PluginInstance.objects.create(plugin=plugin_fs, owner=user)
+
+    def test_plugin_instance_status_list_by_feed_success(self):
+        self.client.login(username=self.username, password=self.password)
+        url = self.read_url + '?feed_id=%s' % self.pl_inst_fs.feed.id
+        with mock.patch.object(views.PluginManager, 'check_plugin_app_exec_status'
+                               ) as check_plugin_app_exec_status_mock:
+            response = self.client.get(url)
+        check_plugin_app_exec_status_mock.assert_not_called()
+        items = json.loads(response.content.decode())['collection']['items']
+        data = [{d['name']: d['value'] for d in item['data']} for item in items]
+        statuses = {d['id']: d['status'] for d in data}
+        self.assertEqual(statuses, {self.pl_inst_fs.id: 'finishedSuccessfully',
+                                    self.pl_inst_ds.id: 'started'})
+
+    def test_plugin_instance_status_list_by_ids_in_a_single_query(self):
+        self.client.login(username=self.username, password=self.password)
+        url = self.read_url + '?ids=%s,%s' % (self.pl_inst_fs.id, self.pl_inst_ds.id)
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        queries = [q['sql'] for q in context.captured_queries
+                   if 'plugins_plugininstance' in q['sql']]
+        self.assertEqual(len(queries), 1)
+        self.assertContains(response, 'finishedSuccessfully')
+
+    def test_plugin_instance_status_list_shows_only_owned_instances(self):
+        User.objects.create_user(username='other', password='other-pass')
+        self.client.login(username='other', password='other-pass')
+        response = self.client.get(self.read_url + '?feed_id=%s' %
+                                   self.pl_inst_fs.feed.id)
+        self.assertEqual(json.loads(response.content.decode()), [])
+
+    def test_plugin_instance_status_list_failure_without_instances(self):
+        self.client.login(username=self.username, password=self.password)
+        response = self.client.get(self.read_url + '?ids=foo')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_plugin_instance_status_list_failure_unauthenticated(self):
+        response = self.client.get(self.read_url + '?ids=%s' % self.pl_inst_fs.id)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
 class PluginInstanceDetailViewTests(ViewTests):
     """
     Test the plugininstance-detail view
@@ -260,6 +479,35 @@ class PluginInstanceDetailViewTests(ViewTests):
             response = self.client.get(self.read_url)
             self.assertContains(response, "pacspull")
 
+            # check that the stored status was served without checking the remote
+            # service
+            check_plugin_app_exec_status_mock.assert_not_called()
+
+    def test_plugin_instance_detail_conditional_get(self):
+        self.client.login(username=self.username, password=self.password)
+        response = self.client.get(self.read_url)
+        etag = response['ETag']
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.read_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        # only the instance's status and end date were queried
+        instance_queries = [q for q in context.captured_queries
+                            if 'plugins_plugininstance' in q['sql']]
+        self.assertEqual(len(instance_queries), 1)
+        # a status change changes the instance's version
+        self.pl_inst.status = 'finishedSuccessfully'
+        self.pl_inst.save()
+        response = self.client.get(self.read_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'finishedSuccessfully')
+
+    def test_plugin_instance_detail_success_refresh(self):
+        with mock.patch.object(views.PluginManager, 'check_plugin_app_exec_status',
+                               return_value=None) as check_plugin_app_exec_status_mock:
+            # make API request
+            self.client.login(username=self.username, password=self.password)
+            response = self.client.get(self.read_url + '?refresh=1')
+            self.assertContains(response, "pacspull")
+
             # check that manager's check_plugin_app_exec_status method was called with
             # appropriate args
             check_plugin_app_exec_status_mock.assert_called_with(self.pl_inst)
@@ -306,7 +554,7 @@ class PluginInstanceDetailViewTests(ViewTests):
             currentLoop     = 1
             b_checkAgain    = True
             while b_checkAgain:
-                response            = self.client.get(self.read_url)
+                response            = self.client.get(self.read_url + '?refresh=1')
                 str_responseStatus  = response.data['status']
                 if str_responseStatus == 'finishedSuccessfully':
                     b_checkAgain = False
@@ -359,6 +607,47 @@ class PluginInstanceListQuerySearchViewTests(ViewTests):
         self.assertContains(response, STATUS_TYPES[0])
         self.assertNotContains(response, STATUS_TYPES[1])
 
+    def test_plugin_instance_query_search_uses_owner_status_index(self):
+        """
+        Test whether the database plans the query of the instances searched by status
+        with the composite index on the instances' owner, status and start date.
+        """
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, PluginInstance._meta.db_table)
+        index_name = [name for (name, c) in constraints.items() if c['index'] and
+                      c['columns'] == ['owner_id', 'status', 'start_date']][0]
+        self.client.login(username=self.username, password=self.password)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(self.list_url)
+        table = connection.ops.quote_name(PluginInstance._meta.db_table)
+        # the query that fetches the page of instances
+        sql = [q['sql'] for q in context.captured_queries if 'ORDER BY' in q['sql']
+               and q['sql'].split(' FROM ')[1].startswith(table)][0]
+        explain = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+        with connection.cursor() as cursor:
+            cursor.execute(explain + sql)
+            query_plan = str(cursor.fetchall())
+        self.assertIn(index_name, query_plan)
+
+    def test_plugin_instance_query_search_list_by_root_id_success(self):
+        user = User.objects.get(username=self.username)
+        root_inst = PluginInstance.objects.get(plugin__name="pacspull")
+        plugin = Plugin.objects.get(name="mri_convert")
+        inst = PluginInstance.objects.create(plugin=plugin, owner=user,
+                                             previous=root_inst)
+        other_inst = PluginInstance.objects.get(plugin__name="mri_convert",
+                                                previous__isnull=True)
+        list_url = reverse("plugininstance-list-query-search") + '?root_id=' + \
+                   str(root_inst.id)
+        self.client.login(username=self.username, password=self.password)
+        response = self.client.get(list_url)
+        # response should only contain the instances in the root instance's subtree
+        self.assertContains(response, reverse("plugininstance-detail",
+                                              kwargs={"pk": inst.id}))
+        self.assertNotContains(response, reverse("plugininstance-detail",
+                                                 kwargs={"pk": other_inst.id}))
+
     def test_plugin_instance_query_search_list_failure_unauthenticated(self):
         response = self.client.get(self.list_url)
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
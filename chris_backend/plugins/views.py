@@ -1,8 +1,13 @@
 
-from rest_framework import generics, permissions
+from django.db import transaction
+
+from rest_framework import generics, permissions, serializers, status
+from rest_framework.response import Response
 from rest_framework.reverse import reverse
 
 from collectionjson import services
+from collectionjson.mixins import StreamingCollectionMixin
+from core.mixins import MemoizedObjectMixin, ConditionalGetMixin
 
 from .models import Plugin, PluginFilter, PluginParameter 
 from .models import PluginInstance, PluginInstanceFilter
@@ -11,11 +16,14 @@ from .models import BoolParameter, PathParameter
 
 from .serializers import PARAMETER_SERIALIZERS
 from .serializers import PluginSerializer,  PluginParameterSerializer
-from .serializers import PluginInstanceSerializer
+from .serializers import PluginInstanceSerializer, PluginInstancePipelineSerializer
+from .serializers import PluginInstanceStatusSerializer
 from .permissions import IsChrisOrReadOnly
+from .cache import PluginMetadataCacheMixin
 from .services.manager import PluginManager
+from .services.dispatcher import PluginInstanceDispatcher
 
-class PluginList(generics.ListAPIView):
+class PluginList(ConditionalGetMixin, PluginMetadataCacheMixin, generics.ListAPIView):
     """
     A view for the collection of plugins.
     """
@@ -36,6 +44,13 @@ class PluginList(generics.ListAPIView):
         links = {'feeds': reverse('feed-list', request=request)}    
         return services.append_collection_links(response, links)
 
+    def get_version(self):
+        """
+        Custom method to get the version of the collection of plugins.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.get_collection_version(queryset, 'modification_date')
+
 
 class PluginListQuerySearch(generics.ListAPIView):
     """
@@ -47,7 +62,7 @@ class PluginListQuerySearch(generics.ListAPIView):
     filter_class = PluginFilter
         
 
-class PluginDetail(generics.RetrieveAPIView):
+class PluginDetail(PluginMetadataCacheMixin, generics.RetrieveAPIView):
     """
     A plugin view.
     """
@@ -56,7 +71,8 @@ class PluginDetail(generics.RetrieveAPIView):
     permission_classes = (permissions.IsAuthenticated, IsChrisOrReadOnly,)
 
 
-class PluginParameterList(generics.ListAPIView):
+class PluginParameterList(PluginMetadataCacheMixin, MemoizedObjectMixin,
+                          generics.ListAPIView):
     """
     A view for the collection of plugin parameters.
     """
@@ -84,7 +100,7 @@ class PluginParameterList(generics.ListAPIView):
         return self.filter_queryset(plugin.parameters.all())
 
     
-class PluginParameterDetail(generics.RetrieveAPIView):
+class PluginParameterDetail(PluginMetadataCacheMixin, generics.RetrieveAPIView):
     """
     A plugin parameter view.
     """
@@ -93,7 +109,8 @@ class PluginParameterDetail(generics.RetrieveAPIView):
     permission_classes = (permissions.IsAuthenticated, IsChrisOrReadOnly,)
 
 
-class PluginInstanceList(generics.ListCreateAPIView):
+class PluginInstanceList(MemoizedObjectMixin, StreamingCollectionMixin,
+                         generics.ListCreateAPIView):
     """
     A view for the collection of plugin instances.
     """
@@ -106,7 +123,8 @@ class PluginInstanceList(generics.ListCreateAPIView):
         Overriden to associate an owner, a plugin and a previous plugin instance with 
         the newly created plugin instance before first saving to the DB. All the plugin 
         instace's parameters in the resquest are also properly saved to the DB. Finally
-        the plugin's app is run with the provided plugin instance's parameters.
+        the plugin instance is added to the dispatch queue so that the plugin's app is
+        run by a dispatcher worker with the provided plugin instance's parameters.
         """
         plugin = self.get_object()
         request_data = serializer.context['request'].data
@@ -115,28 +133,26 @@ class PluginInstanceList(generics.ListCreateAPIView):
         if 'previous_id' in request_data:
             previous_id = request_data['previous_id']
         previous = serializer.validate_previous(previous_id, plugin)
-        plugin_inst = serializer.save(owner=self.request.user, plugin=plugin,
-                                      previous=previous)
-        # collect parameters from the request and validate and save them to the DB
-        parameters = plugin.parameters.all()
-        parameters_dict = {}
-        for parameter in parameters:
-            if parameter.name in request_data:
-                requested_value = request_data[parameter.name]
-                data = {'value': requested_value}
-                parameter_serializer = PARAMETER_SERIALIZERS[parameter.type](data=data)
-                parameter_serializer.is_valid(raise_exception=True)
-                parameter_serializer.save(plugin_inst=plugin_inst, plugin_param=parameter)
-                parameters_dict[parameter.name] = requested_value
-        # run the plugin's app
-        pl_manager = PluginManager()
-        pl_manager.run_plugin_app(  plugin_inst,
-                                    parameters_dict,
-                                    service             = 'pfcon',
-                                    inputDirOverride    = '/share/incoming',
-                                    outputDirOverride   = '/share/outgoing',
-                                    IOPhost             = 'host'
-                                    )
+        # an invalid parameter must not leave a queued plugin instance without a job
+        with transaction.atomic():
+            plugin_inst = serializer.save(owner=self.request.user, plugin=plugin,
+                                          previous=previous, status='queued')
+            # collect parameters from the request and validate and save them to the DB
+            parameters = plugin.parameters.all()
+            for parameter in parameters:
+                if parameter.name in request_data:
+                    requested_value = request_data[parameter.name]
+                    data = {'value': requested_value}
+                    parameter_serializer = PARAMETER_SERIALIZERS[parameter.type](
+                        data=data)
+                    if not parameter_serializer.is_valid():
+                        raise serializers.ValidationError(
+                            {'detail': {parameter.name:
+                                        parameter_serializer.errors['value']}})
+                    parameter_serializer.save(plugin_inst=plugin_inst,
+                                              plugin_param=parameter)
+            # queue the plugin's app to be run
+            PluginInstanceDispatcher.enqueue(plugin_inst, compute_host='host')
 
     def list(self, request, *args, **kwargs):
         """
@@ -165,10 +181,78 @@ class PluginInstanceList(generics.ListCreateAPIView):
         Custom method to get the actual plugin instances' queryset.
         """
         plugin = self.get_object()
-        return self.filter_queryset(plugin.instances.all())
+        queryset = PluginInstanceSerializer.setup_eager_loading(plugin.instances.all())
+        return self.filter_queryset(queryset)
+
 
+class PluginInstancePipeline(generics.CreateAPIView):
+    """
+    A view for the submission of a pipeline of plugin instances.
+    """
+    serializer_class = PluginInstanceSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def create(self, request, *args, **kwargs):
+        """
+        Overriden to create the plugin instances of all the pipeline's steps and their
+        parameters in a single transaction. The instances are added to the dispatch
+        queue at once, each instance waiting for its previous instance to finish
+        successfully before being dispatched.
+        """
+        pipeline_serializer = PluginInstancePipelineSerializer(data=request.data)
+        pipeline_serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            plugin_insts = pipeline_serializer.save(owner=request.user)
+            PluginInstanceDispatcher.enqueue_pipeline(plugin_insts, compute_host='host')
+        PluginInstanceDispatcher.release_pipeline(plugin_insts)
+        queryset = PluginInstanceSerializer.setup_eager_loading(
+            PluginInstance.objects.filter(pk__in=[inst.id for inst in plugin_insts]))
+        serializer = self.get_serializer(queryset.order_by('id'), many=True)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class PluginInstanceStatusList(generics.ListAPIView):
+    """
+    A view for the status of many plugin instances, either all the instances of a
+    feed or a list of instances.
+    """
+    serializer_class = PluginInstanceStatusSerializer
+    permission_classes = (permissions.IsAuthenticated,)
+    # all the requested statuses are returned in a single response
+    pagination_class = None
 
-class PluginInstanceListQuerySearch(generics.ListAPIView):
+    def get_queryset(self):
+        """
+        Overriden to return the plugin instances of the feed given by the 'feed_id'
+        query parameter or the instances given by the comma-separated list of ids in
+        the 'ids' query parameter. The statuses are the ones stored in the DB by the
+        status poller so that no remote service is contacted. Only the instances
+        owned by the currently authenticated user are returned unless the user is
+        chris.
+        """
+        user = self.request.user
+        feed_id = self.request.query_params.get('feed_id')
+        ids = self.request.query_params.get('ids')
+        queryset = PluginInstance.objects.only('id', 'previous_id', 'status',
+                                               'end_date').order_by('id')
+        try:
+            if feed_id:
+                queryset = queryset.filter(root__feed__id=int(feed_id))
+                if user.username != 'chris':
+                    queryset = queryset.filter(root__feed__owner=user)
+                return queryset
+            if ids:
+                queryset = queryset.filter(pk__in=[int(id) for id in ids.split(',')])
+                if user.username != 'chris':
+                    queryset = queryset.filter(owner=user)
+                return queryset
+        except ValueError:
+            pass
+        raise serializers.ValidationError(
+            {'detail': "A valid 'feed_id' or comma-separated list of 'ids' is required"})
+
+
+class PluginInstanceListQuerySearch(StreamingCollectionMixin, generics.ListAPIView):
     """
     A view for the collection of plugin instances resulting from a query search.
     """
@@ -182,30 +266,50 @@ class PluginInstanceListQuerySearch(generics.ListAPIView):
         instances owned by the currently authenticated user.
         """
         user = self.request.user
+        queryset = PluginInstanceSerializer.setup_eager_loading(
+            PluginInstance.objects.all())
         # if the user is chris then return all the plugin instances in the system
         if user.username == 'chris':
-            return PluginInstance.objects.all()
-        return PluginInstance.objects.filter(owner=user)
+            return queryset
+        return queryset.filter(owner=user)
 
         
-class PluginInstanceDetail(generics.RetrieveAPIView):
+class PluginInstanceDetail(ConditionalGetMixin, MemoizedObjectMixin,
+                           generics.RetrieveAPIView):
     """
     A plugin instance view.
     """
     serializer_class = PluginInstanceSerializer
-    queryset = PluginInstance.objects.all()
+    queryset = PluginInstanceSerializer.setup_eager_loading(PluginInstance.objects.all())
     permission_classes = (permissions.IsAuthenticated, IsChrisOrReadOnly,)
 
     def retrieve(self, request, *args, **kwargs):
         """
-        Overloaded method to check a plugin's instance status.
+        Overloaded method to check a plugin's instance status with the remote service
+        when explicitly requested through the 'refresh' query parameter. Otherwise the
+        status stored in the DB by the status poller is returned.
         """
-        instance = self.get_object()
-        pl_manager = PluginManager()
-        pl_manager.check_plugin_app_exec_status(instance)
+        if request.query_params.get('refresh') in ('1', 'true'):
+            instance = self.get_object()
+            pl_manager = PluginManager()
+            pl_manager.check_plugin_app_exec_status(instance)
         response = super(PluginInstanceDetail, self).retrieve(request, *args, **kwargs)
         return  response
 
+    def get_version(self):
+        """
+        Custom method to get the version of the plugin instance from its status and
+        end date, which are the only data of the instance that change. The instance is
+        not versioned when its status is explicitly refreshed.
+        """
+        if self.request.query_params.get('refresh') in ('1', 'true'):
+            return None
+        lookup = {self.lookup_field: self.kwargs[self.lookup_field]}
+        instance = generics.get_object_or_404(
+            PluginInstance.objects.only('status', 'end_date'), **lookup)
+        self.check_object_permissions(self.request, instance)
+        return (instance.id, instance.status, instance.end_date), instance.end_date
+
 
 class StringParameterDetail(generics.RetrieveAPIView):
     """
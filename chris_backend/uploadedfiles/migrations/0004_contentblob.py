@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.10.2 on 2026-10-18 21:46
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_references(apps, schema_editor):
+    """
+    Count the existing uploaded and feed files referencing each hashed content.
+    """
+    ContentBlob = apps.get_model('uploadedfiles', 'ContentBlob')
+    refcounts = {}
+    for model in (apps.get_model('uploadedfiles', 'UploadedFile'),
+                  apps.get_model('feeds', 'FeedFile')):
+        hashes = model.objects.exclude(sha256='').order_by().values('sha256').annotate(
+            count=Count('id'))
+        for h in hashes:
+            refcounts[h['sha256']] = refcounts.get(h['sha256'], 0) + h['count']
+    ContentBlob.objects.bulk_create([ContentBlob(sha256=sha256, refcount=refcount)
+                                     for (sha256, refcount) in refcounts.items()])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('uploadedfiles', '0003_uploadedfile_sha256'),
+        ('feeds', '0008_auto_20261018_1714'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContentBlob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('refcount', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(count_references, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,14 @@
+import os
+import uuid
 
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.core.files import File
+
+from core.storage import (HashingReader, hash_chunks, iter_file_content, reference_blob,
+                          release_blob)
 
 
 def uploaded_file_path(instance, filename):
@@ -14,7 +23,237 @@ class UploadedFile(models.Model):
     creation_date = models.DateTimeField(auto_now_add=True)
     fname = models.FileField(max_length=512, upload_to=uploaded_file_path)
     upload_path = models.CharField(max_length=512)
+    sha256 = models.CharField(max_length=64, blank=True, db_index=True)
     owner = models.ForeignKey('auth.User')
 
     def __str__(self):
         return self.upload_path
+
+    def save(self, *args, **kwargs):
+        """
+        Overriden to compute the hash of a newly uploaded file's content before first
+        saving it to the storage. When deduplication is enabled the content is only
+        stored if no file with the same content is stored yet. The reference to the
+        content is rolled back if the file can not be saved.
+        """
+        with transaction.atomic():
+            if self.fname and not self.fname._committed:
+                self._save_content()
+            super(UploadedFile, self).save(*args, **kwargs)
+
+    def _save_content(self):
+        """
+        Custom method to hash the uploaded content and save it to the storage.
+        """
+        content = self.fname.file
+        self.sha256 = hash_chunks(content.chunks())
+        reference_blob(self.sha256)
+        content.seek(0)
+        storage = self.fname.storage
+        if settings.DEDUPLICATE_FILES and hasattr(storage, 'save_deduplicated'):
+            name = self.fname.field.generate_filename(self, content.name)
+            self.fname.name = storage.save_deduplicated(name, content, self.sha256)
+            self.fname._committed = True
+
+    def hash_stored_content(self):
+        """
+        Custom method to hash the content of an already stored file by streaming it
+        from the storage and save the hash to the DB.
+        """
+        self.sha256 = hash_chunks(iter_file_content(self.fname.storage, self.fname.name,
+                                                    settings.FILE_DOWNLOAD_CHUNK_SIZE))
+        with transaction.atomic():
+            reference_blob(self.sha256)
+            UploadedFile.objects.filter(pk=self.pk).update(sha256=self.sha256)
+
+
+@receiver(post_delete, sender=UploadedFile)
+def release_uploaded_file_content(sender, instance, **kwargs):
+    """
+    Release the deleted file's reference to its content once the deletion is
+    committed, including when the file is deleted in cascade with its owner.
+    """
+    if instance.sha256:
+        storage = instance.fname.storage
+        transaction.on_commit(lambda: release_blob(storage, instance.sha256))
+
+
+class ContentBlob(models.Model):
+    """
+    Number of uploaded and feed files whose content has the given hash. The
+    deduplicated content blob with that hash is only deleted from the storage once no
+    file references it anymore.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    refcount = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return self.sha256
+
+
+UPLOAD_STATUS_CHOICES = [("uploading", "Uploading"), ("finalizing", "Finalizing"),
+                         ("complete", "Complete")]
+
+
+class SegmentsReader(object):
+    """
+    Read-only file-like object that reads a list of stored segments one after another
+    as a single file.
+    """
+
+    def __init__(self, storage, segment_names):
+        self.storage = storage
+        self.segment_names = list(segment_names)
+        self.current = None
+
+    def read(self, size=-1):
+        while True:
+            if self.current is None:
+                if not self.segment_names:
+                    return b''
+                self.current = self.storage.open(self.segment_names.pop(0), 'rb')
+            data = self.current.read(size)
+            if data:
+                return data
+            self.current.close()
+            self.current = None
+
+
+class UploadSession(models.Model):
+    creation_date = models.DateTimeField(auto_now_add=True)
+    modification_date = models.DateTimeField(auto_now=True)
+    upload_path = models.CharField(max_length=512)
+    size = models.BigIntegerField()
+    offset = models.BigIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=UPLOAD_STATUS_CHOICES,
+                              default='uploading')
+    owner = models.ForeignKey('auth.User')
+    uploaded_file = models.OneToOneField(UploadedFile, on_delete=models.SET_NULL,
+                                         null=True, related_name='upload_session')
+
+    def __str__(self):
+        return self.upload_path
+
+    def get_segments_path(self):
+        """
+        Custom method to get the storage path where the session's chunks are stored.
+        """
+        return '{0}/{1}/{2}'.format(self.owner.username, 'upload_sessions', self.id)
+
+    def get_min_chunk_size(self):
+        """
+        Custom method to get the minimum size of the chunks other than the last one so
+        that the file is uploaded in at most UPLOAD_SESSION_MAX_CHUNKS chunks (the
+        number of segments of a Swift large object is limited).
+        """
+        return max(1, -(-self.size // settings.UPLOAD_SESSION_MAX_CHUNKS))
+
+    def save_chunk(self, content, start, length):
+        """
+        Custom method to store a chunk of the file being uploaded straight from a
+        file-like object and move the session's offset past it. The chunk must start
+        at the session's current offset. Return whether the chunk was saved.
+        """
+        storage = UploadedFile._meta.get_field('fname').storage
+        # a retried or concurrent request for the same offset must not overwrite the
+        # segment of a chunk that has already been saved
+        name = '{0}/{1:020d}.{2}'.format(self.get_segments_path(), start,
+                                         uuid.uuid4().hex)
+        if hasattr(storage, 'save_segment'):
+            etag = storage.save_segment(name, content, length)
+        else:
+            name = storage.save(name, File(content))
+            etag = ''
+            if storage.size(name) != length:
+                storage.delete(name)
+                return False
+        with transaction.atomic():
+            # a concurrent request might have already saved a chunk at this offset
+            moved = UploadSession.objects.filter(pk=self.pk, status='uploading',
+                                                 offset=start).update(
+                offset=start + length)
+            if moved:
+                UploadChunk.objects.create(session=self, offset=start, size=length,
+                                           fname=name, etag=etag)
+        if not moved:
+            storage.delete(name)
+            return False
+        self.offset = start + length
+        return True
+
+    def delete_chunks(self):
+        """
+        Custom method to delete the session's chunks from the storage and the DB.
+        """
+        storage = UploadedFile._meta.get_field('fname').storage
+        for chunk in self.chunks.all():
+            storage.delete(chunk.fname)
+        self.chunks.all().delete()
+
+    def finalize(self):
+        """
+        Custom method to assemble the uploaded chunks into a new uploaded file once
+        all the file's bytes have been received. Return the new uploaded file or None
+        when the session is already being finalized by another request. The hash of a
+        file assembled as a large object is left empty as its content is hashed
+        afterwards by the uploaded file hasher service.
+        """
+        claimed = UploadSession.objects.filter(pk=self.pk, status='uploading',
+                                               offset=self.size).update(
+            status='finalizing')
+        if not claimed:
+            return None
+        self.status = 'finalizing'
+        try:
+            return self._assemble_chunks()
+        except Exception:
+            # the upload can be finalized again
+            UploadSession.objects.filter(pk=self.pk).update(status='uploading')
+            self.status = 'uploading'
+            raise
+
+    def _assemble_chunks(self):
+        """
+        Internal method to assemble the uploaded chunks of a session claimed for
+        finalization into a new uploaded file.
+        """
+        uploaded_file = UploadedFile(owner=self.owner, upload_path=self.upload_path)
+        fname_field = UploadedFile._meta.get_field('fname')
+        storage = fname_field.storage
+        name = fname_field.generate_filename(uploaded_file,
+                                             os.path.basename(self.upload_path))
+        chunks = list(self.chunks.order_by('offset'))
+        if hasattr(storage, 'save_large_object'):
+            name = storage.save_large_object(name, [(c.fname, c.etag, c.size)
+                                                    for c in chunks])
+        else:
+            content = HashingReader(SegmentsReader(storage, [c.fname for c in chunks]))
+            name = storage.save(name, File(content))
+            uploaded_file.sha256 = content.hexdigest()
+        uploaded_file.fname.name = name
+        with transaction.atomic():
+            if uploaded_file.sha256:
+                reference_blob(uploaded_file.sha256)
+            uploaded_file.save()
+            self.uploaded_file = uploaded_file
+            self.status = 'complete'
+            self.save()
+        if uploaded_file.sha256:
+            # the chunks are no longer needed once their content has been copied
+            self.delete_chunks()
+        return uploaded_file
+
+
+class UploadChunk(models.Model):
+    offset = models.BigIntegerField()
+    size = models.BigIntegerField()
+    fname = models.CharField(max_length=1024)
+    etag = models.CharField(max_length=64, blank=True)
+    session = models.ForeignKey(UploadSession, on_delete=models.CASCADE,
+                                related_name='chunks')
+
+    class Meta:
+        ordering = ('offset',)
+
+    def __str__(self):
+        return self.fname
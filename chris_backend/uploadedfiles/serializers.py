@@ -1,5 +1,6 @@
 
 import os
+import re
 
 from django.core.exceptions import ObjectDoesNotExist
 
@@ -7,7 +8,7 @@ from rest_framework import serializers
 
 from collectionjson.fields import ItemLinkField
 from collectionjson.services import collection_serializer_is_valid
-from .models import UploadedFile
+from .models import UploadedFile, UploadSession
 
 
 class UploadedFileSerializer(serializers.HyperlinkedModelSerializer):
@@ -19,7 +20,8 @@ class UploadedFileSerializer(serializers.HyperlinkedModelSerializer):
 
     class Meta:
         model = UploadedFile
-        fields = ('url', 'upload_path', 'fname', 'file_resource', 'owner')
+        fields = ('url', 'upload_path', 'fname', 'sha256', 'file_resource', 'owner')
+        read_only_fields = ('sha256',)
 
     @collection_serializer_is_valid
     def is_valid(self, raise_exception=False):
@@ -57,4 +59,74 @@ class UploadedFileSerializer(serializers.HyperlinkedModelSerializer):
         except ObjectDoesNotExist:
             return path
         else:
-            raise serializers.ValidationError({'detail': "File already exists!"})
\ No newline at end of file
+            raise serializers.ValidationError({'detail': "File already exists!"})
+
+class UploadSessionSerializer(serializers.HyperlinkedModelSerializer):
+    owner = serializers.HyperlinkedRelatedField(view_name='user-detail',
+                                                read_only=True)
+    uploaded_file = serializers.HyperlinkedRelatedField(view_name='uploadedfile-detail',
+                                                        read_only=True)
+    chunks = serializers.HyperlinkedIdentityField(view_name='uploadsession-chunk')
+    finalize = serializers.HyperlinkedIdentityField(view_name='uploadsession-finalize')
+    upload_path = serializers.CharField()
+    size = serializers.IntegerField(min_value=1)
+    min_chunk_size = serializers.IntegerField(source='get_min_chunk_size',
+                                              read_only=True)
+
+    class Meta:
+        model = UploadSession
+        fields = ('url', 'id', 'creation_date', 'modification_date', 'upload_path',
+                  'size', 'min_chunk_size', 'offset', 'status', 'chunks', 'finalize',
+                  'uploaded_file', 'owner')
+        read_only_fields = ('offset', 'status')
+
+    @collection_serializer_is_valid
+    def is_valid(self, raise_exception=False):
+        """
+        Overriden to generate a properly formatted message for validation errors
+        """
+        return super(UploadSessionSerializer, self).is_valid(raise_exception=raise_exception)
+
+    def validate_chunk_range(self, content_range, content_length):
+        """
+        Custom method to get the first byte position of a chunk and its length from
+        the chunk request's Content-Range header (bytes <first>-<last>/<size>) and
+        check that the chunk is the next one expected by the upload session.
+        """
+        session = self.instance
+        match = re.match(r'^bytes (\d+)-(\d+)/(\d+)$', content_range or '')
+        if not match:
+            raise serializers.ValidationError(
+                {'detail': "A 'Content-Range: bytes <first>-<last>/<size>' header is "
+                           "required"})
+        (first, last, size) = [int(g) for g in match.groups()]
+        length = last - first + 1
+        if length <= 0 or length != content_length or size != session.size \
+                or last >= session.size:
+            raise serializers.ValidationError({'detail': "Invalid chunk range!"})
+        if session.status != 'uploading':
+            raise serializers.ValidationError({'detail': "Upload already finalized!"})
+        min_chunk_size = session.get_min_chunk_size()
+        if length < min_chunk_size and last != session.size - 1:
+            raise serializers.ValidationError(
+                {'detail': "Chunks other than the last one must be at least %s bytes" %
+                           min_chunk_size})
+        if first != session.offset:
+            raise serializers.ValidationError(
+                {'detail': "Chunk must start at offset %s" % session.offset})
+        return (first, length)
+
+    def check_ready_to_finalize(self):
+        """
+        Custom method to check that all the file's bytes have been received and that
+        the upload path is still free before finalizing the upload session.
+        """
+        session = self.instance
+        if session.status == 'complete':
+            raise serializers.ValidationError({'detail': "Upload already finalized!"})
+        if session.offset != session.size:
+            raise serializers.ValidationError(
+                {'detail': "Upload incomplete, %s of %s bytes received" %
+                           (session.offset, session.size)})
+        UploadedFileSerializer().validate_file_upload_path(session.owner,
+                                                           session.upload_path)
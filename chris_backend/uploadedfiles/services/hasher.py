@@ -0,0 +1,88 @@
+"""
+Uploaded file hasher module that periodically hashes the content of the uploaded files
+whose hash is still empty (eg. the files assembled from the chunks of an upload session
+as a large object) and saves it to the DB, so that finalizing an upload never waits on
+reading the whole file back from the storage.
+"""
+
+import os
+import sys
+import time
+import logging
+from argparse import ArgumentParser
+
+if "DJANGO_SETTINGS_MODULE" not in os.environ:
+    # django needs to be loaded (eg. when this script is run from the command line)
+    sys.path.append(os.path.join(os.path.dirname(__file__), '../../'))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings.local")
+    import django
+    django.setup()
+
+from django.conf import settings
+
+from uploadedfiles.models import UploadedFile
+
+logger = logging.getLogger(__name__)
+
+
+class UploadedFileHasher(object):
+    def __init__(self):
+        parser = ArgumentParser(description='Hash the content of the uploaded files')
+        parser.add_argument("-i", "--interval", type=float,
+                            default=settings.UPLOADED_FILE_HASH_INTERVAL,
+                            help="seconds between two consecutive checks")
+        parser.add_argument("--once", action='store_true',
+                            help="hash the content of the uploaded files once and exit")
+        self.parser = parser
+        # number of failed attempts to hash each uploaded file keyed by id
+        self.failed_attempts = {}
+
+    def get_unhashed_files(self):
+        """
+        Get the uploaded files whose content has not been hashed yet, leaving out the
+        files the hasher has given up on.
+        """
+        max_attempts = settings.UPLOADED_FILE_HASH_MAX_ATTEMPTS
+        given_up = [file_id for (file_id, attempts) in self.failed_attempts.items()
+                    if attempts >= max_attempts]
+        return UploadedFile.objects.filter(sha256='').exclude(
+            id__in=given_up).order_by('id')
+
+    def hash_files(self):
+        """
+        Hash the content of all the uploaded files whose hash is still empty. Return a
+        dictionary with the hash of each uploaded file keyed by id.
+        """
+        hashes = {}
+        for uploaded_file in self.get_unhashed_files():
+            # an unreadable file must not prevent hashing the remaining ones
+            try:
+                uploaded_file.hash_stored_content()
+            except Exception as e:
+                attempts = self.failed_attempts.get(uploaded_file.id, 0) + 1
+                self.failed_attempts[uploaded_file.id] = attempts
+                if attempts >= settings.UPLOADED_FILE_HASH_MAX_ATTEMPTS:
+                    logger.error("Giving up hashing uploaded file %s after %s "
+                                 "attempts: %s", uploaded_file.id, attempts, e)
+                continue
+            hashes[uploaded_file.id] = uploaded_file.sha256
+        return hashes
+
+    def run(self, args=None):
+        """
+        Parse the arguments passed to the hasher and hash the files at the requested
+        interval.
+        """
+        options = self.parser.parse_args(args)
+        self.args = options
+        if options.once:
+            return self.hash_files()
+        while True:
+            self.hash_files()
+            time.sleep(options.interval)
+
+
+# ENTRYPOINT
+if __name__ == "__main__":
+    hasher = UploadedFileHasher()
+    hasher.run()
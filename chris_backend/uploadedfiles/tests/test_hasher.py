@@ -0,0 +1,59 @@
+
+import hashlib
+from unittest import mock
+
+from django.test import TestCase
+from django.contrib.auth.models import User
+
+from uploadedfiles.models import UploadedFile
+from uploadedfiles.services import hasher
+
+
+class UploadedFileHasherTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='foo', password='foo-pass')
+        self.hasher = hasher.UploadedFileHasher()
+
+    def test_hasher_hashes_unhashed_files_only(self):
+        """
+        Test whether the hasher hashes the content of the uploaded files whose hash
+        is still empty and saves it to the DB.
+        """
+        sha256 = hashlib.sha256(b'0123456789').hexdigest()
+        uploaded_file = UploadedFile.objects.create(owner=self.user,
+                                                    upload_path='/data/file1.txt',
+                                                    fname='foo/uploads/data/file1.txt')
+        UploadedFile.objects.create(owner=self.user, upload_path='/data/file2.txt',
+                                    fname='foo/uploads/data/file2.txt', sha256=sha256)
+        with mock.patch.object(hasher.UploadedFile, 'hash_stored_content',
+                               autospec=True) as hash_mock:
+            hash_mock.side_effect = lambda f: setattr(f, 'sha256', sha256)
+            hashes = self.hasher.run(['--once'])
+        self.assertEqual(hashes, {uploaded_file.id: sha256})
+        self.assertEqual(hash_mock.call_count, 1)
+
+    def test_hasher_skips_files_that_can_not_be_read(self):
+        """
+        Test whether the hasher keeps hashing the remaining files when the content of
+        a file can not be read from the storage.
+        """
+        UploadedFile.objects.create(owner=self.user, upload_path='/data/file1.txt',
+                                    fname='foo/uploads/data/file1.txt')
+        with mock.patch.object(hasher.UploadedFile, 'hash_stored_content',
+                               side_effect=IOError('Not found')):
+            self.assertEqual(self.hasher.run(['--once']), {})
+
+    def test_hasher_gives_up_on_files_that_keep_failing(self):
+        """
+        Test whether the hasher stops trying to hash the content of a file after the
+        maximum number of failed attempts.
+        """
+        UploadedFile.objects.create(owner=self.user, upload_path='/data/file1.txt',
+                                    fname='foo/uploads/data/file1.txt')
+        with self.settings(UPLOADED_FILE_HASH_MAX_ATTEMPTS=2):
+            with mock.patch.object(hasher.UploadedFile, 'hash_stored_content',
+                                   side_effect=IOError('Not found')) as hash_mock:
+                for _ in range(4):
+                    self.hasher.run(['--once'])
+        self.assertEqual(hash_mock.call_count, 2)
@@ -1,9 +1,17 @@
 
+import io
+import shutil
+import hashlib
+import tempfile
 from unittest import mock
 
 from django.test import TestCase
 from django.contrib.auth.models import User
-from uploadedfiles.models import UploadedFile, uploaded_file_path
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from uploadedfiles.models import UploadedFile, UploadSession, ContentBlob
+from uploadedfiles.models import uploaded_file_path
+from uploadedfiles import models
 
 
 class UploadedFileModelTests(TestCase):
@@ -23,4 +31,191 @@ class UploadedFileModelTests(TestCase):
     def test_str(self):
         uploadedfile_mock = mock.MagicMock(spec=UploadedFile)
         uploadedfile_mock.upload_path = '/myuploads'
-        self.assertEqual(UploadedFile.__str__(uploadedfile_mock), '/myuploads')
\ No newline at end of file
+        self.assertEqual(UploadedFile.__str__(uploadedfile_mock), '/myuploads')
+
+    def test_save_hashes_content(self):
+        """
+        Test whether overriden save method computes the hash of a new file's content
+        and saves the content to the storage.
+        """
+        test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, test_dir, ignore_errors=True)
+        user = User.objects.create_user(username='foo', password='foo-pass')
+        fname_field = UploadedFile._meta.get_field('fname')
+        with mock.patch.object(fname_field, 'storage', FileSystemStorage(test_dir)):
+            uploadedfile = UploadedFile(upload_path='/file1.txt', owner=user)
+            uploadedfile.fname = ContentFile(b'test file', name='file1.txt')
+            uploadedfile.save()
+            self.assertEqual(uploadedfile.sha256,
+                             hashlib.sha256(b'test file').hexdigest())
+            with uploadedfile.fname.storage.open(uploadedfile.fname.name) as f:
+                self.assertEqual(f.read(), b'test file')
+
+    def test_save_deduplicates_content(self):
+        """
+        Test whether overriden save method lets the storage deduplicate a new file's
+        content when deduplication is enabled.
+        """
+        user = User.objects.create_user(username='foo', password='foo-pass')
+        storage = mock.Mock()
+        storage.generate_filename = lambda name: name
+        storage.save_deduplicated = mock.Mock(return_value='foo/uploads/file1.txt')
+        fname_field = UploadedFile._meta.get_field('fname')
+        with self.settings(DEDUPLICATE_FILES=True):
+            with mock.patch.object(fname_field, 'storage', storage):
+                uploadedfile = UploadedFile(upload_path='/file1.txt', owner=user)
+                uploadedfile.fname = ContentFile(b'test file', name='file1.txt')
+                uploadedfile.save()
+        sha256 = hashlib.sha256(b'test file').hexdigest()
+        storage.save_deduplicated.assert_called_with('foo/uploads//file1.txt',
+                                                     mock.ANY, sha256)
+        self.assertFalse(storage.save.called)
+        self.assertEqual(ContentBlob.objects.get(sha256=sha256).refcount, 1)
+        uploadedfile = UploadedFile.objects.get(pk=uploadedfile.id)
+        self.assertEqual(uploadedfile.sha256, sha256)
+        self.assertEqual(uploadedfile.fname.name, 'foo/uploads/file1.txt')
+
+    def test_save_rolls_back_content_reference_when_file_is_not_saved(self):
+        """
+        Test whether overriden save method rolls back the reference to a new file's
+        content when the file can not be saved to the DB.
+        """
+        storage = mock.Mock()
+        storage.save_deduplicated = mock.Mock(return_value='foo/uploads/file1.txt')
+        fname_field = UploadedFile._meta.get_field('fname')
+        with self.settings(DEDUPLICATE_FILES=True):
+            with mock.patch.object(fname_field, 'storage', storage):
+                # an unsaved owner makes saving the file fail
+                uploadedfile = UploadedFile(upload_path='/file1.txt',
+                                            owner=User(username='foo'))
+                uploadedfile.fname = ContentFile(b'test file', name='file1.txt')
+                with self.assertRaises(ValueError):
+                    uploadedfile.save()
+        self.assertEqual(ContentBlob.objects.count(), 0)
+
+    def test_hash_stored_content(self):
+        """
+        Test whether custom hash_stored_content method hashes the content of an
+        already stored file and saves the hash to the DB.
+        """
+        test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, test_dir, ignore_errors=True)
+        storage = FileSystemStorage(test_dir)
+        user = User.objects.create_user(username='foo', password='foo-pass')
+        name = storage.save('foo/uploads/file1.txt', ContentFile(b'0123456789'))
+        fname_field = UploadedFile._meta.get_field('fname')
+        with mock.patch.object(fname_field, 'storage', storage):
+            uploaded_file = UploadedFile.objects.create(owner=user, fname=name,
+                                                        upload_path='/file1.txt')
+            uploaded_file.hash_stored_content()
+        sha256 = hashlib.sha256(b'0123456789').hexdigest()
+        self.assertEqual(uploaded_file.sha256, sha256)
+        self.assertEqual(UploadedFile.objects.get(pk=uploaded_file.pk).sha256, sha256)
+
+    def test_deleting_owner_releases_the_content_of_its_files(self):
+        """
+        Test whether the content of a user's files is released after the files are
+        deleted in cascade with their owner.
+        """
+        user = User.objects.create_user(username='foo', password='foo-pass')
+        UploadedFile.objects.create(owner=user, fname='foo/uploads/file1.txt',
+                                    upload_path='/file1.txt', sha256='abc')
+        with mock.patch.object(models, 'release_blob') as release_blob_mock:
+            with mock.patch('django.db.transaction.on_commit',
+                            side_effect=lambda func: func()):
+                user.delete()
+        release_blob_mock.assert_called_once_with(mock.ANY, 'abc')
+
+
+class UploadSessionModelTests(TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.storage = FileSystemStorage(location=self.test_dir)
+        self.user = User.objects.create_user(username='foo', password='foo-pass')
+        self.session = UploadSession.objects.create(upload_path='/data/file1.txt',
+                                                    size=10, owner=self.user)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def test_save_chunk_and_finalize(self):
+        """
+        Test whether custom save_chunk and finalize methods store the file's chunks
+        and assemble them into a new uploaded file.
+        """
+        fname_field = UploadedFile._meta.get_field('fname')
+        with mock.patch.object(fname_field, 'storage', self.storage):
+            self.assertTrue(self.session.save_chunk(io.BytesIO(b'01234'), 0, 5))
+            # a chunk that does not start at the session's offset is not saved
+            self.assertFalse(self.session.save_chunk(io.BytesIO(b'01234'), 0, 5))
+            self.assertTrue(self.session.save_chunk(io.BytesIO(b'56789'), 5, 5))
+            self.assertEqual(self.session.offset, 10)
+            uploaded_file = self.session.finalize()
+            self.assertEqual(self.session.status, 'complete')
+            self.assertEqual(uploaded_file.upload_path, '/data/file1.txt')
+            self.assertEqual(uploaded_file.sha256,
+                             hashlib.sha256(b'0123456789').hexdigest())
+            with self.storage.open(uploaded_file.fname.name) as f:
+                self.assertEqual(f.read(), b'0123456789')
+            # the chunks are deleted once assembled
+            self.assertEqual(self.session.chunks.count(), 0)
+
+    def test_save_chunk_does_not_overwrite_a_saved_segment(self):
+        """
+        Test whether custom save_chunk method stores a retried chunk in a new segment
+        and deletes that segment when the chunk at its offset has already been saved.
+        """
+        storage = mock.Mock()
+        storage.save_segment = mock.Mock(return_value='etag1')
+        fname_field = UploadedFile._meta.get_field('fname')
+        with mock.patch.object(fname_field, 'storage', storage):
+            self.assertTrue(self.session.save_chunk(io.BytesIO(b'01234'), 0, 5))
+            segment_name = self.session.chunks.get().fname
+            self.assertFalse(self.session.save_chunk(io.BytesIO(b'01234'), 0, 5))
+        retried_segment_name = storage.save_segment.call_args[0][0]
+        self.assertNotEqual(retried_segment_name, segment_name)
+        storage.delete.assert_called_once_with(retried_segment_name)
+        self.assertEqual(self.session.chunks.get().fname, segment_name)
+
+    def test_finalize_claims_the_session(self):
+        """
+        Test whether custom finalize method does not assemble the chunks of a session
+        that is already being finalized and releases its claim when it fails.
+        """
+        fname_field = UploadedFile._meta.get_field('fname')
+        with mock.patch.object(fname_field, 'storage', self.storage):
+            self.assertTrue(self.session.save_chunk(io.BytesIO(b'0123456789'), 0, 10))
+            with mock.patch.object(UploadSession, '_assemble_chunks',
+                                   side_effect=IOError):
+                with self.assertRaises(IOError):
+                    self.session.finalize()
+            self.assertEqual(UploadSession.objects.get(pk=self.session.pk).status,
+                             'uploading')
+            UploadSession.objects.filter(pk=self.session.pk).update(status='finalizing')
+            self.assertIsNone(self.session.finalize())
+        self.assertEqual(UploadedFile.objects.count(), 0)
+
+    def test_finalize_creates_large_object_from_segments(self):
+        """
+        Test whether custom finalize method makes the chunks uploaded as segments the
+        segments of a large object when the storage supports it.
+        """
+        storage = mock.Mock()
+        storage.save_segment = mock.Mock(return_value='etag1')
+        storage.save_large_object = mock.Mock(return_value='foo/uploads/file1.txt')
+        fname_field = UploadedFile._meta.get_field('fname')
+        with mock.patch.object(fname_field, 'storage', storage):
+            content = io.BytesIO(b'0123456789')
+            self.assertTrue(self.session.save_chunk(content, 0, 10))
+            segment_name = self.session.chunks.get().fname
+            self.assertTrue(segment_name.startswith(
+                'foo/upload_sessions/{0}/{1:020d}.'.format(self.session.id, 0)))
+            storage.save_segment.assert_called_with(segment_name, content, 10)
+            uploaded_file = self.session.finalize()
+            storage.save_large_object.assert_called_with(
+                mock.ANY, [(segment_name, 'etag1', 10)])
+            self.assertEqual(uploaded_file.fname.name, 'foo/uploads/file1.txt')
+            # the segments are not read back to hash the file's content
+            storage.iter_range.assert_not_called()
+            self.assertEqual(uploaded_file.sha256, '')
@@ -1,5 +1,5 @@
 
-import os, shutil
+import os, json, shutil, tempfile
 from unittest import mock, skip
 
 import swiftclient
@@ -8,10 +8,11 @@ from django.test import TestCase, tag
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.urlresolvers import reverse
+from django.core.files.storage import FileSystemStorage
 
 from rest_framework import status
 
-from uploadedfiles.models import UploadedFile
+from uploadedfiles.models import UploadedFile, UploadSession
 from uploadedfiles import views
 
 
@@ -170,9 +171,9 @@ class UploadedFileResourceViewTests(UploadedFileViewTests):
         fileresource_view_inst = mock.Mock()
         fileresource_view_inst.get_object = mock.Mock(return_value=uploadedfile)
         request_mock = mock.Mock()
-        with mock.patch('uploadedfiles.views.Response') as response_mock:
+        with mock.patch('uploadedfiles.views.get_file_response') as get_file_response_mock:
             views.UploadedFileResource.get(fileresource_view_inst, request_mock)
-            response_mock.assert_called_with(uploadedfile.fname)
+            get_file_response_mock.assert_called_with(request_mock, uploadedfile.fname)
 
     @tag('integration')
     def test_integration_uploadedfileresource_download_success(self):
@@ -214,3 +215,128 @@ class UploadedFileResourceViewTests(UploadedFileViewTests):
     def test_fileresource_download_failure_unauthenticated(self):
         response = self.client.get(self.download_url)
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class UploadSessionViewTests(UploadedFileViewTests):
+    """
+    Test the resumable upload views
+    """
+
+    def setUp(self):
+        super(UploadSessionViewTests, self).setUp()
+        self.create_read_url = reverse("uploadsession-list")
+        self.post = json.dumps({"template": {"data": [
+            {"name": "upload_path", "value": "/data/file2.txt"},
+            {"name": "size", "value": 10}]}})
+
+        # store the chunks in a local test directory
+        self.test_dir = tempfile.mkdtemp()
+        fname_field = UploadedFile._meta.get_field('fname')
+        storage_patcher = mock.patch.object(fname_field, 'storage',
+                                            FileSystemStorage(location=self.test_dir))
+        storage_patcher.start()
+        self.addCleanup(storage_patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def put_chunk(self, session_id, content, first, size=10):
+        chunk_url = reverse("uploadsession-chunk", kwargs={"pk": session_id})
+        content_range = 'bytes {0}-{1}/{2}'.format(first, first + len(content) - 1, size)
+        return self.client.put(chunk_url, data=content,
+                               content_type='application/octet-stream',
+                               HTTP_CONTENT_RANGE=content_range)
+
+    def test_upload_session_create_success(self):
+        self.client.login(username=self.username, password=self.password)
+        response = self.client.post(self.create_read_url, data=self.post,
+                                    content_type=self.content_type)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["upload_path"], "/data/file2.txt")
+        self.assertEqual(response.data["offset"], 0)
+
+    def test_upload_session_create_failure_file_already_exists(self):
+        self.client.login(username=self.username, password=self.password)
+        post = json.dumps({"template": {"data": [
+            {"name": "upload_path", "value": "/file1.txt"},
+            {"name": "size", "value": 10}]}})
+        response = self.client.post(self.create_read_url, data=post,
+                                    content_type=self.content_type)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_upload_session_chunks_and_finalize_success(self):
+        self.client.login(username=self.username, password=self.password)
+        response = self.client.post(self.create_read_url, data=self.post,
+                                    content_type=self.content_type)
+        session_id = response.data["id"]
+        response = self.put_chunk(session_id, b'01234', 0)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["offset"], 5)
+
+        # a chunk that does not start at the session's offset is rejected
+        response = self.put_chunk(session_id, b'01234', 0)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # the upload's progress can be checked to resume it
+        read_url = reverse("uploadsession-detail", kwargs={"pk": session_id})
+        response = self.client.get(read_url)
+        self.assertEqual(response.data["offset"], 5)
+        self.assertEqual(response.data["size"], 10)
+
+        # finalizing an incomplete upload fails
+        finalize_url = reverse("uploadsession-finalize", kwargs={"pk": session_id})
+        response = self.client.post(finalize_url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.put_chunk(session_id, b'56789', 5)
+        response = self.client.post(finalize_url)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["status"], "complete")
+        uploaded_file = UploadedFile.objects.get(upload_path='/data/file2.txt')
+        self.assertEqual(uploaded_file.owner.username, self.username)
+        with uploaded_file.fname.storage.open(uploaded_file.fname.name) as f:
+            self.assertEqual(f.read(), b'0123456789')
+
+    def test_upload_session_finalize_failure_already_being_finalized(self):
+        user = User.objects.get(username=self.username)
+        session = UploadSession.objects.create(upload_path='/data/file2.txt', size=10,
+                                               owner=user)
+        self.client.login(username=self.username, password=self.password)
+        self.put_chunk(session.id, b'0123456789', 0)
+        # another request has already claimed the session
+        UploadSession.objects.filter(pk=session.id).update(status='finalizing')
+        finalize_url = reverse("uploadsession-finalize", kwargs={"pk": session.id})
+        response = self.client.post(finalize_url)
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertFalse(UploadedFile.objects.filter(
+            upload_path='/data/file2.txt').exists())
+
+    def test_upload_session_chunk_failure_chunk_too_small(self):
+        user = User.objects.get(username=self.username)
+        session = UploadSession.objects.create(upload_path='/data/file2.txt', size=10,
+                                               owner=user)
+        self.client.login(username=self.username, password=self.password)
+        with self.settings(UPLOAD_SESSION_MAX_CHUNKS=3):
+            response = self.put_chunk(session.id, b'012', 0)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            response = self.put_chunk(session.id, b'0123', 0)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data["min_chunk_size"], 4)
+            self.put_chunk(session.id, b'4567', 4)
+            # the last chunk can be smaller
+            response = self.put_chunk(session.id, b'89', 8)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data["offset"], 10)
+
+    def test_upload_session_chunk_failure_not_owner(self):
+        user = User.objects.get(username=self.username)
+        session = UploadSession.objects.create(upload_path='/data/file2.txt', size=10,
+                                               owner=user)
+        self.client.login(username=self.other_username, password=self.other_password)
+        response = self.put_chunk(session.id, b'01234', 0)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_upload_session_create_failure_unauthenticated(self):
+        response = self.client.post(self.create_read_url, data=self.post,
+                                    content_type=self.content_type)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
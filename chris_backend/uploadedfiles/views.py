@@ -1,12 +1,13 @@
 
-from rest_framework import generics, permissions
+from rest_framework import generics, permissions, serializers, status, exceptions
 from rest_framework.response import Response
 
 from collectionjson import services
 from core.renderers import BinaryFileRenderer
+from core.responses import get_file_response
 
-from .models import UploadedFile
-from .serializers import UploadedFileSerializer
+from .models import UploadedFile, UploadSession
+from .serializers import UploadedFileSerializer, UploadSessionSerializer
 from .permissions import IsOwnerOrChris
 
 
@@ -80,9 +81,117 @@ class UploadedFileResource(generics.GenericAPIView):
 
     def get(self, request, *args, **kwargs):
         """
-        Overriden to be able to make a GET request to an actual file resource.
+        Overriden to be able to make a GET request to an actual file resource. The
+        file is streamed from the storage backend and HTTP byte ranges are supported.
         """
         user_file = self.get_object()
-        return Response(user_file.fname)
+        return get_file_response(request, user_file.fname)
 
 
+class UploadSessionList(generics.ListCreateAPIView):
+    """
+    A view for the collection of resumable upload sessions.
+    """
+    queryset = UploadSession.objects.all()
+    serializer_class = UploadSessionSerializer
+    permission_classes = (permissions.IsAuthenticated, IsOwnerOrChris)
+
+    def get_queryset(self):
+        """
+        Overriden to return a custom queryset that is only comprised by the upload
+        sessions owned by the currently authenticated user.
+        """
+        user = self.request.user
+        # if the user is chris then return all the upload sessions
+        if (user.username == 'chris'):
+            return UploadSession.objects.all()
+        return UploadSession.objects.filter(owner=user)
+
+    def perform_create(self, serializer):
+        """
+        Overriden to associate an owner with the upload session before first saving
+        to the DB.
+        """
+        user = self.request.user
+        path = serializer.validated_data['upload_path']
+        path = UploadedFileSerializer().validate_file_upload_path(user, path)
+        serializer.save(owner=user, upload_path=path)
+
+    def list(self, request, *args, **kwargs):
+        """
+        Overriden to append a collection+json template to the response.
+        """
+        response = super(UploadSessionList, self).list(request, *args, **kwargs)
+        # append write template
+        template_data = {'upload_path': "", 'size': ""}
+        return services.append_collection_template(response, template_data)
+
+
+class UploadSessionDetail(generics.RetrieveDestroyAPIView):
+    """
+    An upload session view that reports the upload's progress.
+    """
+    queryset = UploadSession.objects.all()
+    serializer_class = UploadSessionSerializer
+    permission_classes = (permissions.IsAuthenticated, IsOwnerOrChris)
+
+    def perform_destroy(self, instance):
+        """
+        Overriden to delete the stored chunks of an aborted upload. The chunks of a
+        finalized upload might be the segments of the uploaded file so they are kept.
+        """
+        if instance.status == 'uploading':
+            instance.delete_chunks()
+        instance.delete()
+
+
+class UploadSessionChunk(generics.GenericAPIView):
+    """
+    A view to upload the next chunk of a file through an upload session.
+    """
+    queryset = UploadSession.objects.all()
+    serializer_class = UploadSessionSerializer
+    permission_classes = (permissions.IsAuthenticated, IsOwnerOrChris)
+
+    def put(self, request, *args, **kwargs):
+        """
+        Store the chunk in the request's body. The chunk's position in the file is
+        given by the Content-Range header and it must start at the session's current
+        offset. The request's body is streamed to the storage without being parsed.
+        """
+        session = self.get_object()
+        serializer = self.get_serializer(session)
+        content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+        (start, length) = serializer.validate_chunk_range(
+            request.META.get('HTTP_CONTENT_RANGE'), content_length)
+        if not session.save_chunk(request.stream, start, length):
+            session.refresh_from_db()
+            raise serializers.ValidationError(
+                {'detail': "Chunk must start at offset %s" % session.offset})
+        return Response(serializer.data)
+
+
+class UploadSessionConflict(exceptions.APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Upload already being finalized!'
+
+
+class UploadSessionFinalize(generics.GenericAPIView):
+    """
+    A view to finalize an upload session into a new uploaded file.
+    """
+    queryset = UploadSession.objects.all()
+    serializer_class = UploadSessionSerializer
+    permission_classes = (permissions.IsAuthenticated, IsOwnerOrChris)
+
+    def post(self, request, *args, **kwargs):
+        """
+        Assemble the uploaded chunks into a new uploaded file once all the file's bytes
+        have been received.
+        """
+        session = self.get_object()
+        serializer = self.get_serializer(session)
+        serializer.check_ready_to_finalize()
+        if session.finalize() is None:
+            raise UploadSessionConflict()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
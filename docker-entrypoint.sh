@@ -3,6 +3,15 @@
 # Set the permission on the mounted volume container
 # chmod 777 /usr/users
 
+# Start the plugin instance dispatcher workers
+python plugins/services/dispatcher.py --workers 2 &
+
+# Start the plugin instance status poller
+python plugins/services/poller.py &
+
+# Start the uploaded file hasher
+python uploadedfiles/services/hasher.py &
+
 # Start chris server
 python manage.py runserver 0.0.0.0:8000
 